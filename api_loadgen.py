@@ -0,0 +1,155 @@
+"""
+API Load Generator Module
+Drives the API server's checkout endpoint from many concurrent keep-alive connections
+and reports latency percentiles
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+
+class ApiClient:
+    """Minimal HTTP/1.1 JSON client over one keep-alive connection"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, payload=None):
+        """
+        Send one request
+
+        Returns:
+            (status, decoded JSON body)
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        data = await self.reader.readexactly(int(headers.get('content-length') or 0))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, json.loads(data) if data else None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_load(host='127.0.0.1', port=8765, concurrency=16, requests=2000, max_items=3, search_ratio=0.0, seed=1):
+    """
+    Send checkouts (and optionally catalog searches) from concurrent clients
+
+    Args:
+        host: API server host
+        port: API server port
+        concurrency: Number of connections sending requests at the same time
+        requests: Total number of requests
+        max_items: Most products in one checkout
+        search_ratio: Share of requests that are catalog searches instead of checkouts
+        seed: Random seed
+
+    Returns:
+        Dict with per-status counts, throughput and latency percentiles
+    """
+    rng = random.Random(seed)
+    client = ApiClient(host, port)
+    status, data = await client.request('GET', '/products?q=&limit=500')
+    await client.close()
+    if status != 200:
+        raise RuntimeError(f"Product search failed: {data}")
+    pids = [product['pid'] for product in data['products'] if int(product['qty'] or 0) > 0]
+    if not pids:
+        raise RuntimeError("No products in stock to check out")
+
+    remaining = [requests]
+    statuses = {}
+    latencies = {'checkout': [], 'search': []}
+
+    async def worker():
+        client = ApiClient(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                if rng.random() < search_ratio:
+                    kind, method, path, payload = 'search', 'GET', f"/products?q={rng.choice('abcdefghij')}&limit=20", None
+                else:
+                    items = [{'pid': pid, 'qty': 1} for pid in rng.sample(pids, min(len(pids), rng.randint(1, max_items)))]
+                    kind, method, path, payload = 'checkout', 'POST', '/checkout', {'items': items, 'customer': 'Load Test', 'contact': '0'}
+                start = time.perf_counter()
+                status, _ = await client.request(method, path, payload)
+                elapsed = time.perf_counter() - start
+                # Rejected checkouts (out of stock) are still answered requests
+                latencies[kind].append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            await client.close()
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+
+    report = {'seconds': elapsed, 'requests': requests, 'throughput': requests / elapsed, 'statuses': statuses}
+    for kind, values in latencies.items():
+        if values:
+            report[kind] = {
+                'count': len(values),
+                'p50_ms': _percentile(values, 0.5) * 1000,
+                'p99_ms': _percentile(values, 0.99) * 1000,
+                'max_ms': max(values) * 1000
+            }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the inventory API's checkout")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--max-items', type=int, default=3, help="Most products in one checkout")
+    parser.add_argument('--search-ratio', type=float, default=0.0, help="Share of requests that are catalog searches")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(
+        args.host, args.port, args.concurrency, args.requests, args.max_items, args.search_ratio, args.seed
+    ))
+    print(f"{report['requests']} requests from {args.concurrency} connections in {report['seconds']:.1f}s ({report['throughput']:.1f}/s)")
+    print("Status          " + "  ".join(f"{status}: {count}" for status, count in sorted(report['statuses'].items())))
+    for kind in ('checkout', 'search'):
+        if kind in report:
+            stats = report[kind]
+            print(f"{kind:15} {stats['count']:6}  p50 {stats['p50_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms  max {stats['max_ms']:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
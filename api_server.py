@@ -0,0 +1,456 @@
+"""
+API Server Module
+Local HTTP/JSON service on asyncio (standard library only) so several terminals can share
+one inventory process. Reads run on a small thread pool; every write goes through a single
+writer task, so the service never competes with itself for the SQLite write lock. Writes
+queued while one is running are committed together (one savepoint each), so a burst of
+checkouts pays for one commit instead of one per checkout.
+
+Endpoints:
+    GET  /health
+    GET  /products?q=<name>&limit=50     catalog search
+    POST /checkout                       {"items": [{"pid": 1, "qty": 2}], "customer": "", "contact": ""}
+    POST /stock/adjust                   {"pid": 1, "qty": 5, "action": "add" | "subtract"}
+    POST /receipts                       {"receipt_type": "purchase" | "sales", "file_name": "", "items": [{"name": "", "qty": 1, "price": 0}]}
+    GET  /bills/<invoice>                saved bill text
+    GET  /debug/queries                  query profiler statistics (see query_profiler)
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import argparse
+import threading
+import query_profiler
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from checkout import sell_cart
+from bill_render import make_bill, render_text
+from create_db import ensure_db
+from receipt_handler import ReceiptHandler
+from receipt_processor import ReceiptItem
+from stock_ledger import record_movement
+
+MAX_BODY = 1024 * 1024
+# Most queued writes committed in one transaction
+MAX_BATCH = 64
+MAX_SEARCH_LIMIT = 500
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'
+}
+
+
+class ApiError(Exception):
+    """Error returned to the client as {"error": message} with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class InventoryService:
+    def __init__(self, db_path='ims.db', bill_dir='bill', readers=4):
+        """
+        Initialize the service
+
+        Args:
+            db_path: Path to the SQLite database
+            bill_dir: Folder bills are saved to and looked up in
+            readers: Threads serving read requests
+        """
+        self.db_path = db_path
+        self.bill_dir = bill_dir
+        self.handler = ReceiptHandler(db_path)
+        self.read_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='api-read')
+        # One thread runs every write, in the order the writer task takes them
+        self.write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='api-write')
+        self.local = threading.local()
+        self.write_con = None
+        self.last_invoice = 0
+        self.write_queue = None
+        self.writer = None
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/products'): self.search_products,
+            ('POST', '/checkout'): self.checkout,
+            ('POST', '/stock/adjust'): self.adjust_stock,
+            ('POST', '/receipts'): self.submit_receipt,
+            ('GET', '/debug/queries'): self.query_stats,
+        }
+        ensure_db(db_path)
+        os.makedirs(bill_dir, exist_ok=True)
+
+    #------------------------------------------------------------------ writes
+
+    async def start(self):
+        self.write_queue = asyncio.Queue()
+        self.writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    async def stop(self):
+        """Finish the queued writes, then stop the writer and the thread pools"""
+        await self.write_queue.put(None)
+        await self.writer
+        if self.write_con is not None:
+            self.write_con.close()
+        self.read_pool.shutdown()
+        self.write_pool.shutdown()
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        held = []
+        while True:
+            job = held.pop() if held else await self.write_queue.get()
+            if job is None:
+                return
+            batch = [job]
+            if job[2]:
+                # Take every batchable write already waiting
+                while len(batch) < MAX_BATCH and not self.write_queue.empty():
+                    job = self.write_queue.get_nowait()
+                    if job is None or not job[2]:
+                        # Runs next, after this batch
+                        held.append(job)
+                        break
+                    batch.append(job)
+                outcomes = await loop.run_in_executor(self.write_pool, self._run_batch, batch)
+            else:
+                func, args = batch[0][0], batch[0][1]
+                try:
+                    outcomes = [(True, await loop.run_in_executor(self.write_pool, func, *args))]
+                except Exception as ex:
+                    outcomes = [(False, ex)]
+            for (*_, future), (ok, value) in zip(batch, outcomes):
+                if future.cancelled():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _run_batch(self, batch):
+        """
+        Run batchable writes in one transaction on the writer thread
+
+        Each write gets its own savepoint, so a failing one is rolled back alone.
+        after_commit steps (e.g. saving the bill) run only once everything is committed.
+
+        Returns:
+            List of (ok, result or exception) in batch order
+        """
+        if self.write_con is None:
+            self.write_con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        con = self.write_con
+        outcomes = []
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            for func, args, _, _, _ in batch:
+                con.execute("SAVEPOINT api_write")
+                try:
+                    outcomes.append((True, func(con.cursor(), *args)))
+                except Exception as ex:
+                    con.execute("ROLLBACK TO api_write")
+                    outcomes.append((False, ex))
+                con.execute("RELEASE api_write")
+            con.execute("COMMIT")
+        except Exception as ex:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            return [(False, ex)] * len(batch)
+
+        for i, (ok, value) in enumerate(outcomes):
+            after_commit = batch[i][3]
+            if ok and after_commit:
+                try:
+                    outcomes[i] = (True, after_commit(value))
+                except Exception as ex:
+                    outcomes[i] = (False, ex)
+        return outcomes
+
+    async def write(self, func, *args, after_commit=None):
+        """
+        Queue func(cursor, *args) for the writer task and wait for its result
+
+        func runs inside the writer's transaction; after_commit(result), if given,
+        runs on the writer thread after the commit and its return value is the result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.write_queue.put((func, args, True, after_commit, future))
+        return await future
+
+    async def write_alone(self, func, *args):
+        """Queue func(*args), which manages its own transactions, for the writer task"""
+        future = asyncio.get_running_loop().create_future()
+        await self.write_queue.put((func, args, False, None, future))
+        return await future
+
+    async def read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.read_pool, func, *args)
+
+    def _read_con(self):
+        # Each reader thread keeps its own connection
+        con = getattr(self.local, 'con', None)
+        if con is None:
+            con = self.local.con = sqlite3.connect(self.db_path, timeout=30)
+        return con
+
+    #------------------------------------------------------------------ handlers
+
+    async def health(self, query, body):
+        return {'status': 'ok', 'queued_writes': self.write_queue.qsize()}
+
+    async def query_stats(self, query, body):
+        return {
+            'enabled': query_profiler.is_enabled(),
+            'slow_ms': query_profiler.slow_ms(),
+            'histogram_ms': query_profiler.histogram_labels(),
+            'queries': query_profiler.stats()
+        }
+
+    async def search_products(self, query, body):
+        name = query.get('q', [''])[0]
+        try:
+            limit = min(int(query.get('limit', ['50'])[0]), MAX_SEARCH_LIMIT)
+        except ValueError:
+            raise ApiError(400, "limit must be a number")
+        rows = await self.read(self._search_products, name, limit)
+        return {'products': [
+            {'pid': pid, 'name': name, 'price': price, 'qty': qty, 'status': status}
+            for pid, name, price, qty, status in rows
+        ]}
+
+    def _search_products(self, name, limit):
+        return self._read_con().execute(
+            "select pid,name,price,qty,status from product where name LIKE ? order by name limit ?",
+            (f"%{name}%", limit)
+        ).fetchall()
+
+    async def checkout(self, query, body):
+        items = body.get('items')
+        if not items or not isinstance(items, list):
+            raise ApiError(400, "items is required")
+        cart = {}
+        for item in items:
+            try:
+                pid, qty = int(item['pid']), int(item['qty'])
+            except (KeyError, TypeError, ValueError):
+                raise ApiError(400, "every item needs a numeric pid and qty")
+            if qty <= 0:
+                raise ApiError(400, "qty must be positive")
+            cart[pid] = cart.get(pid, 0) + qty
+        return await self.write(
+            self._sell, cart, str(body.get('customer', '')), str(body.get('contact', '')),
+            after_commit=self._save_bill
+        )
+
+    def _sell(self, cur, cart, customer, contact):
+        rows = cur.execute(
+            f"select pid,name,price,qty from product where pid in ({','.join('?' * len(cart))})",
+            list(cart)
+        ).fetchall()
+        if len(rows) != len(cart):
+            missing = sorted(set(cart) - {row[0] for row in rows})
+            raise ApiError(404, f"Unknown product id(s): {', '.join(map(str, missing))}")
+
+        # Cart rows [pid, name, price, qty, stock] as billClass keeps them
+        cart_list = [[str(pid), name, price, str(cart[pid]), qty] for pid, name, price, qty in rows]
+        try:
+            lines = sell_cart(cur, cart_list)
+        except ValueError as ex:
+            raise ApiError(409, str(ex))
+        return customer, contact, lines
+
+    def _save_bill(self, sale):
+        customer, contact, lines = sale
+        invoice = max(int(time.strftime("%H%M%S")) + int(time.strftime("%d%m%Y")), self.last_invoice + 1)
+        # Only the writer thread saves bills, so bumping past existing ones cannot race
+        while os.path.exists(os.path.join(self.bill_dir, f"{invoice}.txt")):
+            invoice += 1
+        self.last_invoice = invoice
+        bill = make_bill(invoice, customer, contact, lines)
+        with open(os.path.join(self.bill_dir, f"{invoice}.txt"), 'w') as fp:
+            fp.write(render_text(bill))
+        return {
+            'invoice': invoice,
+            'lines': [{'name': name, 'qty': int(qty), 'amount': float(price)} for name, qty, price in lines],
+            'bill_amount': bill['bill_amount'],
+            'discount': bill['discount'],
+            'net_pay': bill['net_pay']
+        }
+
+    async def adjust_stock(self, query, body):
+        try:
+            pid, qty = int(body['pid']), int(body['qty'])
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(400, "pid and qty are required")
+        action = body.get('action', 'add')
+        if action not in ('add', 'subtract') or qty <= 0:
+            raise ApiError(400, "action must be 'add' or 'subtract' and qty positive")
+        return await self.write(self._adjust, pid, qty, action)
+
+    def _adjust(self, cur, pid, qty, action):
+        success, old_qty, new_qty, message = self.handler.change_quantity(cur, pid, qty, action)
+        if not success:
+            raise ApiError(404 if message == "Product not found" else 409, message)
+        cur.execute("SELECT name FROM product WHERE pid=?", (pid,))
+        record_movement(cur, pid, cur.fetchone()[0], action, qty, old_qty, new_qty)
+        return {'pid': pid, 'old_qty': old_qty, 'new_qty': new_qty}
+
+    async def submit_receipt(self, query, body):
+        receipt_type = body.get('receipt_type', 'purchase')
+        if receipt_type not in ('purchase', 'sales'):
+            raise ApiError(400, "receipt_type must be 'purchase' or 'sales'")
+        try:
+            items = [ReceiptItem(str(item['name']), int(item['qty']), float(item.get('price', 0))) for item in body['items']]
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(400, "items need a name, qty and price")
+        if not items:
+            raise ApiError(400, "items is required")
+        # The receipt workflow runs its own transactions, so it is not batched
+        result = await self.write_alone(
+            lambda: self.handler.process_receipt_workflow(
+                str(body.get('file_name') or 'api'), manual_items=items, receipt_type_override=receipt_type
+            )
+        )
+        if not result['success']:
+            raise ApiError(503 if 'database is locked' in result['message'] else 500, result['message'])
+        return result
+
+    async def get_bill(self, invoice):
+        if not invoice.isdigit():
+            raise ApiError(400, "invoice must be a number")
+        text = await self.read(self._read_bill, invoice)
+        if text is None:
+            raise ApiError(404, f"No bill {invoice}")
+        return {'invoice': int(invoice), 'text': text}
+
+    def _read_bill(self, invoice):
+        path = os.path.join(self.bill_dir, f"{invoice}.txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as fp:
+            return fp.read()
+
+    #------------------------------------------------------------------ HTTP
+
+    async def dispatch(self, method, target, body):
+        """Route one request - returns (status, JSON-able payload)"""
+        url = urlsplit(target)
+        try:
+            if url.path.startswith('/bills/'):
+                if method != 'GET':
+                    raise ApiError(405, "Use GET")
+                return 200, await self.get_bill(url.path[len('/bills/'):])
+            handler = self.routes.get((method, url.path))
+            if handler is None:
+                if any(path == url.path for _, path in self.routes):
+                    raise ApiError(405, f"{method} is not allowed on {url.path}")
+                raise ApiError(404, f"No endpoint {url.path}")
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise ApiError(400, "Body is not valid JSON")
+            if not isinstance(data, dict):
+                raise ApiError(400, "Body must be a JSON object")
+            return 200, await handler(parse_qs(url.query), data)
+        except ApiError as ex:
+            return ex.status, {'error': ex.message}
+        except sqlite3.OperationalError as ex:
+            return (503 if 'locked' in str(ex) else 500), {'error': str(ex)}
+        except Exception as ex:
+            return 500, {'error': f"Error due to : {str(ex)}"}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection, keeping it open between requests"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    status, payload = 413, {'error': "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(db_path='ims.db', host='127.0.0.1', port=8765, bill_dir='bill', readers=4, ready=None):
+    """
+    Run the API until cancelled
+
+    Args:
+        db_path: Path to the SQLite database
+        host: Interface to listen on (keep 127.0.0.1 unless terminals connect over the network)
+        port: TCP port
+        bill_dir: Folder for saved bills
+        readers: Threads serving read requests
+        ready: Optional callable(host, port) called once the server is listening
+    """
+    service = InventoryService(db_path, bill_dir, readers)
+    await service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    if ready:
+        ready(*server.sockets[0].getsockname()[:2])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local inventory API for several terminals")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--bill-dir', default='bill', help="Folder for saved bills")
+    parser.add_argument('--readers', type=int, default=4, help="Threads serving read requests")
+    args = parser.parse_args(argv)
+
+    query_profiler.enable_from_env()
+    try:
+        asyncio.run(serve(
+            args.db, args.host, args.port, args.bill_dir, args.readers,
+            ready=lambda host, port: print(f"Inventory API listening on http://{host}:{port}")
+        ))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""
+Log Archive Module
+Moves transaction_logs, receipt_logs and receipt_items rows older than a horizon into
+monthly archive databases, recorded in archive_manifest. History queries attach the
+archives they need one at a time, so the live database stays small.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from create_db import ensure_db
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_KEEP_DAYS = 365
+# Schema name an archive is attached under
+ARCHIVE_SCHEMA = 'archive'
+ARCHIVED_TABLES = ('receipt_logs', 'receipt_items', 'transaction_logs')
+
+
+def archive_cutoff(keep_days=DEFAULT_KEEP_DAYS, today=None):
+    """
+    First day that stays live - only whole months older than keep_days are archived
+
+    Returns:
+        'YYYY-MM-01'
+    """
+    horizon = (today or datetime.now()) - timedelta(days=keep_days)
+    return horizon.strftime('%Y-%m-01')
+
+
+def _next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+
+
+def _db_dir(con):
+    """Folder of the connection's main database - manifest paths are relative to it"""
+    for _, name, path in con.execute("PRAGMA database_list"):
+        if name == 'main':
+            return os.path.dirname(os.path.abspath(path)) if path else os.getcwd()
+    return os.getcwd()
+
+
+def attached_archives(con, where="", params=(), newest_first=True):
+    """
+    Attach matching archives one at a time as ARCHIVE_SCHEMA, newest month first
+    unless newest_first is False
+
+    Only one archive is attached at any time, so there is no limit on the number
+    of months. Must not be used inside a write transaction (SQLite cannot ATTACH there).
+
+    Args:
+        con: Open connection to the live database
+        where: Optional WHERE clause on archive_manifest columns
+        params: Parameters for the WHERE clause
+        newest_first: Order of the months
+
+    Yields:
+        Month 'YYYY-MM' of the attached archive
+    """
+    rows = con.execute(
+        f"SELECT month, path FROM archive_manifest {where} ORDER BY month {'DESC' if newest_first else 'ASC'}", params
+    ).fetchall()
+    base = _db_dir(con)
+    for month, path in rows:
+        full_path = os.path.join(base, path)
+        # ATTACH would silently create an empty database for a missing file
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"Archive for {month} is missing: {full_path}")
+        con.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (full_path,))
+        try:
+            yield month
+        finally:
+            con.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+
+
+def _prepare_archive(con, path):
+    """Create the archive file with the live tables' and indexes' definitions"""
+    definitions = con.execute(
+        f"""SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name IN ({', '.join('?' * len(ARCHIVED_TABLES))}) AND type IN ('table', 'index') AND sql IS NOT NULL
+        ORDER BY type='index'""",
+        ARCHIVED_TABLES
+    ).fetchall()
+    archive = sqlite3.connect(path)
+    try:
+        existing = {row[0] for row in archive.execute("SELECT name FROM sqlite_master")}
+        for _, name, sql in definitions:
+            if name not in existing:
+                archive.execute(sql)
+        archive.commit()
+    finally:
+        archive.close()
+
+
+def _write_boundary_checkpoints(con, boundary_txn_id):
+    """
+    Checkpoint every tracked product at the last archived movement
+
+    Point-in-time lookups after the boundary then never need the archives.
+    """
+    timestamp = con.execute(
+        "SELECT timestamp FROM transaction_logs WHERE txn_id=?", (boundary_txn_id,)
+    ).fetchone()[0]
+    return con.execute(
+        """INSERT OR IGNORE INTO stock_checkpoints (product_id, txn_id, timestamp, qty)
+        SELECT c.product_id, ?, ?, c.qty + COALESCE((
+            SELECT SUM(CASE t.action WHEN 'subtract' THEN -t.quantity ELSE t.quantity END)
+            FROM transaction_logs t
+            WHERE t.product_id=c.product_id AND t.txn_id>c.txn_id AND t.txn_id<=?
+        ), 0)
+        FROM (SELECT product_id, MAX(txn_id) AS txn_id FROM stock_checkpoints WHERE txn_id<=? GROUP BY product_id) last
+        JOIN stock_checkpoints c ON c.product_id=last.product_id AND c.txn_id=last.txn_id
+        WHERE c.txn_id<?""",
+        (boundary_txn_id, timestamp, boundary_txn_id, boundary_txn_id, boundary_txn_id)
+    ).rowcount
+
+
+def archive_logs(db_path='ims.db', keep_days=DEFAULT_KEEP_DAYS, archive_dir=None, vacuum=False, progress=None):
+    """
+    Move rows of whole months older than keep_days into monthly archive files
+
+    Receipt items move with their receipt. Transaction rows the demand forecast
+    has not processed yet stay live, and every tracked product gets a stock
+    checkpoint at the last archived movement first. Each month is copied and
+    deleted in one transaction across both files, and rows already in an
+    archive are skipped, so an interrupted run can simply be repeated.
+
+    Args:
+        db_path: Path to the live SQLite database
+        keep_days: Days of history kept in the live database
+        archive_dir: Folder for the archive files (default: 'archive' next to the database)
+        vacuum: VACUUM the live database afterwards to return the space
+        progress: Optional callable(month, stats) called after each month
+
+    Returns:
+        Dict with cutoff, months (month -> rows moved per table) and held_back
+    """
+    ensure_db(db_path)
+    db_dir = os.path.dirname(os.path.abspath(db_path))
+    archive_dir = os.path.abspath(archive_dir or os.path.join(db_dir, 'archive'))
+    os.makedirs(archive_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    cutoff = archive_cutoff(keep_days)
+    result = {'cutoff': cutoff, 'months': {}, 'held_back': 0}
+
+    con = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        forecast_txn_id = con.execute("SELECT last_txn_id FROM forecast_state WHERE id=1").fetchone()[0]
+        boundary_txn_id, held_back = con.execute(
+            "SELECT MAX(CASE WHEN txn_id<=? THEN txn_id END), COUNT(*)-COUNT(CASE WHEN txn_id<=? THEN 1 END) FROM transaction_logs WHERE timestamp<?",
+            (forecast_txn_id, forecast_txn_id, cutoff)
+        ).fetchone()
+        result['held_back'] = held_back
+        months = sorted({
+            row[0] for row in con.execute(
+                "SELECT DISTINCT substr(upload_date, 1, 7) FROM receipt_logs WHERE upload_date<?", (cutoff,)
+            )
+        } | {
+            row[0] for row in con.execute(
+                "SELECT DISTINCT substr(timestamp, 1, 7) FROM transaction_logs WHERE timestamp<? AND txn_id<=?",
+                (cutoff, forecast_txn_id)
+            )
+        })
+
+        if boundary_txn_id is not None:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                _write_boundary_checkpoints(con, boundary_txn_id)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+
+        for month in months:
+            start, end = f"{month}-01", _next_month(month)
+            path = os.path.join(archive_dir, f"{stem}_{month}.db")
+            _prepare_archive(con, path)
+            con.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+            try:
+                con.execute("BEGIN IMMEDIATE")
+                try:
+                    receipts = "SELECT receipt_id FROM main.receipt_logs WHERE upload_date>=? AND upload_date<?"
+                    con.execute(
+                        f"INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.receipt_items SELECT * FROM main.receipt_items WHERE receipt_id IN ({receipts})",
+                        (start, end)
+                    )
+                    items = con.execute(f"DELETE FROM main.receipt_items WHERE receipt_id IN ({receipts})", (start, end)).rowcount
+                    con.execute(
+                        f"INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.receipt_logs SELECT * FROM main.receipt_logs WHERE upload_date>=? AND upload_date<?",
+                        (start, end)
+                    )
+                    logs = con.execute("DELETE FROM main.receipt_logs WHERE upload_date>=? AND upload_date<?", (start, end)).rowcount
+                    con.execute(
+                        f"INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.transaction_logs SELECT * FROM main.transaction_logs WHERE timestamp>=? AND timestamp<? AND txn_id<=?",
+                        (start, end, forecast_txn_id)
+                    )
+                    txns = con.execute(
+                        "DELETE FROM main.transaction_logs WHERE timestamp>=? AND timestamp<? AND txn_id<=?",
+                        (start, end, forecast_txn_id)
+                    ).rowcount
+
+                    # Describe the archive from its contents, so repeated runs stay correct
+                    con.execute(
+                        f"""INSERT INTO archive_manifest
+                        (month, path, receipt_rows, item_rows, txn_rows, first_receipt_id, last_receipt_id, first_txn_id, last_txn_id, archived_at)
+                        SELECT ?, ?, r.n, (SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.receipt_items), t.n, r.lo, r.hi, t.lo, t.hi, ?
+                        FROM (SELECT COUNT(*) AS n, MIN(receipt_id) AS lo, MAX(receipt_id) AS hi FROM {ARCHIVE_SCHEMA}.receipt_logs) r,
+                        (SELECT COUNT(*) AS n, MIN(txn_id) AS lo, MAX(txn_id) AS hi FROM {ARCHIVE_SCHEMA}.transaction_logs) t
+                        WHERE 1 ON CONFLICT(month) DO UPDATE SET path=excluded.path, receipt_rows=excluded.receipt_rows,
+                        item_rows=excluded.item_rows, txn_rows=excluded.txn_rows, first_receipt_id=excluded.first_receipt_id,
+                        last_receipt_id=excluded.last_receipt_id, first_txn_id=excluded.first_txn_id,
+                        last_txn_id=excluded.last_txn_id, archived_at=excluded.archived_at""",
+                        (month, os.path.relpath(path, db_dir), datetime.now().strftime(TIME_FORMAT))
+                    )
+                    con.execute("COMMIT")
+                except Exception:
+                    con.execute("ROLLBACK")
+                    raise
+            finally:
+                con.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+
+            stats = {'receipt_logs': logs, 'receipt_items': items, 'transaction_logs': txns}
+            result['months'][month] = stats
+            if progress:
+                progress(month, stats)
+
+        if vacuum and months:
+            con.execute("VACUUM")
+    finally:
+        con.close()
+    return result
+
+
+def list_archives(db_path='ims.db'):
+    """
+    Rows of archive_manifest, oldest month first
+
+    Returns:
+        List of dicts
+    """
+    ensure_db(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        cur = con.execute("SELECT * FROM archive_manifest ORDER BY month")
+        columns = [column[0] for column in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        con.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old receipts and transaction logs into monthly files")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="Move old rows into the monthly archives")
+    run_parser.add_argument('--keep-days', type=int, default=DEFAULT_KEEP_DAYS, help="Days of history kept live")
+    run_parser.add_argument('--archive-dir', help="Folder for the archive files (default: archive/ next to the database)")
+    run_parser.add_argument('--vacuum', action='store_true', help="VACUUM the live database afterwards")
+
+    sub.add_parser('list', help="Show the archive manifest")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        start = time.perf_counter()
+        result = archive_logs(
+            args.db, args.keep_days, args.archive_dir, args.vacuum,
+            progress=lambda month, stats: print(
+                f"{month}  {stats['receipt_logs']:8} receipts {stats['receipt_items']:8} items {stats['transaction_logs']:9} transactions"
+            )
+        )
+        print(f"Archived {len(result['months'])} month(s) before {result['cutoff']} in {time.perf_counter() - start:.1f}s")
+        if result['held_back']:
+            print(f"Kept {result['held_back']} transaction(s) the demand forecast has not processed yet - run demand_forecast.py first")
+    else:
+        for row in list_archives(args.db):
+            print(f"{row['month']}  {row['receipt_rows']:8} receipts {row['item_rows']:8} items {row['txn_rows']:9} transactions  {row['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
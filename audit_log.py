@@ -0,0 +1,290 @@
+"""
+Audit Log Module
+Write-behind logger for audit rows (receipt_items, transaction_logs). log() appends the row
+to a local journal file and a queue and returns at once; a background thread writes queued
+rows in batched transactions together with a watermark (audit_journal_state), so after a
+crash the next logger replays exactly the journal rows that never reached the database.
+log() hands each row to the OS, which survives the process crashing; the journal is synced
+to disk before each batch is written, so rows waiting for a locked database also survive a
+power failure (rows logged in the moments before one may be lost).
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+import multiprocessing.util
+from create_db import ensure_db
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    import msvcrt
+    HAS_FCNTL = False
+
+AUDIT_COLUMNS = {
+    'receipt_items': ('receipt_id', 'product_id', 'product_name', 'quantity', 'unit_price', 'total_price', 'action'),
+    'transaction_logs': ('receipt_id', 'product_id', 'product_name', 'quantity', 'action', 'old_qty', 'new_qty', 'timestamp'),
+}
+DEFAULT_BATCH_SIZE = 500
+# Empty the journal once everything in it is committed and it is bigger than this
+JOURNAL_MAX_BYTES = 1024 * 1024
+RETRY_SECONDS = 1.0
+
+_shared_loggers = {}
+_shared_lock = threading.Lock()
+_finalizer_pid = None
+
+
+def _try_lock(fd):
+    """Take an exclusive lock on an open journal without waiting - False if another process holds it"""
+    try:
+        if HAS_FCNTL:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _insert_sql(table):
+    columns = AUDIT_COLUMNS[table]
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+class AuditLogger:
+    def __init__(self, db_path='ims.db', journal_dir=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Start the logger and its flush thread
+
+        Journals left behind by processes that died are replayed first.
+
+        Args:
+            db_path: Path to the SQLite database
+            journal_dir: Folder for journal files (default: 'audit_journal' next to the database)
+            batch_size: Most rows written in one transaction
+        """
+        self.db_path = db_path
+        self.pid = os.getpid()
+        self.batch_size = batch_size
+        self.journal_dir = journal_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'audit_journal')
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.stem = os.path.splitext(os.path.basename(db_path))[0]
+        self.journal_name = f"{self.stem}-{os.getpid()}-{int(time.time() * 1000)}.journal"
+        self.journal_path = os.path.join(self.journal_dir, self.journal_name)
+        self.journal_fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        # Held for the logger's lifetime, so recovery never touches a live journal
+        _try_lock(self.journal_fd)
+        self.journal_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.last_seq = 0
+        self.written_seq = 0
+        self.closed = False
+        ensure_db(db_path)
+        self.thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self.thread.start()
+
+    def log(self, table, row):
+        """
+        Queue one audit row
+
+        Args:
+            table: Key of AUDIT_COLUMNS
+            row: Values in AUDIT_COLUMNS[table] order
+
+        Returns:
+            Sequence number of the row in this logger's journal
+        """
+        if table not in AUDIT_COLUMNS:
+            raise ValueError(f"Unknown audit table '{table}'. Choose from: {', '.join(AUDIT_COLUMNS)}")
+        if len(row) != len(AUDIT_COLUMNS[table]):
+            raise ValueError(f"{table} rows have {len(AUDIT_COLUMNS[table])} values, got {len(row)}")
+        with self.journal_lock:
+            if self.closed:
+                raise RuntimeError("Audit logger is closed")
+            self.last_seq += 1
+            seq = self.last_seq
+            # Written with os.write, so the row is with the OS before log() returns
+            os.write(self.journal_fd, (json.dumps([seq, table, list(row)]) + "\n").encode('utf-8'))
+            self.queue.put((seq, table, tuple(row)))
+        return seq
+
+    def flush(self, timeout=None):
+        """
+        Wait until every row logged so far is committed
+
+        Returns:
+            True if flushed, False on timeout
+        """
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=30):
+        """
+        Flush and stop the flush thread, then remove the journal
+
+        If the rows cannot be written within timeout the journal is kept, and
+        the next logger for this database replays it.
+        """
+        with self.journal_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.queue.put(None)
+        self.thread.join(timeout)
+        if self.thread.is_alive() or self.written_seq != self.last_seq:
+            os.close(self.journal_fd)
+            return
+        os.close(self.journal_fd)
+        # File first: a watermark without its journal is harmless, the reverse is not
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass  # Another logger's recovery found it unlocked and already emptied it
+        con = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            con.execute("DELETE FROM audit_journal_state WHERE journal=?", (self.journal_name,))
+            con.commit()
+        finally:
+            con.close()
+
+    def _run(self):
+        con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            try:
+                self.recover(con)
+            except (OSError, sqlite3.Error) as ex:
+                print(f"Error replaying audit journals: {str(ex)}")
+            stopping = False
+            while not stopping:
+                items = [self.queue.get()]
+                while len(items) < self.batch_size:
+                    try:
+                        items.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                rows = [item for item in items if isinstance(item, tuple)]
+                stopping = None in items
+                if rows:
+                    os.fsync(self.journal_fd)
+                    self._write(con, self.journal_name, rows, retry=True)
+                    self.written_seq = rows[-1][0]
+                    self._trim_journal()
+                for item in items:
+                    if isinstance(item, threading.Event):
+                        item.set()
+        finally:
+            con.close()
+
+    def _write(self, con, journal_name, rows, retry=False):
+        """Insert rows and move the journal's watermark in one transaction"""
+        by_table = {}
+        for seq, table, values in rows:
+            by_table.setdefault(table, []).append(values)
+        while True:
+            try:
+                con.execute("BEGIN IMMEDIATE")
+                for table, values in by_table.items():
+                    con.executemany(_insert_sql(table), values)
+                con.execute(
+                    """INSERT INTO audit_journal_state (journal, seq) VALUES (?, ?)
+                    ON CONFLICT(journal) DO UPDATE SET seq=excluded.seq""",
+                    (journal_name, rows[-1][0])
+                )
+                con.execute("COMMIT")
+                return
+            except sqlite3.OperationalError as ex:
+                if con.in_transaction:
+                    con.execute("ROLLBACK")
+                if not retry:
+                    raise
+                # The rows are safe in the journal - keep trying (e.g. database locked)
+                print(f"Error writing audit log, retrying: {str(ex)}")
+                time.sleep(RETRY_SECONDS)
+
+    def _trim_journal(self):
+        with self.journal_lock:
+            if (self.written_seq == self.last_seq
+                    and os.fstat(self.journal_fd).st_size > JOURNAL_MAX_BYTES):
+                os.ftruncate(self.journal_fd, 0)
+
+    def recover(self, con):
+        """
+        Replay journals of dead processes for this database - rows above their watermark are written
+
+        Returns:
+            Number of rows replayed
+        """
+        replayed = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            if not name.endswith('.journal') or name == self.journal_name:
+                continue
+            # Journals are named <database stem>-<pid>-<ms>.journal - other databases
+            # next to this one share the folder, and their journals are theirs to replay
+            if name[:-len('.journal')].rsplit('-', 2)[0] != self.stem:
+                continue
+            path = os.path.join(self.journal_dir, name)
+            fd = os.open(path, os.O_RDWR)
+            if not _try_lock(fd):
+                os.close(fd)
+                continue  # Its process is still running
+            # Read through the locked descriptor - Windows locks are mandatory and
+            # bound to the handle, so a second handle could not read the file
+            with os.fdopen(fd, 'r', encoding='utf-8') as f:
+                row = con.execute("SELECT seq FROM audit_journal_state WHERE journal=?", (name,)).fetchone()
+                watermark = row[0] if row else 0
+                rows = []
+                for line in f:
+                    try:
+                        seq, table, values = json.loads(line)
+                    except ValueError:
+                        break  # Torn last line of a crash
+                    if seq > watermark and table in AUDIT_COLUMNS:
+                        rows.append((seq, table, tuple(values)))
+                for start in range(0, len(rows), self.batch_size):
+                    self._write(con, name, rows[start:start + self.batch_size])
+                replayed += len(rows)
+            os.remove(path)
+            con.execute("DELETE FROM audit_journal_state WHERE journal=?", (name,))
+        return replayed
+
+
+def get_audit_logger(db_path='ims.db'):
+    """
+    Get the process-wide logger for a database
+
+    Args:
+        db_path: Path to the SQLite database
+
+    Returns:
+        Shared AuditLogger instance
+    """
+    global _finalizer_pid
+    with _shared_lock:
+        logger = _shared_loggers.get(db_path)
+        # A forked child inherits the parent's logger but not its flush thread
+        if logger is None or logger.pid != os.getpid():
+            logger = AuditLogger(db_path)
+            _shared_loggers[db_path] = logger
+        if _finalizer_pid != os.getpid():
+            # multiprocessing workers leave through os._exit and skip atexit
+            multiprocessing.util.Finalize(None, shutdown_audit_loggers, exitpriority=100)
+            _finalizer_pid = os.getpid()
+        return logger
+
+
+@atexit.register
+def shutdown_audit_loggers():
+    """Flush and close all shared loggers"""
+    with _shared_lock:
+        loggers = [logger for logger in _shared_loggers.values() if logger.pid == os.getpid()]
+        _shared_loggers.clear()
+    for logger in loggers:
+        logger.close()
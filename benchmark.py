@@ -0,0 +1,472 @@
+"""
+Benchmark Module
+Builds synthetic databases and bill folders at a chosen scale and times the headless
+equivalents of the main screens: product listing and search, adding to the cart,
+checkout, the receipt workflow, the dashboard counts and the sales bill list. Results are
+written as JSON and can be compared with an earlier run used as the baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import platform
+import argparse
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+from statistics import mean, median
+from create_db import ensure_db
+from catalog_cache import CatalogCache, get_catalog
+from checkout import checkout_cart
+from bill_render import make_bill, render_text
+from low_stock import low_stock_items
+from receipt_handler import ReceiptHandler
+from receipt_processor import ReceiptItem
+
+SCALES = {
+    'small': {'products': 10000, 'transactions': 100000, 'receipts': 5000, 'bills': 20000},
+    'medium': {'products': 50000, 'transactions': 500000, 'receipts': 20000, 'bills': 100000},
+    'large': {'products': 100000, 'transactions': 1000000, 'receipts': 50000, 'bills': 500000},
+}
+# A benchmark counts as a regression when its median is this much slower than the baseline
+DEFAULT_TOLERANCE = 0.25
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+INSERT_BATCH = 50000
+FIRST_INVOICE = 1000000
+
+ADJECTIVES = ('Fresh', 'Organic', 'Classic', 'Premium', 'Spicy', 'Sweet', 'Salted', 'Roasted', 'Frozen', 'Golden',
+              'Crunchy', 'Creamy', 'Herbal', 'Natural', 'Masala', 'Family', 'Mini', 'Jumbo', 'Lite', 'Royal')
+NOUNS = ('Apple', 'Rice', 'Tea', 'Coffee', 'Biscuit', 'Soap', 'Shampoo', 'Oil', 'Flour', 'Sugar', 'Juice', 'Milk',
+         'Butter', 'Cheese', 'Noodles', 'Chips', 'Lentils', 'Honey', 'Jam', 'Sauce', 'Paneer', 'Ghee', 'Bread', 'Salt')
+SIZES = ('100g', '250g', '500g', '1kg', '5kg', '200ml', '500ml', '1L', 'Pack of 6', 'Pack of 12')
+
+
+def _batches(rows, size=INSERT_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _product_name(rng, pid):
+    # The id keeps names unique, so receipt lookups by name find one product
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(SIZES)} #{pid}"
+
+
+def generate(db_path, bill_dir, products, transactions, receipts, bills, days=365, seed=42, progress=None):
+    """
+    Build a synthetic database and bill folder
+
+    Args:
+        db_path: New database file to create
+        bill_dir: New folder for the bill files
+        products: Number of products
+        transactions: Number of transaction_logs rows
+        receipts: Number of receipts, with three items each
+        bills: Number of bill files
+        days: Days of history the logs and bills are spread over
+        seed: Random seed - the same arguments build the same data
+        progress: Optional callable(message)
+
+    Returns:
+        Dict of row and file counts
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists - the benchmark needs a new database file")
+    if os.path.exists(bill_dir) and os.listdir(bill_dir):
+        raise FileExistsError(f"{bill_dir} is not empty - the benchmark needs a new bill folder")
+    report = progress or (lambda message: None)
+    rng = random.Random(seed)
+    start_day = datetime.now() - timedelta(days=days)
+    ensure_db(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        categories = [f"Category {i}" for i in range(1, max(products // 2000, 10) + 1)]
+        suppliers = [f"Supplier {i}" for i in range(1, max(products // 1000, 10) + 1)]
+        con.executemany("INSERT INTO category (name) VALUES (?)", ((name,) for name in categories))
+        con.executemany("INSERT INTO supplier (name, contact, desc) VALUES (?, '9800000000', '')", ((name,) for name in suppliers))
+        con.executemany(
+            "INSERT INTO employee (name, email, gender, contact, utype, salary) VALUES (?, ?, 'Other', '9800000000', 'Employee', '20000')",
+            ((f"Employee {i}", f"employee{i}@example.com") for i in range(1, 21))
+        )
+        report(f"Writing {products} products")
+        names = []
+        for batch in _batches(
+            (pid, rng.choice(categories), rng.choice(suppliers), _product_name(rng, pid),
+             str(rng.randint(10, 2000)), str(rng.choice((0, 3, 50, 200, 500, 1000))), 'Active' if rng.random() < 0.95 else 'Inactive')
+            for pid in range(1, products + 1)
+        ):
+            con.executemany("INSERT INTO product (pid, Category, Supplier, name, price, qty, status) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            names.extend(row[3] for row in batch)
+        con.commit()
+
+        report(f"Writing {transactions} stock movements")
+        step = days * 86400 / max(transactions, 1)
+        for batch in _batches(
+            (pid, names[pid - 1], rng.randint(1, 10), 'add' if rng.random() < 0.3 else 'subtract',
+             (start_day + timedelta(seconds=i * step)).strftime(TIME_FORMAT))
+            for i, pid in ((i, rng.randint(1, products)) for i in range(transactions))
+        ):
+            con.executemany(
+                "INSERT INTO transaction_logs (product_id, product_name, quantity, action, old_qty, new_qty, timestamp) VALUES (?, ?, ?, ?, 0, 0, ?)",
+                batch
+            )
+            con.commit()
+
+        report(f"Writing {receipts} receipts")
+        step = days * 86400 / max(receipts, 1)
+        for batch in _batches(
+            (receipt_id, rng.choice(('purchase', 'sales')), (start_day + timedelta(seconds=receipt_id * step)).strftime(TIME_FORMAT),
+             f"receipt_{receipt_id}.jpg", 3, float(rng.randint(100, 5000)), 'completed')
+            for receipt_id in range(1, receipts + 1)
+        ):
+            con.executemany(
+                "INSERT INTO receipt_logs (receipt_id, receipt_type, upload_date, file_name, total_items, total_amount, status, notes) VALUES (?, ?, ?, ?, ?, ?, ?, '')",
+                batch
+            )
+            con.executemany(
+                "INSERT INTO receipt_items (receipt_id, product_id, product_name, quantity, unit_price, total_price, action) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((row[0], pid, names[pid - 1], 2, 10.0, 20.0, 'add' if row[1] == 'purchase' else 'subtract')
+                 for row in batch for pid in (rng.randint(1, products) for _ in range(3)))
+            )
+            con.commit()
+        counts = {table: con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ('product', 'category', 'supplier', 'employee', 'transaction_logs', 'receipt_logs', 'receipt_items')}
+    finally:
+        con.close()
+
+    report(f"Writing {bills} bills")
+    os.makedirs(bill_dir, exist_ok=True)
+    step = days * 86400 / max(bills, 1)
+    for i in range(bills):
+        lines = []
+        for _ in range(rng.randint(1, 6)):
+            pid = rng.randint(1, products)
+            qty = rng.randint(1, 5)
+            lines.append((names[pid - 1], str(qty), str(qty * rng.randint(10, 2000))))
+        bill = make_bill(FIRST_INVOICE + i, "Customer", "9800000000", lines,
+                         date=(start_day + timedelta(seconds=i * step)).strftime("%d/%m/%Y"))
+        with open(os.path.join(bill_dir, f"{FIRST_INVOICE + i}.txt"), 'w') as fp:
+            fp.write(render_text(bill))
+    counts['bills'] = bills
+    return counts
+
+
+#------------------------------------------------------------------ benchmarks
+# Each takes the run context and returns (operation, operations per call)
+
+
+def bench_product_listing_cold(ctx):
+    """Product window opened in a new program: load the catalog, list every product"""
+    def op():
+        cache = CatalogCache(ctx['db'])
+        cache.refresh()
+        cache.products()
+        cache.con.close()
+    return op, 1
+
+
+def bench_product_listing(ctx):
+    """productClass.show / billClass.show with the catalog loaded"""
+    catalog = get_catalog(ctx['db'])
+
+    def op():
+        catalog.refresh()
+        catalog.products()
+        catalog.products(active_only=True)
+    return op, 1
+
+
+def bench_product_search(ctx):
+    """productClass.search / billClass.search by name, category and supplier"""
+    catalog = get_catalog(ctx['db'])
+    rng = ctx['rng']
+    terms = [('name', rng.choice(NOUNS).lower()) for _ in range(6)]
+    terms += [('name', rng.choice(catalog.names)) for _ in range(2)]
+    terms += [('Category', 'category 1'), ('Supplier', 'supplier 2')]
+
+    def op():
+        for column, text in terms:
+            catalog.products(column, text)
+    return op, len(terms)
+
+
+def bench_add_to_cart(ctx):
+    """billClass.add_update_cart and refresh_cart: look up the product, add it, total the cart"""
+    catalog = get_catalog(ctx['db'])
+    rng = ctx['rng']
+    pids = [rng.randint(1, len(catalog)) for _ in range(20)]
+
+    def op():
+        cart = []
+        for pid in pids:
+            row = catalog.product(pid)
+            if row is None:
+                continue
+            for item in cart:
+                if item[0] == str(pid):
+                    item[3] = str(int(item[3]) + 1)
+                    break
+            else:
+                cart.append([str(pid), row[3], row[4], '1', row[5]])
+            sum(float(item[2]) * int(item[3]) for item in cart)
+    return op, len(pids)
+
+
+def _in_stock(catalog, rng, count, minimum=200):
+    rows = [row for row in catalog.products(active_only=True) if int(row[5]) >= minimum]
+    return rng.sample(rows, min(count, len(rows)))
+
+
+def bench_checkout(ctx):
+    """billClass.generate_bill: sell a three-line cart (bill_middle), render and save the bill"""
+    catalog = get_catalog(ctx['db'])
+    rng = ctx['rng']
+    stock = _in_stock(catalog, rng, 300)
+    bill_dir = os.path.join(ctx['scratch'], 'bills')
+    os.makedirs(bill_dir, exist_ok=True)
+    state = {'invoice': 0}
+
+    def op():
+        for _ in range(5):
+            cart = [[str(row[0]), row[3], row[4], '1', row[5]] for row in rng.sample(stock, 3)]
+            lines = checkout_cart(cart, ctx['db'])
+            state['invoice'] += 1
+            bill = make_bill(state['invoice'], "Customer", "9800000000", lines)
+            with open(os.path.join(bill_dir, f"{state['invoice']}.txt"), 'w') as fp:
+                fp.write(render_text(bill))
+    return op, 5
+
+
+def bench_receipt_workflow(ctx):
+    """Manual receipt entry: match three products by name, add stock, write logs"""
+    catalog = get_catalog(ctx['db'])
+    rng = ctx['rng']
+    stock = _in_stock(catalog, rng, 300, minimum=0)
+    handler = ReceiptHandler(ctx['db'])
+    # The audit journal lives next to the scratch database
+    ctx['close'].append(handler.audit.close)
+
+    def op():
+        for _ in range(5):
+            items = [ReceiptItem(row[3], 1, float(row[4])) for row in rng.sample(stock, 3)]
+            result = handler.process_receipt_workflow('benchmark', manual_items=items, receipt_type_override='purchase')
+            if not result['success']:
+                raise RuntimeError(result['message'])
+        handler.audit.flush()
+    return op, 5
+
+
+def bench_dashboard_counts(ctx):
+    """IMS.refresh_tiles with every tile changed"""
+    def op():
+        con = sqlite3.connect(ctx['db'])
+        try:
+            cur = con.cursor()
+            for table in ('product', 'category', 'employee', 'supplier'):
+                cur.execute(f"select count(*) from {table}")
+                cur.fetchone()
+            len(os.listdir(ctx['bill_dir']))
+            low_stock_items(cur)
+        finally:
+            con.close()
+    return op, 1
+
+
+def bench_sales_listing(ctx):
+    """salesClass.show and search: list the bill folder, open one bill"""
+    rng = ctx['rng']
+
+    def op():
+        bills = []
+        for name in os.listdir(ctx['bill_dir']):
+            if name.split('.')[-1] == 'txt':
+                bills.append(name.split('.')[0])
+        if bills:
+            invoice = rng.choice(bills)
+            if invoice in bills:
+                with open(os.path.join(ctx['bill_dir'], f"{invoice}.txt"), 'r') as fp:
+                    fp.read()
+    return op, 1
+
+
+BENCHMARKS = {
+    'product_listing_cold': bench_product_listing_cold,
+    'product_listing': bench_product_listing,
+    'product_search': bench_product_search,
+    'add_to_cart': bench_add_to_cart,
+    'checkout': bench_checkout,
+    'receipt_workflow': bench_receipt_workflow,
+    'dashboard_counts': bench_dashboard_counts,
+    'sales_listing': bench_sales_listing,
+}
+
+
+def run(db_path, bill_dir, names=None, repeat=5, seed=42, progress=None):
+    """
+    Time the benchmarks against a copy of a generated database
+
+    Checkout and the receipt workflow write to the database, as the windows do, so
+    they run against a copy in a temporary folder - every run times the same data.
+    Bills are saved to the temporary folder too. Each timed sample calls the operation
+    as many times as timeit.autorange picks, so fast operations rise above timer noise.
+
+    Args:
+        db_path: Database built by generate
+        bill_dir: Bill folder built by generate
+        names: Benchmarks to run (default: all, in BENCHMARKS order)
+        repeat: Timed samples per benchmark
+        seed: Random seed for the inputs
+        progress: Optional callable(name, result)
+
+    Returns:
+        Dict with meta (environment and data size) and results (per benchmark ms per operation)
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"{db_path} does not exist - build it with the generate command")
+    scratch = tempfile.mkdtemp(prefix='benchmark-')
+    ctx = {'db': os.path.join(scratch, os.path.basename(db_path)), 'bill_dir': bill_dir,
+           'scratch': scratch, 'rng': random.Random(seed), 'close': []}
+    try:
+        source = sqlite3.connect(db_path)
+        copy = sqlite3.connect(ctx['db'])
+        try:
+            source.backup(copy)
+            rows = {table: copy.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ('product', 'transaction_logs', 'receipt_logs')}
+        finally:
+            copy.close()
+            source.close()
+        rows['bills'] = len(os.listdir(bill_dir))
+        meta = {
+            'created': datetime.now().strftime(TIME_FORMAT),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'rows': rows
+        }
+        results = {}
+        for name in names or BENCHMARKS:
+            op, ops = BENCHMARKS[name](ctx)
+            timer = timeit.Timer(op)
+            # autorange also warms the operation up
+            loops, _ = timer.autorange()
+            timings = [seconds * 1000 / (loops * ops) for seconds in timer.repeat(repeat, loops)]
+            results[name] = {
+                'ops': ops,
+                'loops': loops,
+                'median_ms': median(timings),
+                'mean_ms': mean(timings),
+                'min_ms': min(timings),
+                'max_ms': max(timings)
+            }
+            if progress:
+                progress(name, results[name])
+    finally:
+        for close in ctx['close']:
+            close()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {'meta': meta, 'results': results}
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare medians with a baseline run
+
+    Returns:
+        List of (name, baseline_ms, current_ms, ratio, status), status being
+        'ok', 'slower' (beyond tolerance), 'faster' or 'new'
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            rows.append((name, None, result['median_ms'], None, 'new'))
+            continue
+        ratio = result['median_ms'] / base['median_ms'] if base['median_ms'] else float('inf')
+        if ratio > 1 + tolerance:
+            status = 'slower'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, base['median_ms'], result['median_ms'], ratio, status))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic-data benchmarks for the core inventory paths")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen_parser = sub.add_parser('generate', help="Build a benchmark database and bill folder")
+    gen_parser.add_argument('--db', default='benchmark.db', help="New database file to create")
+    gen_parser.add_argument('--bill-dir', default='benchmark_bills', help="New folder for the bill files")
+    gen_parser.add_argument('--scale', choices=SCALES, default='small')
+    gen_parser.add_argument('--products', type=int, help="Override the scale's product count")
+    gen_parser.add_argument('--transactions', type=int, help="Override the scale's transaction_logs rows")
+    gen_parser.add_argument('--receipts', type=int, help="Override the scale's receipt count")
+    gen_parser.add_argument('--bills', type=int, help="Override the scale's bill count")
+    gen_parser.add_argument('--seed', type=int, default=42)
+
+    run_parser = sub.add_parser('run', help="Time the benchmarks and write JSON results")
+    run_parser.add_argument('--db', default='benchmark.db', help="Database built by generate")
+    run_parser.add_argument('--bill-dir', default='benchmark_bills', help="Bill folder built by generate")
+    run_parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help="Benchmarks to run")
+    run_parser.add_argument('--repeat', type=int, default=5, help="Timed samples per benchmark")
+    run_parser.add_argument('--out', help="Write the results to this JSON file")
+    run_parser.add_argument('--baseline', help="Results JSON of an earlier run to compare with")
+    run_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown, 0.25 = 25%%")
+    run_parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        scale = dict(SCALES[args.scale])
+        for key in scale:
+            if getattr(args, key) is not None:
+                scale[key] = getattr(args, key)
+        start = time.perf_counter()
+        counts = generate(args.db, args.bill_dir, seed=args.seed, progress=print, **scale)
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+        print(f"Generated in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fp:
+            baseline = json.load(fp)
+    results = run(
+        args.db, args.bill_dir, args.only, args.repeat, args.seed,
+        progress=lambda name, result: print(f"{name:22} {result['median_ms']:10.3f} ms  (min {result['min_ms']:.3f}, max {result['max_ms']:.3f})")
+    )
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as fp:
+            json.dump(results, fp, indent=2)
+        print(f"Results written to {args.out}")
+    if baseline is None:
+        return 0
+
+    if baseline.get('meta', {}).get('rows') != results['meta']['rows']:
+        print("Warning: the baseline was taken on a different data size")
+    print(f"\n{'Benchmark':22} {'Baseline ms':>12} {'Now ms':>10} {'Ratio':>7}")
+    regressions = 0
+    for name, base, now, ratio, status in compare(results, baseline, args.tolerance):
+        if status == 'new':
+            print(f"{name:22} {'-':>12} {now:10.3f} {'-':>7}  new")
+            continue
+        print(f"{name:22} {base:12.3f} {now:10.3f} {ratio:7.2f}  {status}")
+        regressions += status == 'slower'
+    print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Bill Export Module
+Exports the saved bills of a date or invoice range into one PDF (a page per bill), one
+text file or a zip archive. Bills are streamed one at a time through generators; only
+a compact (day, invoice) index of the selected bills is held, to order them by date.
+"""
+
+import os
+import re
+import sys
+import time
+import zipfile
+import argparse
+from array import array
+from datetime import datetime
+from bill_render import PdfWriter
+
+# Folder billing.py saves bills to
+DEFAULT_BILL_DIR = 'Inventory-Management-System/bill'
+FORMATS = ('pdf', 'text', 'zip')
+EXTENSIONS = {'pdf': '.pdf', 'text': '.txt', 'zip': '.zip'}
+# Bills in the text file are separated by a form feed, so printing it starts each on a new page
+TEXT_SEPARATOR = "\f\n"
+BILL_DATE = re.compile(r"Date:\s*(\d{1,2})/(\d{1,2})/(\d{4})")
+# The date is in the bill header
+HEAD_BYTES = 1024
+# Index keys are day * INVOICE_SPAN + invoice, e.g. 20240131 * 10**10 + 12345678
+INVOICE_SPAN = 10 ** 10
+
+
+def bill_day(path):
+    """
+    Day a saved bill was issued, from its 'Date: DD/MM/YYYY' header
+
+    Returns:
+        'YYYY-MM-DD', or None if the file has no date
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as fp:
+        match = BILL_DATE.search(fp.read(HEAD_BYTES))
+    if not match:
+        return None
+    day, month, year = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def parse_day(text):
+    """
+    Check a day given by the user
+
+    Args:
+        text: Day 'YYYY-MM-DD' (leading zeros may be left out)
+
+    Returns:
+        'YYYY-MM-DD'
+
+    Raises:
+        ValueError: text is not a valid day
+    """
+    try:
+        return datetime.strptime(text.strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"'{text}' is not a valid date - use YYYY-MM-DD") from None
+
+
+def _day_number(day):
+    return int(day.replace('-', '')) if day else 0
+
+
+def select_bills(bill_dir, date_from=None, date_to=None, invoice_from=None, invoice_to=None):
+    """
+    Bills in the ranges, ordered by day and invoice number
+
+    Invoice ranges are checked on the file name alone; only bills inside them
+    have their header read for the date.
+
+    Args:
+        bill_dir: Folder of saved bills (<invoice>.txt)
+        date_from: First day 'YYYY-MM-DD' (inclusive) or None
+        date_to: Last day 'YYYY-MM-DD' (inclusive) or None
+        invoice_from: Lowest invoice number or None
+        invoice_to: Highest invoice number or None
+
+    Yields:
+        (day 'YYYY-MM-DD' or None, invoice)
+    """
+    low, high = _day_number(date_from), _day_number(date_to)
+    keys = array('q')
+    with os.scandir(bill_dir) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext != '.txt' or not stem.isdigit() or not entry.is_file():
+                continue
+            invoice = int(stem)
+            if invoice >= INVOICE_SPAN:
+                continue
+            if (invoice_from is not None and invoice < invoice_from) or (invoice_to is not None and invoice > invoice_to):
+                continue
+            # The date is needed for ordering even without a date range - invoice
+            # numbers are not chronological
+            day = _day_number(bill_day(entry.path))
+            if (low and day < low) or (high and day > high):
+                continue
+            keys.append(day * INVOICE_SPAN + invoice)
+    for key in sorted(keys):
+        day, invoice = divmod(key, INVOICE_SPAN)
+        yield (f"{day // 10000:04d}-{day // 100 % 100:02d}-{day % 100:02d}" if day else None), invoice
+
+
+def read_bills(bill_dir, selected):
+    """
+    Yields:
+        (invoice, day, text) for each selected bill, read one at a time
+    """
+    for day, invoice in selected:
+        with open(os.path.join(bill_dir, f"{invoice}.txt"), 'r', encoding='utf-8', errors='replace') as fp:
+            yield invoice, day, fp.read()
+
+
+def write_pdf(bills, fp):
+    """Write bills to a binary file as one PDF, each bill starting on a new page"""
+    writer = PdfWriter(fp)
+    for _, _, text in bills:
+        writer.add_page(text.split("\n"))
+        yield
+    writer.close()
+
+
+def write_text(bills, fp):
+    """Write bills to a text file one after another"""
+    first = True
+    for _, _, text in bills:
+        if not first:
+            fp.write(TEXT_SEPARATOR)
+        fp.write(text)
+        first = False
+        yield
+
+
+def write_zip(bill_dir, selected, path):
+    """Copy bill files into a zip archive - their contents are streamed, never read whole"""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for day, invoice in selected:
+            name = f"{invoice}.txt"
+            archive.write(os.path.join(bill_dir, name), f"{day or 'undated'}/{name}")
+            yield
+
+
+def export_bills(bill_dir, out_path, fmt='pdf', date_from=None, date_to=None,
+                 invoice_from=None, invoice_to=None, progress=None):
+    """
+    Export the bills in the ranges to one file
+
+    Args:
+        bill_dir: Folder of saved bills
+        out_path: Output file path
+        fmt: 'pdf', 'text' or 'zip'
+        date_from: First day 'YYYY-MM-DD' (inclusive) or None
+        date_to: Last day 'YYYY-MM-DD' (inclusive) or None
+        invoice_from: Lowest invoice number or None
+        invoice_to: Highest invoice number or None
+        progress: Optional callable(bills_written), called every 100 bills
+
+    Returns:
+        Number of bills exported
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    date_from = parse_day(date_from) if date_from else None
+    date_to = parse_day(date_to) if date_to else None
+    selected = select_bills(bill_dir, date_from, date_to, invoice_from, invoice_to)
+    tmp_path = out_path + '.part'
+    written = 0
+    try:
+        if fmt == 'zip':
+            steps = write_zip(bill_dir, selected, tmp_path)
+            for _ in steps:
+                written += 1
+                if progress and written % 100 == 0:
+                    progress(written)
+        else:
+            mode, encoding = ('wb', None) if fmt == 'pdf' else ('w', 'utf-8')
+            with open(tmp_path, mode, encoding=encoding) as fp:
+                writer = write_pdf if fmt == 'pdf' else write_text
+                for _ in writer(read_bills(bill_dir, selected), fp):
+                    written += 1
+                    if progress and written % 100 == 0:
+                        progress(written)
+        # Only a complete export replaces the output file
+        os.replace(tmp_path, out_path)
+        if progress:
+            progress(written)
+        return written
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export saved bills of a date or invoice range into one file")
+    parser.add_argument('--bill-dir', default=DEFAULT_BILL_DIR, help="Folder of saved bills")
+    parser.add_argument('--format', choices=FORMATS, default='pdf')
+    parser.add_argument('--out', help="Output file (default: bills.<format extension>)")
+    parser.add_argument('--from', dest='date_from', help="First day YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="Last day YYYY-MM-DD")
+    parser.add_argument('--invoice-from', type=int, help="Lowest invoice number")
+    parser.add_argument('--invoice-to', type=int, help="Highest invoice number")
+    args = parser.parse_args(argv)
+
+    out = args.out or f"bills{EXTENSIONS[args.format]}"
+    start = time.perf_counter()
+    try:
+        count = export_bills(
+            args.bill_dir, out, args.format, args.date_from, args.date_to,
+            args.invoice_from, args.invoice_to
+        )
+    except (ValueError, OSError) as ex:
+        print(f"Error: {str(ex)}")
+        return 1
+    print(f"{count} bills -> {out} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
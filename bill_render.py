@@ -0,0 +1,233 @@
+"""
+Bill Render Module
+Pure functions turning invoice data into a bill as text (the layout saved to the bill
+folder), ESC/POS bytes for receipt printers or PDF. PdfWriter streams pages to a file,
+so any number of bills can go into one PDF.
+"""
+
+import io
+import time
+from array import array
+from checkout import DISCOUNT_PERCENT
+
+SHOP_NAME = "XYZ-Inventory"
+SHOP_PHONE = "9899459288 , Delhi-110053"
+RULE = "=" * 46
+
+# ESC/POS commands
+ESC_INIT = b"\x1b@"
+ESC_ALIGN_LEFT = b"\x1ba\x00"
+ESC_ALIGN_CENTER = b"\x1ba\x01"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+ESC_DOUBLE_SIZE = b"\x1d!\x11"
+ESC_NORMAL_SIZE = b"\x1d!\x00"
+ESC_FEED_CUT = b"\x1dVB\x03"
+# Characters per line on an 80 mm printer in font A with margins; 58 mm printers take 32
+ESCPOS_WIDTH = 42
+
+PDF_PAGE_SIZE = (595, 842)
+PDF_FONT_SIZE = 10
+PDF_MARGIN = 40
+
+
+def make_bill(invoice, customer, contact, lines, discount_percent=DISCOUNT_PERCENT, date=None):
+    """
+    Invoice data with its totals
+
+    Args:
+        invoice: Bill number
+        customer: Customer name
+        contact: Customer phone number
+        lines: (name, qty, amount) string tuples from checkout_cart
+        discount_percent: Bill discount
+        date: 'DD/MM/YYYY' (default: today)
+
+    Returns:
+        Dict with invoice, customer, contact, date, lines, bill_amount, discount and net_pay
+    """
+    bill_amount = sum(float(amount) for _, _, amount in lines)
+    discount = (bill_amount * discount_percent) / 100
+    return {
+        'invoice': invoice,
+        'customer': customer,
+        'contact': contact,
+        'date': date or time.strftime("%d/%m/%Y"),
+        'lines': list(lines),
+        'bill_amount': bill_amount,
+        'discount': discount,
+        'net_pay': bill_amount - discount
+    }
+
+
+def render_text(bill):
+    """
+    Bill in the layout shown in the billing window and saved to the bill folder
+
+    Returns:
+        str
+    """
+    parts = [
+        f"\n\t\t{SHOP_NAME}\n\t Phone No. {SHOP_PHONE}\n{RULE}\n"
+        f" Customer Name: {bill['customer']}\n Ph. no. : {bill['contact']}\n"
+        f" Bill No. {bill['invoice']}\t\t\tDate: {bill['date']}\n{RULE}\n"
+        f" Product Name\t\t\tQTY\tPrice\n{RULE}\n"
+    ]
+    for name, qty, amount in bill['lines']:
+        parts.append(f"\n {name}\t\t\t{qty}\tRs.{amount}")
+    parts.append(
+        f"\n{RULE}\n Bill Amount\t\t\t\tRs.{bill['bill_amount']}\n"
+        f" Discount\t\t\t\tRs.{bill['discount']}\n"
+        f" Net Pay\t\t\t\tRs.{bill['net_pay']}\n{RULE}\n\n"
+    )
+    return "".join(parts)
+
+
+def render_escpos(bill, width=ESCPOS_WIDTH, encoding='cp437'):
+    """
+    Bill as an ESC/POS job for a receipt printer, ending with a paper cut
+
+    Args:
+        bill: Dict from make_bill
+        width: Characters per line
+        encoding: Code page the printer is set to
+
+    Returns:
+        bytes
+    """
+    rule = "-" * width
+    name_width = width - 16
+
+    def row(left, right):
+        return f"{left[:width - len(right) - 1]:<{width - len(right)}}{right}\n"
+
+    body = [
+        rule + "\n",
+        f"Customer: {bill['customer']}"[:width] + "\n",
+        f"Ph. no.: {bill['contact']}"[:width] + "\n",
+        row(f"Bill No. {bill['invoice']}", bill['date']),
+        rule + "\n",
+        f"{'Product':<{name_width}}{'QTY':>6}{'Price':>10}\n",
+        rule + "\n",
+    ]
+    for name, qty, amount in bill['lines']:
+        body.append(f"{name[:name_width]:<{name_width}}{qty:>6}{amount:>10}\n")
+    body += [
+        rule + "\n",
+        row("Bill Amount", f"Rs.{bill['bill_amount']}"),
+        row("Discount", f"Rs.{bill['discount']}"),
+    ]
+    return b"".join((
+        ESC_INIT, ESC_ALIGN_CENTER, ESC_BOLD_ON, ESC_DOUBLE_SIZE,
+        SHOP_NAME.encode(encoding, 'replace'), b"\n",
+        ESC_NORMAL_SIZE, ESC_BOLD_OFF,
+        f"Phone No. {SHOP_PHONE}\n".encode(encoding, 'replace'),
+        ESC_ALIGN_LEFT,
+        "".join(body).encode(encoding, 'replace'),
+        ESC_BOLD_ON, row("Net Pay", f"Rs.{bill['net_pay']}").encode(encoding, 'replace'), ESC_BOLD_OFF,
+        (rule + "\n").encode(encoding, 'replace'),
+        ESC_FEED_CUT
+    ))
+
+
+def _pdf_string(text):
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode('latin-1', 'replace')
+
+
+class PdfWriter:
+    """
+    Writes a PDF to a binary file page by page
+
+    Pages are written as they are added; only the byte offset of each object is
+    kept, so memory stays small however many pages are written.
+    """
+
+    def __init__(self, fileobj, page_size=PDF_PAGE_SIZE, font_size=PDF_FONT_SIZE, margin=PDF_MARGIN):
+        """
+        Start the PDF
+
+        Args:
+            fileobj: Binary file opened for writing
+            page_size: (width, height) in points
+            font_size: Courier size in points
+            margin: Page margin in points
+        """
+        self.file = fileobj
+        self.page_size = page_size
+        self.font_size = font_size
+        self.margin = margin
+        self.leading = font_size * 1.2
+        self.lines_per_page = int((page_size[1] - 2 * margin) // self.leading)
+        self.position = 0
+        # offsets[n - 1] is where object n starts; 1 is the catalog and 2 the page tree, written last
+        self.offsets = array('Q', [0, 0])
+        self.page_ids = array('I')
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.font_id = self._add_object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+
+    def _write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    def _add_object(self, body, number=None):
+        if number is None:
+            self.offsets.append(0)
+            number = len(self.offsets)
+        self.offsets[number - 1] = self.position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        return number
+
+    def add_page(self, lines):
+        """
+        Add text lines (tabs are expanded), continuing on new pages as needed
+
+        Args:
+            lines: Lines of text
+        """
+        lines = [line.expandtabs(8) for line in lines]
+        for start in range(0, max(len(lines), 1), self.lines_per_page):
+            content = [b"BT /F1 %d Tf %.1f TL %d %d Td" % (
+                self.font_size, self.leading, self.margin, self.page_size[1] - self.margin - self.font_size
+            )]
+            for line in lines[start:start + self.lines_per_page]:
+                content.append(b"(" + _pdf_string(line) + b") Tj T*")
+            content.append(b"ET")
+            stream = b"\n".join(content)
+            content_id = self._add_object(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            self.page_ids.append(self._add_object(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R /Resources << /Font << /F1 %d 0 R >> >> >>"
+                % (self.page_size[0], self.page_size[1], content_id, self.font_id)
+            ))
+
+    def close(self):
+        """Write the page tree, catalog and cross-reference table - the file itself is left open"""
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._add_object(b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self.page_ids), 2)
+        self._add_object(b"<< /Type /Catalog /Pages 2 0 R >>", 1)
+        xref = self.position
+        entries = [b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1)]
+        entries.extend(b"%010d 00000 n \n" % offset for offset in self.offsets)
+        entries.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self.offsets) + 1, xref))
+        self._write(b"".join(entries))
+
+
+def render_pdf(bill):
+    """
+    Bill as a one-bill PDF in the text layout
+
+    Returns:
+        bytes
+    """
+    out = io.BytesIO()
+    writer = PdfWriter(out)
+    writer.add_page(render_text(bill).split("\n"))
+    writer.close()
+    return out.getvalue()
+
+
+RENDERERS = {
+    'text': lambda bill: render_text(bill).encode('utf-8'),
+    'escpos': render_escpos,
+    'pdf': render_pdf,
+}
@@ -1,10 +1,14 @@
 from tkinter import*
 from PIL import Image,ImageTk
 from tkinter import ttk,messagebox
-import sqlite3
 import time
-import os
-import tempfile
+from checkout import checkout_cart
+from bill_render import make_bill,render_text
+from print_spooler import get_print_spooler
+from create_db import ensure_db
+from change_bus import get_bus
+from catalog_cache import get_catalog
+from event_watchdog import get_watchdog
 
 class billClass:
     def __init__(self,root):
@@ -15,6 +19,8 @@ class billClass:
         self.root.config(bg="white")
         self.cart_list=[]
         self.chk_print=0
+        self.search_filter=None
+        ensure_db()
 
         #------------- title --------------
         self.icon_title=PhotoImage(file="images/logo1.png")
@@ -209,8 +215,9 @@ class billClass:
         btn_generate.place(x=246,y=80,width=160,height=50)
 
         self.show()
-        #self.bill_top()
         self.update_date_time()
+        #------- follow product changes made in other windows and tills --------
+        get_bus(self.root).subscribe(self.root,("product",),self.refresh_products)
 #---------------------- all functions ------------------------------
     def get_input(self,num):
         xnum=self.var_cal_input.get()+str(num)
@@ -224,35 +231,65 @@ class billClass:
         self.var_cal_input.set(eval(result))
 
     def show(self):
-        con=sqlite3.connect(database=r'ims.db')
-        cur=con.cursor()
+        self.search_filter=None
         try:
-            cur.execute("select pid,name,price,qty,status from product where status='Active'")
-            rows=cur.fetchall()
+            rows=get_catalog().products(active_only=True)
             self.product_Table.delete(*self.product_Table.get_children())
             for row in rows:
-                self.product_Table.insert('',END,values=row)
+                self.product_Table.insert('',END,values=(row[0],row[3],row[4],row[5],row[6]))
         except Exception as ex:
             messagebox.showerror("Error",f"Error due to : {str(ex)}")
 
     def search(self):
-        con=sqlite3.connect(database=r'ims.db')
-        cur=con.cursor()
         try:
             if self.var_search.get()=="":
                 messagebox.showerror("Error","Search input should be required",parent=self.root)
             else:
-                cur.execute("select pid,name,price,qty,status from product where name LIKE '%"+self.var_search.get()+"%'")
-                rows=cur.fetchall()
+                rows=get_catalog().products('name',self.var_search.get())
                 if len(rows)!=0:
+                    self.search_filter=self.var_search.get()
                     self.product_Table.delete(*self.product_Table.get_children())
                     for row in rows:
-                        self.product_Table.insert('',END,values=row)
+                        self.product_Table.insert('',END,values=(row[0],row[3],row[4],row[5],row[6]))
                 else:
                     messagebox.showerror("Error","No record found!!!",parent=self.root)
         except Exception as ex:
             messagebox.showerror("Error",f"Error due to : {str(ex)}")
 
+    def refresh_products(self,changed):
+        #------- reload the list as it is shown (all or searched) and the cart's prices and stock --------
+        if self.search_filter==None:
+            self.show()
+        else:
+            rows=get_catalog().products('name',self.search_filter)
+            self.product_Table.delete(*self.product_Table.get_children())
+            for row in rows:
+                self.product_Table.insert('',END,values=(row[0],row[3],row[4],row[5],row[6]))
+        self.refresh_cart()
+
+    def refresh_cart(self):
+        pids=[row[0] for row in self.cart_list]
+        if self.var_pid.get()!="":
+            pids.append(self.var_pid.get())
+        if len(pids)==0:
+            return
+        catalog=get_catalog()
+        current={}
+        for pid in pids:
+            row=catalog.product(pid)
+            if row!=None:
+                current[str(pid)]=(row[4],row[5])
+        for row in self.cart_list:
+            if str(row[0]) in current:
+                row[2],row[4]=current[str(row[0])]
+        if self.var_pid.get() in current:
+            price,qty=current[self.var_pid.get()]
+            self.var_price.set(price)
+            self.var_stock.set(qty)
+            self.lbl_inStock.config(text=f"In Stock [{str(qty)}]")
+        self.show_cart()
+        self.bill_update()
+
     def get_data(self,ev):
         f=self.product_Table.focus()
         content=(self.product_Table.item(f))
@@ -334,71 +371,38 @@ class billClass:
         elif len(self.cart_list)==0:
             messagebox.showerror("Error",f"Please Add product to the Cart!!!",parent=self.root)
         else:
-            #--------- bill top -----------------
-            self.bill_top()
-            #--------- bill middle --------------
-            self.bill_middle()
-            #--------- bill bottom --------------
-            self.bill_bottom()
+            self.invoice=int(time.strftime("%H%M%S"))+int(time.strftime("%d%m%Y"))
+            #--------- sell the cart --------------
+            lines=self.bill_middle()
+            if lines==None:
+                return
+            #--------- render the bill --------------
+            self.bill=make_bill(self.invoice,self.var_cname.get(),self.var_contact.get(),lines)
+            bill_text=render_text(self.bill)
+            self.txt_bill_area.delete('1.0',END)
+            self.txt_bill_area.insert('1.0',bill_text)
 
             fp=open(f'Inventory-Management-System/bill/{str(self.invoice)}.txt','w')
-            fp.write(self.txt_bill_area.get('1.0',END))
+            fp.write(bill_text)
             fp.close()
             messagebox.showinfo("Saved","Bill has been generated",parent=self.root)
             self.chk_print=1
 
-    def bill_top(self):
-        self.invoice=int(time.strftime("%H%M%S"))+int(time.strftime("%d%m%Y"))
-        bill_top_temp=f'''
-\t\tXYZ-Inventory
-\t Phone No. 9899459288 , Delhi-110053
-{str("="*46)}
- Customer Name: {self.var_cname.get()}
- Ph. no. : {self.var_contact.get()}
- Bill No. {str(self.invoice)}\t\t\tDate: {str(time.strftime("%d/%m/%Y"))}
-{str("="*46)}
- Product Name\t\t\tQTY\tPrice
-{str("="*46)}
-'''
-        self.txt_bill_area.delete('1.0',END)
-        self.txt_bill_area.insert('1.0',bill_top_temp)
-
-    def bill_bottom(self):
-        bill_bottom_temp=f'''
-{str("="*46)}
- Bill Amount\t\t\t\tRs.{self.bill_amnt}
- Discount\t\t\t\tRs.{self.discount}
- Net Pay\t\t\t\tRs.{self.net_pay}
-{str("="*46)}\n
-'''
-        self.txt_bill_area.insert(END,bill_bottom_temp)
-
     def bill_middle(self):
-        con=sqlite3.connect(database=r'ims.db')
-        cur=con.cursor()
         try:
-            for row in self.cart_list:
-                pid=row[0]
-                name=row[1]
-                qty=int(row[4])-int(row[3])
-                if int(row[3])==int(row[4]):
-                    status="Inactive"
-                if int(row[3])!=int(row[4]):
-                    status="Active"
-                price=float(row[2])*int(row[3])
-                price=str(price)
-                self.txt_bill_area.insert(END,"\n "+name+"\t\t\t"+row[3]+"\tRs."+price)
-                #------------- update qty in product table --------------
-                cur.execute("update product set qty=?,status=? where pid=?",(
-                    qty,
-                    status,
-                    pid
-                ))
-                con.commit()
-            con.close()
+            #------------- update stock and sales rollups in one transaction --------------
+            lines=checkout_cart(self.cart_list)
+            self.show()
+            return lines
+        except ValueError as ex:
+            #------- another till sold the stock since it was added to the cart --------
+            self.txt_bill_area.delete('1.0',END)
             self.show()
+            messagebox.showerror("Error",f"{str(ex)}. Please update the cart",parent=self.root)
         except Exception as ex:
+            self.txt_bill_area.delete('1.0',END)
             messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
+        return None
 
     def clear_cart(self):
         self.var_pid.set("")
@@ -428,14 +432,33 @@ class billClass:
 
     def print_bill(self):
         if self.chk_print==1:
-            messagebox.showinfo("Print","Please wait while printing",parent=self.root)
-            new_file=tempfile.mktemp('.txt')
-            open(new_file,'w').write(self.txt_bill_area.get('1.0',END))
-            os.startfile(new_file,'print')
+            #------- the spooler thread prints, so the till can go on with the next bill --------
+            try:
+                spooler=get_print_spooler()
+                if not spooler.printer:
+                    messagebox.showerror("Error","No printer found - set IMS_PRINTER to the printer command",parent=self.root)
+                    return
+                job=spooler.print_bill(self.bill)
+                messagebox.showinfo("Print","Bill queued for the printer",parent=self.root)
+                self.root.after(500,self.check_print,job)
+            except Exception as ex:
+                messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
         else:
             messagebox.showinfo("Print","Please generate bill to print the receipt",parent=self.root)
 
+    def check_print(self,job):
+        #------- wait for the spooler on the Tk thread and report a job the printer did not take --------
+        if not self.root.winfo_exists():
+            return
+        if not job.done():
+            self.root.after(500,self.check_print,job)
+            return
+        ex=job.exception()
+        if ex is not None:
+            messagebox.showerror("Error",f"Printing failed : {str(ex)}",parent=self.root)
+
 if __name__=="__main__":
     root=Tk()
+    get_watchdog(root)
     obj=billClass(root)
     root.mainloop()
\ No newline at end of file
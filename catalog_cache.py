@@ -0,0 +1,300 @@
+"""
+Catalog Cache Module
+Process-wide in-memory copy of the product, category and supplier tables. Products are
+kept column-wise in arrays (text columns that repeat, like category, as codes), so hundreds
+of thousands of products take a few tens of MB. The copy is checked against the table_versions
+counters on each use; only products listed in product_changes since the last load are re-read.
+"""
+
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from create_db import ensure_db
+
+CATALOG_TABLES = ('product', 'category', 'supplier')
+# Above this share of changed products a full reload is cheaper than patching
+FULL_RELOAD_FRACTION = 0.25
+# Columns of product in table order, as returned by "select * from product"
+PRODUCT_COLUMNS = ('pid', 'Category', 'Supplier', 'name', 'price', 'qty', 'status')
+SEARCH_COLUMNS = ('Category', 'Supplier', 'name')
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _qty(value):
+    # Like CAST(qty AS INTEGER) - text that is not a number counts as 0
+    try:
+        return int(value or 0)
+    except ValueError:
+        return 0
+
+
+class _Codes:
+    """Repeating text values stored once and referred to by number"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class CatalogCache:
+    def __init__(self, db_path='ims.db'):
+        """
+        Initialize the cache - nothing is loaded until the first refresh
+
+        Args:
+            db_path: Path to the SQLite database
+        """
+        self.db_path = db_path
+        ensure_db(db_path)
+        # Shared by the threads using the cache, always under self.lock
+        self.con = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.RLock()
+        self.data_version = None
+        self.versions = {}
+        self.categories = []
+        self.suppliers = []
+        self._clear_products()
+
+    def _clear_products(self):
+        self.pids = array('q')
+        self.qtys = array('q')
+        self.category_codes = array('I')
+        self.supplier_codes = array('I')
+        self.status_codes = array('B')
+        self.names = []
+        self.prices = []
+        self.texts = _Codes()
+        self.statuses = _Codes()
+        self._search_text = None
+        self._search_starts = None
+
+    def refresh(self):
+        """
+        Bring the cache up to date if another connection committed since the last check
+
+        Returns:
+            True if anything was reloaded
+        """
+        with self.lock:
+            data_version = self.con.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self.data_version:
+                return False
+            self.con.execute("BEGIN")
+            try:
+                versions = dict(self.con.execute(
+                    f"SELECT name, version FROM table_versions WHERE name IN ({','.join('?' * len(CATALOG_TABLES))})",
+                    CATALOG_TABLES
+                ))
+                changed = [table for table in CATALOG_TABLES if versions.get(table) != self.versions.get(table)]
+                if 'category' in changed:
+                    self.categories = self.con.execute("SELECT cid, name FROM category").fetchall()
+                if 'supplier' in changed:
+                    self.suppliers = self.con.execute("SELECT invoice, name FROM supplier").fetchall()
+                if 'product' in changed:
+                    self._refresh_products(self.versions.get('product'))
+            finally:
+                self.con.execute("COMMIT")
+            self.versions = versions
+            self.data_version = data_version
+            return bool(changed)
+
+    def _refresh_products(self, since):
+        if since is not None:
+            # Changes are stamped with the product version current when they were made, never
+            # lower than the version we loaded at - re-reading an already loaded product is harmless
+            rows = self.con.execute(
+                """SELECT c.pid, p.pid, p.Category, p.Supplier, p.name, p.price, p.qty, p.status
+                FROM product_changes c LEFT JOIN product p ON p.pid=c.pid
+                WHERE c.version>=? ORDER BY c.pid""",
+                (since,)
+            ).fetchall()
+            if len(rows) <= len(self.pids) * FULL_RELOAD_FRACTION:
+                for row in rows:
+                    self._apply(row[0], row[1:] if row[1] is not None else None)
+                return
+        self._clear_products()
+        for row in self.con.execute("SELECT pid, Category, Supplier, name, price, qty, status FROM product ORDER BY pid"):
+            self._append(row)
+
+    def _append(self, row):
+        pid, category, supplier, name, price, qty, status = row
+        self.pids.append(pid)
+        self.category_codes.append(self.texts.code(category))
+        self.supplier_codes.append(self.texts.code(supplier))
+        self.names.append(name)
+        # Prices repeat a lot - keep one string per distinct price
+        self.prices.append(self.texts.values[self.texts.code(price)])
+        self.qtys.append(_qty(qty))
+        self.status_codes.append(self.statuses.code(status))
+        self._search_text = None
+
+    def _apply(self, pid, row):
+        """Insert, update or (row None) remove one product"""
+        index = bisect_left(self.pids, pid)
+        found = index < len(self.pids) and self.pids[index] == pid
+        if row is None:
+            if found:
+                for column in (self.pids, self.qtys, self.category_codes, self.supplier_codes,
+                               self.status_codes, self.names, self.prices):
+                    del column[index]
+                self._search_text = None
+            return
+        if not found:
+            if index == len(self.pids):
+                self._append(row)
+                return
+            # New product below the highest id - rare, so shifting the arrays is fine
+            for column, value in ((self.pids, 0), (self.qtys, 0), (self.category_codes, 0), (self.supplier_codes, 0),
+                                  (self.status_codes, 0), (self.names, ''), (self.prices, '')):
+                column.insert(index, value)
+            self.pids[index] = pid
+        _, category, supplier, name, price, qty, status = row
+        self.category_codes[index] = self.texts.code(category)
+        self.supplier_codes[index] = self.texts.code(supplier)
+        if self.names[index] != name:
+            self.names[index] = name
+            self._search_text = None
+        self.prices[index] = self.texts.values[self.texts.code(price)]
+        self.qtys[index] = _qty(qty)
+        self.status_codes[index] = self.statuses.code(status)
+        if not found:
+            self._search_text = None
+
+    def _row(self, index):
+        return (
+            self.pids[index],
+            self.texts.values[self.category_codes[index]],
+            self.texts.values[self.supplier_codes[index]],
+            self.names[index],
+            self.prices[index],
+            str(self.qtys[index]),
+            self.statuses.values[self.status_codes[index]]
+        )
+
+    def __len__(self):
+        return len(self.pids)
+
+    def category_names(self):
+        """Category names in id order"""
+        with self.lock:
+            return [name for _, name in self.categories]
+
+    def supplier_names(self):
+        """Supplier names in id order"""
+        with self.lock:
+            return [name for _, name in self.suppliers]
+
+    def product(self, pid):
+        """
+        Product by id
+
+        Returns:
+            Tuple in PRODUCT_COLUMNS order, or None
+        """
+        with self.lock:
+            index = bisect_left(self.pids, int(pid))
+            if index < len(self.pids) and self.pids[index] == int(pid):
+                return self._row(index)
+            return None
+
+    def _search_index(self):
+        # All names lower-cased in one string, so substring search runs at C speed;
+        # starts[i] is where product i's name begins
+        if self._search_text is None:
+            starts = array('I')
+            position = 1
+            for name in self.names:
+                starts.append(position)
+                position += len(name or '') + 1
+            self._search_text = "\n" + "\n".join((name or '').lower() for name in self.names) + "\n"
+            self._search_starts = starts
+        return self._search_text, self._search_starts
+
+    def _name_matches(self, text):
+        """Indexes of products whose name contains text (case-insensitive substring), in id order"""
+        text = text.lower()
+        if "\n" in text:
+            return
+        search_text, starts = self._search_index()
+        position = search_text.find(text, 1)
+        while position != -1:
+            index = bisect_right(starts, position) - 1
+            yield index
+            # Continue after this name, so each product is reported once
+            next_start = starts[index + 1] if index + 1 < len(starts) else len(search_text)
+            position = search_text.find(text, next_start)
+
+    def find_product(self, name):
+        """
+        First product (lowest id) whose name contains name, ignoring case
+
+        A plain substring match - unlike LIKE, '%' and '_' in name only match themselves.
+
+        Returns:
+            Tuple in PRODUCT_COLUMNS order, or None
+        """
+        with self.lock:
+            for index in self._name_matches(name):
+                return self._row(index)
+            return None
+
+    def products(self, column=None, text=None, active_only=False):
+        """
+        Products in id order, optionally those whose column contains text
+
+        Args:
+            column: One of SEARCH_COLUMNS (any case)
+            text: Text the column must contain (case-insensitive)
+            active_only: Only products with status 'Active'
+
+        Returns:
+            List of tuples in PRODUCT_COLUMNS order
+        """
+        if column is not None:
+            # Column names are case-insensitive, as in SQL
+            column = {name.lower(): name for name in SEARCH_COLUMNS}.get(column.lower(), column)
+        with self.lock:
+            if column is None or text is None:
+                indexes = range(len(self.pids))
+            elif column == 'name':
+                indexes = self._name_matches(text)
+            elif column in ('Category', 'Supplier'):
+                codes = self.category_codes if column == 'Category' else self.supplier_codes
+                text = text.lower()
+                matching = {code for code, value in enumerate(self.texts.values) if text in str(value or '').lower()}
+                indexes = [index for index, code in enumerate(codes) if code in matching]
+            else:
+                raise ValueError(f"Cannot search products by '{column}'. Choose from: {', '.join(SEARCH_COLUMNS)}")
+            active = self.statuses.codes.get('Active')
+            return [
+                self._row(index) for index in indexes
+                if not active_only or self.status_codes[index] == active
+            ]
+
+
+def get_catalog(db_path='ims.db'):
+    """
+    The process-wide catalog cache for db_path, brought up to date
+
+    Args:
+        db_path: Path to the SQLite database
+
+    Returns:
+        CatalogCache
+    """
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = CatalogCache(db_path)
+    cache.refresh()
+    return cache
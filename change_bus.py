@@ -0,0 +1,139 @@
+"""
+Change Bus Module
+Tells open windows which tables changed. PRAGMA data_version shows cheaply whether any
+other connection committed; only then are the per-table counters in table_versions
+(bumped by triggers, see create_db) read to find out which tables it touched.
+"""
+
+import os
+import sqlite3
+from tkinter import TclError
+
+# Tables with version triggers in create_db
+WATCHED_TABLES = ('product', 'category', 'supplier', 'employee', 'receipt_logs', 'low_stock')
+DEFAULT_INTERVAL_MS = 250
+
+_buses = {}
+
+
+class ChangeBus:
+    def __init__(self, db_path='ims.db'):
+        """
+        Initialize the bus
+
+        Args:
+            db_path: Path to the SQLite database
+        """
+        self.db_path = db_path
+        self.con = sqlite3.connect(db_path)
+        self.data_version = None
+        self.versions = self._read_versions()
+        self.folders = {}
+        self.subscribers = []
+        self.scheduled = None
+
+    def _read_versions(self):
+        self.data_version = self.con.execute("PRAGMA data_version").fetchone()[0]
+        return dict(self.con.execute("SELECT name, version FROM table_versions"))
+
+    def watch_folder(self, name, path):
+        """
+        Also publish name whenever files are added to or removed from a folder
+
+        Args:
+            name: Event name, e.g. 'bills'
+            path: Folder to watch
+        """
+        self.folders[name] = (path, self._mtime(path))
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def subscribe(self, widget, tables, callback):
+        """
+        Call callback(changed) on the Tk thread when any of tables changes
+
+        Subscriptions end by themselves once widget is destroyed.
+
+        Args:
+            widget: Widget whose lifetime the subscription follows
+            tables: Table (or folder event) names of interest
+            callback: Called with the set of changed names among tables
+        """
+        self.subscribers.append((widget, frozenset(tables), callback))
+
+    def poll(self):
+        """
+        Check for committed changes and notify subscribers
+
+        Returns:
+            Set of changed table/folder names
+        """
+        changed = set()
+        data_version = self.con.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self.data_version:
+            versions = self._read_versions()
+            changed = {name for name, version in versions.items() if self.versions.get(name) != version}
+            self.versions = versions
+        for name, (path, mtime) in self.folders.items():
+            current = self._mtime(path)
+            if current != mtime:
+                self.folders[name] = (path, current)
+                changed.add(name)
+        if changed:
+            self.publish(changed)
+        return changed
+
+    def publish(self, changed):
+        """Notify the subscribers interested in changed"""
+        alive = []
+        for widget, tables, callback in self.subscribers:
+            try:
+                if not widget.winfo_exists():
+                    continue
+            except TclError:
+                continue
+            alive.append((widget, tables, callback))
+            if tables & changed:
+                try:
+                    callback(tables & changed)
+                except Exception as ex:
+                    print(f"Error refreshing after change to {', '.join(sorted(tables & changed))}: {str(ex)}")
+        self.subscribers = alive
+
+    def start(self, widget, interval=DEFAULT_INTERVAL_MS):
+        """Poll every interval ms on the Tk event loop of widget's application"""
+        if self.scheduled is not None:
+            return
+        root = widget._root()
+
+        def tick():
+            try:
+                self.poll()
+            except sqlite3.Error as ex:
+                print(f"Error checking for changes: {str(ex)}")
+            self.scheduled = root.after(interval, tick)
+
+        self.scheduled = root.after(interval, tick)
+
+
+def get_bus(widget, db_path='ims.db'):
+    """
+    The process-wide bus for db_path, polling on widget's Tk event loop
+
+    Args:
+        widget: Any widget of the application
+        db_path: Path to the SQLite database
+
+    Returns:
+        ChangeBus
+    """
+    bus = _buses.get(db_path)
+    if bus is None:
+        bus = _buses[db_path] = ChangeBus(db_path)
+        bus.start(widget)
+    return bus
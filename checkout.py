@@ -0,0 +1,108 @@
+"""
+Checkout Module
+Headless checkout used by the billing window - stock update and sales rollups in one transaction
+"""
+
+import sqlite3
+from create_db import ensure_db
+from sales_rollup import record_sale
+from stock_ledger import record_movement
+
+DISCOUNT_PERCENT = 5
+
+
+def checkout_cart(cart_list, db_path=r'ims.db', discount_percent=DISCOUNT_PERCENT, day=None):
+    """
+    Sell the cart: update product stock and status, write each line to the stock
+    ledger and add the bill to the rollups
+
+    Stock is checked and reduced under the write lock, so tills selling the same
+    product at the same time cannot oversell it or lose each other's sales.
+
+    Args:
+        cart_list: Cart rows [pid, name, price, qty, stock] as kept by billClass
+        db_path: Path to the SQLite database
+        discount_percent: Bill discount, allocated to lines by amount
+        day: Sale day 'YYYY-MM-DD' (default: today)
+
+    Returns:
+        List of (name, qty, amount) string tuples for the bill text
+
+    Raises:
+        ValueError: A product is gone or no longer has enough stock (nothing is sold)
+    """
+    ensure_db(db_path)
+    con = sqlite3.connect(database=db_path, timeout=30, isolation_level=None)
+    cur = con.cursor()
+    try:
+        # Take the write lock before reading stock, so another till's sale between
+        # adding to the cart and checking out is never overwritten
+        cur.execute("BEGIN IMMEDIATE")
+        bill_lines = sell_cart(cur, cart_list, discount_percent, day)
+        cur.execute("COMMIT")
+        return bill_lines
+    except Exception:
+        if con.in_transaction:
+            cur.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+
+
+def sell_cart(cur, cart_list, discount_percent=DISCOUNT_PERCENT, day=None):
+    """
+    Sell the cart using the caller's open transaction
+
+    Args:
+        cur: Cursor of a transaction holding the write lock
+        cart_list: Cart rows [pid, name, price, qty, stock] as kept by billClass
+        discount_percent: Bill discount, allocated to lines by amount
+        day: Sale day 'YYYY-MM-DD' (default: today)
+
+    Returns:
+        List of (name, qty, amount) string tuples for the bill text
+
+    Raises:
+        ValueError: A product is gone or no longer has enough stock
+    """
+    pids = [row[0] for row in cart_list]
+    cur.execute(
+        f"select pid,Category,cast(qty as integer) from product where pid in ({','.join('?' * len(pids))})",
+        pids
+    )
+    current = {str(pid): (category, qty) for pid, category, qty in cur.fetchall()}
+
+    bill_lines = []
+    rollup_lines = []
+    for row in cart_list:
+        pid = row[0]
+        name = row[1]
+        sold = int(row[3])
+        if str(pid) not in current:
+            raise ValueError(f"{name} is no longer in the product list")
+        category, old_qty = current[str(pid)]
+        # The cart's stock column is a snapshot - check against the stock now
+        if sold > old_qty:
+            raise ValueError(f"Only {old_qty} of {name} left in stock")
+        qty = old_qty - sold
+        current[str(pid)] = (category, qty)
+        if qty == 0:
+            status = "Inactive"
+        else:
+            status = "Active"
+        price = float(row[2]) * sold
+        #------------- update qty in product table --------------
+        cur.execute("update product set qty=qty-?,status=? where pid=?", (
+            sold,
+            status,
+            pid
+        ))
+        record_movement(cur, pid, name, 'subtract', sold, old_qty, qty)
+        bill_lines.append((name, str(row[3]), str(price)))
+        rollup_lines.append((
+            int(pid), name, category, sold,
+            price, price * discount_percent / 100
+        ))
+
+    record_sale(cur, rollup_lines, day)
+    return bill_lines
@@ -1,7 +1,7 @@
 import sqlite3
 
-def create_db():
-    con=sqlite3.connect(database=r'ims.db')
+def create_db(db_path=r'ims.db'):
+    con=sqlite3.connect(database=db_path)
     cur=con.cursor()
     cur.execute("CREATE TABLE IF NOT EXISTS employee(eid INTEGER PRIMARY KEY AUTOINCREMENT,name text,email text,gender text,contact text,dob text,doj text,pass text,utype text,address text,salary text)")
     con.commit()
@@ -17,6 +17,85 @@ def create_db():
     con.commit()
     cur.execute("CREATE TABLE IF NOT EXISTS transaction_logs(txn_id INTEGER PRIMARY KEY AUTOINCREMENT,receipt_id INTEGER,product_id INTEGER,product_name text,quantity INTEGER,action text,old_qty INTEGER,new_qty INTEGER,timestamp text,FOREIGN KEY(receipt_id) REFERENCES receipt_logs(receipt_id),FOREIGN KEY(product_id) REFERENCES product(pid))")
     con.commit()
+    cur.execute("CREATE TABLE IF NOT EXISTS receipt_jobs(job_id INTEGER PRIMARY KEY AUTOINCREMENT,file_path text,receipt_type text,status text,attempts INTEGER,max_attempts INTEGER,next_attempt_at text,created_at text,started_at text,finished_at text,worker text,receipt_id INTEGER,message text,FOREIGN KEY(receipt_id) REFERENCES receipt_logs(receipt_id))")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipt_jobs_status ON receipt_jobs(status,next_attempt_at)")
+    cur.execute("CREATE TABLE IF NOT EXISTS receipt_workers(worker text PRIMARY KEY,heartbeat_at text)")
+    con.commit()
+    cur.execute("CREATE TABLE IF NOT EXISTS sales_daily(day text PRIMARY KEY,revenue REAL,units INTEGER,discount REAL,bill_count INTEGER)")
+    cur.execute("CREATE TABLE IF NOT EXISTS sales_daily_product(day text,product_id INTEGER,product_name text,revenue REAL,units INTEGER,discount REAL,bill_count INTEGER,PRIMARY KEY(day,product_id))")
+    cur.execute("CREATE TABLE IF NOT EXISTS sales_daily_category(day text,category text,revenue REAL,units INTEGER,discount REAL,bill_count INTEGER,PRIMARY KEY(day,category))")
+    con.commit()
+    #------- low stock watchlist, kept current by triggers on product --------
+    cur.execute("CREATE TABLE IF NOT EXISTS product_reorder(pid INTEGER PRIMARY KEY,reorder_level INTEGER,FOREIGN KEY(pid) REFERENCES product(pid))")
+    cur.execute("CREATE TABLE IF NOT EXISTS low_stock(pid INTEGER PRIMARY KEY,name text,qty INTEGER,reorder_level INTEGER,since text)")
+    cur.execute("CREATE TABLE IF NOT EXISTS low_stock_state(id INTEGER PRIMARY KEY CHECK(id=1),version INTEGER)")
+    cur.execute("INSERT OR IGNORE INTO low_stock_state(id,version) VALUES(1,0)")
+    cur.execute("select name from sqlite_master where type='trigger' and name='trg_low_stock_update'")
+    new_triggers=cur.fetchone()==None
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_low_stock_insert AFTER INSERT ON product BEGIN INSERT INTO low_stock(pid,name,qty,reorder_level,since) SELECT NEW.pid,NEW.name,CAST(NEW.qty AS INTEGER),level,datetime('now','localtime') FROM (SELECT COALESCE((SELECT reorder_level FROM product_reorder WHERE pid=NEW.pid),5) AS level) WHERE CAST(NEW.qty AS INTEGER)<=level; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_low_stock_update AFTER UPDATE OF qty,name ON product BEGIN DELETE FROM low_stock WHERE pid=NEW.pid AND CAST(NEW.qty AS INTEGER)>COALESCE((SELECT reorder_level FROM product_reorder WHERE pid=NEW.pid),5); INSERT INTO low_stock(pid,name,qty,reorder_level,since) SELECT NEW.pid,NEW.name,CAST(NEW.qty AS INTEGER),level,datetime('now','localtime') FROM (SELECT COALESCE((SELECT reorder_level FROM product_reorder WHERE pid=NEW.pid),5) AS level) WHERE CAST(NEW.qty AS INTEGER)<=level ON CONFLICT(pid) DO UPDATE SET name=excluded.name,qty=excluded.qty,reorder_level=excluded.reorder_level WHERE name IS NOT excluded.name OR qty<>excluded.qty OR reorder_level<>excluded.reorder_level; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_low_stock_delete AFTER DELETE ON product BEGIN DELETE FROM low_stock WHERE pid=OLD.pid; DELETE FROM product_reorder WHERE pid=OLD.pid; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_reorder_insert AFTER INSERT ON product_reorder BEGIN UPDATE product SET qty=qty WHERE pid=NEW.pid; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_reorder_update AFTER UPDATE ON product_reorder BEGIN UPDATE product SET qty=qty WHERE pid=NEW.pid; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_reorder_delete AFTER DELETE ON product_reorder BEGIN UPDATE product SET qty=qty WHERE pid=OLD.pid; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_low_stock_version_insert AFTER INSERT ON low_stock BEGIN UPDATE low_stock_state SET version=version+1 WHERE id=1; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_low_stock_version_update AFTER UPDATE ON low_stock BEGIN UPDATE low_stock_state SET version=version+1 WHERE id=1; END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS trg_low_stock_version_delete AFTER DELETE ON low_stock BEGIN UPDATE low_stock_state SET version=version+1 WHERE id=1; END")
+    if new_triggers:
+        #------- first run: fill the watchlist from the current stock --------
+        cur.execute("INSERT OR IGNORE INTO low_stock(pid,name,qty,reorder_level,since) SELECT p.pid,p.name,CAST(p.qty AS INTEGER),COALESCE(r.reorder_level,5),datetime('now','localtime') FROM product p LEFT JOIN product_reorder r ON r.pid=p.pid WHERE CAST(p.qty AS INTEGER)<=COALESCE(r.reorder_level,5)")
+    con.commit()
+    #------- demand forecasting --------
+    cur.execute("CREATE TABLE IF NOT EXISTS demand_daily(product_id INTEGER,day text,units INTEGER,PRIMARY KEY(product_id,day))")
+    cur.execute("CREATE TABLE IF NOT EXISTS forecast_state(id INTEGER PRIMARY KEY CHECK(id=1),last_txn_id INTEGER,run_at text)")
+    cur.execute("INSERT OR IGNORE INTO forecast_state(id,last_txn_id,run_at) VALUES(1,0,NULL)")
+    cur.execute("CREATE TABLE IF NOT EXISTS reorder_suggestions(product_id INTEGER PRIMARY KEY,product_name text,supplier text,qty_on_hand INTEGER,daily_demand REAL,reorder_point REAL,suggested_qty INTEGER,updated_at text)")
+    con.commit()
+    #------- stock ledger checkpoints --------
+    cur.execute("CREATE TABLE IF NOT EXISTS stock_checkpoints(product_id INTEGER,txn_id INTEGER,timestamp text,qty INTEGER,PRIMARY KEY(product_id,txn_id))")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transaction_logs_product ON transaction_logs(product_id,txn_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_product_name ON product(name)")
+    #------- receipt history filters --------
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipt_logs_date ON receipt_logs(upload_date,receipt_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipt_logs_type ON receipt_logs(receipt_type,upload_date,receipt_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipt_logs_status ON receipt_logs(status,upload_date,receipt_id)")
+    con.commit()
+    #------- monthly log archives --------
+    cur.execute("CREATE TABLE IF NOT EXISTS archive_manifest(month text PRIMARY KEY,path text,receipt_rows INTEGER,item_rows INTEGER,txn_rows INTEGER,first_receipt_id INTEGER,last_receipt_id INTEGER,first_txn_id INTEGER,last_txn_id INTEGER,archived_at text)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transaction_logs_time ON transaction_logs(timestamp)")
+    con.commit()
+    #------- per-table change counters for the change bus --------
+    cur.execute("CREATE TABLE IF NOT EXISTS table_versions(name text PRIMARY KEY,version INTEGER)")
+    for table in ("product","category","supplier","employee","receipt_logs","low_stock"):
+        cur.execute("INSERT OR IGNORE INTO table_versions(name,version) VALUES(?,0)",(table,))
+        for event in ("insert","update","delete"):
+            cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event} AFTER {event.upper()} ON {table} BEGIN UPDATE table_versions SET version=version+1 WHERE name='{table}'; END")
+    con.commit()
+    #------- products changed since a product version, for the catalog cache --------
+    cur.execute("CREATE TABLE IF NOT EXISTS product_changes(pid INTEGER PRIMARY KEY,version INTEGER)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_product_changes_version ON product_changes(version)")
+    for event,row in (("insert","NEW"),("update","NEW"),("delete","OLD")):
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_product_changes_{event} AFTER {event.upper()} ON product BEGIN INSERT INTO product_changes(pid,version) VALUES({row}.pid,(SELECT version FROM table_versions WHERE name='product')) ON CONFLICT(pid) DO UPDATE SET version=excluded.version; END")
+    con.commit()
+    #------- audit log journal watermarks --------
+    cur.execute("CREATE TABLE IF NOT EXISTS audit_journal_state(journal text PRIMARY KEY,seq INTEGER)")
+    con.commit()
+    #------- till replicas: position of each till in its change log --------
+    cur.execute("CREATE TABLE IF NOT EXISTS till_sync_state(till_id text PRIMARY KEY,last_seq INTEGER,pushed_at text)")
+    cur.execute("CREATE TABLE IF NOT EXISTS till_receipt_map(till_id text,local_id INTEGER,receipt_id INTEGER,PRIMARY KEY(till_id,local_id))")
+    cur.execute("CREATE TABLE IF NOT EXISTS till_product_map(till_id text,local_pid INTEGER,pid INTEGER,PRIMARY KEY(till_id,local_pid))")
+    cur.execute("CREATE TABLE IF NOT EXISTS till_rejected_movements(id INTEGER PRIMARY KEY AUTOINCREMENT,till_id text,local_txn_id INTEGER,product_id INTEGER,product_name text,quantity INTEGER,action text,timestamp text,reason text)")
+    con.commit()
+    con.close()
+
+_created=set()
+
+def ensure_db(db_path=r'ims.db'):
+    #------- create missing tables once per process --------
+    if db_path not in _created:
+        create_db(db_path)
+        _created.add(db_path)
 
 
-create_db()
\ No newline at end of file
+if __name__=="__main__":
+    create_db()
\ No newline at end of file
@@ -1,6 +1,6 @@
 from tkinter import*
 from PIL import Image,ImageTk
-from tkinter import messagebox
+from tkinter import ttk,messagebox
 import time
 import sqlite3
 import os
@@ -10,6 +10,19 @@ from category import categoryClass
 from product import productClass
 from sales import salesClass
 from receipt_ui import open_receipt_window
+from reports import reportsClass
+from inventory import inventoryClass
+from export import exportClass
+from importer import importClass
+from diagnostics import diagnosticsClass
+import query_profiler
+from event_watchdog import get_watchdog
+from create_db import ensure_db
+from low_stock import low_stock_items
+from change_bus import get_bus
+
+#------- tables and folders the dashboard tiles show --------
+DASHBOARD_EVENTS=("product","category","employee","supplier","bills","low_stock")
 
 class IMS:
     def __init__(self,root):
@@ -18,11 +31,23 @@ class IMS:
         self.root.title("Smart Business Management & Tracking System")
         self.root.resizable(False,False)
         self.root.config(bg="white")
+        ensure_db()
 
         #------------- title --------------
         self.icon_title=PhotoImage(file="images/logo1.png")
         title=Label(self.root,text="Smart Business Management & Tracking System",image=self.icon_title,compound=LEFT,font=("times new roman",34,"bold"),bg="#010c48",fg="white",anchor="w",padx=20).place(x=0,y=0,relwidth=1,height=70)
 
+        #------------ tools menu -----------
+        menubar=Menu(self.root)
+        tools_menu=Menu(menubar,tearoff=0)
+        tools_menu.add_command(label="Sales Reports",command=self.reports)
+        tools_menu.add_command(label="Inventory Valuation",command=self.inventory)
+        tools_menu.add_command(label="Export Data",command=self.export)
+        tools_menu.add_command(label="Import Products",command=self.import_products)
+        tools_menu.add_command(label="Diagnostics",command=self.diagnostics)
+        menubar.add_cascade(label="Tools",menu=tools_menu)
+        self.root.config(menu=menubar)
+
         #------------ logout button -----------
         btn_logout=Button(self.root,text="Logout",font=("times new roman",15,"bold"),bg="yellow",cursor="hand2").place(x=1150,y=10,height=50,width=150)
 
@@ -68,6 +93,30 @@ class IMS:
         self.lbl_sales=Label(self.root,text="Total Sales\n{ 0 }",bd=5,relief=RIDGE,bg="#ffc107",fg="white",font=("goudy old style",20,"bold"))
         self.lbl_sales.place(x=650,y=300,height=150,width=300)
 
+        self.lbl_low_stock=Label(self.root,text="Low Stock\n{ 0 }",bd=5,relief=RIDGE,bg="#f44336",fg="white",font=("goudy old style",20,"bold"))
+        self.lbl_low_stock.place(x=1000,y=300,height=150,width=300)
+
+        #------------ low stock list -------------
+        low_stock_frame=Frame(self.root,bd=3,relief=RIDGE)
+        low_stock_frame.place(x=300,y=470,width=1000,height=190)
+
+        scrolly=Scrollbar(low_stock_frame,orient=VERTICAL)
+        self.LowStockTable=ttk.Treeview(low_stock_frame,columns=("pid","name","qty","reorder","since"),yscrollcommand=scrolly.set)
+        scrolly.pack(side=RIGHT,fill=Y)
+        scrolly.config(command=self.LowStockTable.yview)
+        self.LowStockTable.heading("pid",text="P ID")
+        self.LowStockTable.heading("name",text="Low Stock Product")
+        self.LowStockTable.heading("qty",text="Quantity")
+        self.LowStockTable.heading("reorder",text="Reorder At")
+        self.LowStockTable.heading("since",text="Low Since")
+        self.LowStockTable["show"]="headings"
+        self.LowStockTable.column("pid",width=60)
+        self.LowStockTable.column("name",width=300)
+        self.LowStockTable.column("qty",width=100)
+        self.LowStockTable.column("reorder",width=100)
+        self.LowStockTable.column("since",width=180)
+        self.LowStockTable.pack(fill=BOTH,expand=1)
+
         #------------ footer -----------------
         lbl_footer=Label(self.root,text="",font=("times new roman",12),bg="#4d636d",fg="white").pack(side=BOTTOM,fill=X)
 
@@ -90,38 +139,78 @@ class IMS:
         self.new_obj=salesClass(self.new_win)
     def receipt(self):
         self.new_win=open_receipt_window(self.root)
+    def reports(self):
+        self.new_win=Toplevel(self.root)
+        self.new_obj=reportsClass(self.new_win)
+
+    def inventory(self):
+        self.new_win=Toplevel(self.root)
+        self.new_obj=inventoryClass(self.new_win)
+
+    def export(self):
+        self.new_win=Toplevel(self.root)
+        self.new_obj=exportClass(self.new_win)
+
+    def import_products(self):
+        self.new_win=Toplevel(self.root)
+        self.new_obj=importClass(self.new_win)
+
+    def diagnostics(self):
+        self.new_win=Toplevel(self.root)
+        self.new_obj=diagnosticsClass(self.new_win)
 
     def update_content(self):
+        #------- load every tile once, then refresh only what the change bus reports --------
+        self.refresh_tiles(set(DASHBOARD_EVENTS))
+        bus=get_bus(self.root)
+        bus.watch_folder("bills","Inventory-Management-System/bill")
+        bus.subscribe(self.root,DASHBOARD_EVENTS,self.refresh_tiles)
+        self.update_clock()
+
+    def refresh_tiles(self,changed):
         con=sqlite3.connect(database=r'ims.db')
         cur=con.cursor()
         try:
-            cur.execute("select * from product")
-            product=cur.fetchall()
-            self.lbl_product.config(text=f"Total Product\n[ {str(len(product))} ]")
-
-            cur.execute("select * from category")
-            category=cur.fetchall()
-            self.lbl_category.config(text=f"Total Category\n[ {str(len(category))} ]")
-
-            cur.execute("select * from employee")
-            employee=cur.fetchall()
-            self.lbl_employee.config(text=f"Total Employee\n[ {str(len(employee))} ]")
-
-            cur.execute("select * from supplier")
-            supplier=cur.fetchall()
-            self.lbl_supplier.config(text=f"Total Supplier\n[ {str(len(supplier))} ]")
-            
-            bill=len(os.listdir("Inventory-Management-System/bill"))
-            self.lbl_sales.config(text=f"Total Sales\n[ {str(bill)} ]")
-
-            time_=time.strftime("%I:%M:%S")
-            date_=time.strftime("%d-%m-%Y")
-            self.lbl_clock.config(text=f"\t\t Date: {str(date_)}\t\t Time: {str(time_)}")
-            self.lbl_clock.after(200,self.update_content)
+            if "product" in changed:
+                cur.execute("select count(*) from product")
+                self.lbl_product.config(text=f"Total Product\n[ {str(cur.fetchone()[0])} ]")
+
+            if "category" in changed:
+                cur.execute("select count(*) from category")
+                self.lbl_category.config(text=f"Total Category\n[ {str(cur.fetchone()[0])} ]")
+
+            if "employee" in changed:
+                cur.execute("select count(*) from employee")
+                self.lbl_employee.config(text=f"Total Employee\n[ {str(cur.fetchone()[0])} ]")
+
+            if "supplier" in changed:
+                cur.execute("select count(*) from supplier")
+                self.lbl_supplier.config(text=f"Total Supplier\n[ {str(cur.fetchone()[0])} ]")
+
+            if "bills" in changed:
+                bill=len(os.listdir("Inventory-Management-System/bill"))
+                self.lbl_sales.config(text=f"Total Sales\n[ {str(bill)} ]")
+
+            if "low_stock" in changed:
+                items=low_stock_items(cur)
+                self.lbl_low_stock.config(text=f"Low Stock\n[ {str(len(items))} ]")
+                self.LowStockTable.delete(*self.LowStockTable.get_children())
+                for row in items:
+                    self.LowStockTable.insert('',END,values=row)
         except Exception as ex:
             messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
+        finally:
+            con.close()
+
+    def update_clock(self):
+        time_=time.strftime("%I:%M:%S")
+        date_=time.strftime("%d-%m-%Y")
+        self.lbl_clock.config(text=f"\t\t Date: {str(date_)}\t\t Time: {str(time_)}")
+        self.lbl_clock.after(200,self.update_clock)
 
 if __name__=="__main__":
+    query_profiler.enable_from_env()
     root=Tk()
+    get_watchdog(root)
     obj=IMS(root)
     root.mainloop()
\ No newline at end of file
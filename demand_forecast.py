@@ -0,0 +1,338 @@
+"""
+Demand Forecast Module
+Daily demand series from transaction_logs (live and archived), forecast for all products at once with NumPy,
+and reorder suggestions per supplier
+"""
+
+import sys
+import time
+import sqlite3
+import argparse
+from operator import itemgetter
+from datetime import datetime
+from create_db import ensure_db
+from archive_logs import ARCHIVE_SCHEMA, attached_archives
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DAY_FORMAT = '%Y-%m-%d'
+# julianday() of 1970-01-01 - converts SQLite dates to day numbers
+UNIX_EPOCH_JULIAN = 2440587.5
+MODELS = ('ses', 'ma')
+
+
+class DemandForecaster:
+    def __init__(self, db_path='ims.db', model='ses', alpha=0.3, window=56,
+                 lead_time_days=7, review_days=7, service_z=1.65):
+        """
+        Initialize the forecaster
+
+        Args:
+            db_path: Path to the SQLite database
+            model: 'ses' (simple exponential smoothing) or 'ma' (moving average)
+            alpha: Smoothing factor for 'ses'
+            window: Days of history used for the forecast
+            lead_time_days: Days between ordering and receiving stock
+            review_days: Days until the next reorder run
+            service_z: Safety stock factor (1.65 covers about 95% of lead-time demand)
+        """
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy is required for demand forecasting. Install with: pip install numpy")
+        if model not in MODELS:
+            raise ValueError(f"Unknown model '{model}'. Choose from: {', '.join(MODELS)}")
+        self.db_path = db_path
+        self.model = model
+        self.alpha = alpha
+        self.window = window
+        self.lead_time_days = lead_time_days
+        self.review_days = review_days
+        self.service_z = service_z
+        ensure_db(db_path)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def update_demand(self, con, schema='main'):
+        """
+        Add subtract movements logged since the last run to demand_daily
+
+        Args:
+            con: Connection inside the run's transaction
+            schema: 'main' for the live transaction_logs or ARCHIVE_SCHEMA for an attached archive
+
+        Returns:
+            (number of new transaction rows, new last txn_id)
+        """
+        last_txn_id = con.execute("SELECT last_txn_id FROM forecast_state WHERE id=1").fetchone()[0]
+        new_last, scanned = con.execute(
+            f"SELECT COALESCE(MAX(txn_id), ?), COUNT(*) FROM {schema}.transaction_logs WHERE txn_id>?",
+            (last_txn_id, last_txn_id)
+        ).fetchone()
+        if not scanned:
+            return 0, last_txn_id
+
+        # Aggregate in SQL so only one row per product and day reaches Python
+        con.execute(
+            f"""INSERT INTO demand_daily (product_id, day, units)
+            SELECT product_id, substr(timestamp, 1, 10), SUM(quantity)
+            FROM {schema}.transaction_logs
+            WHERE txn_id>? AND txn_id<=? AND action='subtract' AND product_id IS NOT NULL
+            GROUP BY product_id, substr(timestamp, 1, 10)
+            ON CONFLICT(product_id, day) DO UPDATE SET units=units+excluded.units""",
+            (last_txn_id, new_last)
+        )
+        con.execute("UPDATE forecast_state SET last_txn_id=? WHERE id=1", (new_last,))
+        return scanned, new_last
+
+    def update_archived_demand(self, con):
+        """
+        Add movements of archived months not processed yet to demand_daily, e.g. after
+        a reset or when logs were archived before a run saw them
+
+        Archives are attached oldest month first (archived txn_ids are all older than
+        the live ones) and each month is added in its own transaction, as SQLite cannot
+        attach inside one.
+
+        Args:
+            con: Connection outside any transaction
+
+        Returns:
+            Number of archived transaction rows added
+        """
+        last_txn_id = con.execute("SELECT last_txn_id FROM forecast_state WHERE id=1").fetchone()[0]
+        added = 0
+        for _ in attached_archives(con, "WHERE txn_rows>0 AND last_txn_id>?", (last_txn_id,), newest_first=False):
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                scanned, _ = self.update_demand(con, ARCHIVE_SCHEMA)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+            added += scanned
+        return added
+
+    def demand_matrix(self, con, today=None):
+        """
+        Build the products x days demand matrix for the forecast window
+
+        Args:
+            con: Open connection
+            today: Last day of the window (default: today)
+
+        Returns:
+            (product_ids array, matrix of shape (products, window)) - oldest day first
+        """
+        today = (today or datetime.now()).strftime(DAY_FORMAT)
+        rows = con.execute(
+            """SELECT product_id,
+            CAST(julianday(?) - julianday(day) AS INTEGER), units
+            FROM demand_daily
+            WHERE day > date(?, ?) AND day <= ?
+            ORDER BY product_id""",
+            (today, today, f"-{self.window} days", today)
+        ).fetchall()
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.window))
+
+        count = len(rows)
+        pids = np.fromiter(map(itemgetter(0), rows), dtype=np.int64, count=count)
+        age = np.fromiter(map(itemgetter(1), rows), dtype=np.int64, count=count)
+        units = np.fromiter(map(itemgetter(2), rows), dtype=np.float64, count=count)
+
+        product_ids, product_index = np.unique(pids, return_inverse=True)
+        matrix = np.zeros((len(product_ids), self.window))
+        np.add.at(matrix, (product_index, self.window - 1 - age), units)
+        return product_ids, matrix
+
+    def forecast(self, matrix):
+        """
+        Forecast daily demand for every row of the matrix at once
+
+        Args:
+            matrix: Demand matrix (products x days), oldest day first
+
+        Returns:
+            Array of forecast units per day, one per product
+        """
+        if self.model == 'ma':
+            return matrix.mean(axis=1)
+
+        # Simple exponential smoothing, started from the first day, as one matrix-vector product:
+        # level = (1-a)^(n-1) * x0 + sum over t>=1 of a * (1-a)^(n-1-t) * x_t
+        n = matrix.shape[1]
+        weights = self.alpha * (1 - self.alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+        weights[0] = (1 - self.alpha) ** (n - 1)
+        return matrix @ weights
+
+    def suggest(self, con, product_ids, matrix, daily):
+        """
+        Reorder suggestions for products whose stock will not last the lead time
+
+        Returns:
+            List of (product_id, product_name, supplier, qty_on_hand, daily_demand,
+            reorder_point, suggested_qty)
+        """
+        if not len(product_ids):
+            return []
+
+        stock = {}
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500].tolist()
+            stock.update(
+                (pid, (name, supplier, qty))
+                for pid, name, supplier, qty in con.execute(
+                    f"""SELECT pid, name, Supplier, CAST(qty AS INTEGER) FROM product
+                    WHERE pid IN ({','.join('?' * len(chunk))})""",
+                    chunk
+                )
+            )
+
+        on_hand = np.array([stock.get(pid, (None, None, 0))[2] for pid in product_ids.tolist()], dtype=np.float64)
+        on_hand = np.clip(on_hand, 0, None)
+        safety = self.service_z * matrix.std(axis=1) * np.sqrt(self.lead_time_days)
+        reorder_point = daily * self.lead_time_days + safety
+        target = daily * (self.lead_time_days + self.review_days) + safety
+        suggested = np.ceil(target - on_hand).astype(np.int64)
+        due = (on_hand <= reorder_point) & (suggested > 0)
+
+        suggestions = []
+        for i in np.flatnonzero(due):
+            pid = int(product_ids[i])
+            if pid not in stock:
+                # Product was deleted since it was sold
+                continue
+            name, supplier, qty = stock[pid]
+            suggestions.append((
+                pid, name, supplier or 'No Supplier', int(qty or 0),
+                round(float(daily[i]), 3), round(float(reorder_point[i]), 2), int(suggested[i])
+            ))
+        return suggestions
+
+    def run(self, today=None):
+        """
+        Incremental nightly run: update demand, forecast and rewrite reorder_suggestions
+
+        Args:
+            today: Last day of the forecast window (default: today)
+
+        Returns:
+            Dict with new_transactions, last_txn_id, products, suggestions and seconds
+        """
+        start = time.perf_counter()
+        now = datetime.now().strftime(TIME_FORMAT)
+        con = self._connect()
+        try:
+            archived = self.update_archived_demand(con)
+            con.execute("BEGIN IMMEDIATE")
+            scanned, last_txn_id = self.update_demand(con)
+            scanned += archived
+            product_ids, matrix = self.demand_matrix(con, today)
+            daily = self.forecast(matrix)
+            suggestions = self.suggest(con, product_ids, matrix, daily)
+
+            con.execute("DELETE FROM reorder_suggestions")
+            con.executemany(
+                """INSERT INTO reorder_suggestions
+                (product_id, product_name, supplier, qty_on_hand, daily_demand, reorder_point, suggested_qty, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [row + (now,) for row in suggestions]
+            )
+            con.execute("UPDATE forecast_state SET run_at=? WHERE id=1", (now,))
+            con.execute("COMMIT")
+        except Exception:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+        return {
+            'new_transactions': scanned,
+            'last_txn_id': last_txn_id,
+            'products': len(product_ids),
+            'suggestions': len(suggestions),
+            'seconds': time.perf_counter() - start
+        }
+
+    def reset(self):
+        """Forget processed history so the next run rebuilds demand_daily from transaction_logs and its archives"""
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            con.execute("DELETE FROM demand_daily")
+            con.execute("DELETE FROM reorder_suggestions")
+            con.execute("UPDATE forecast_state SET last_txn_id=0, run_at=NULL WHERE id=1")
+            con.execute("COMMIT")
+        finally:
+            con.close()
+
+
+def suggestions_by_supplier(db_path='ims.db'):
+    """
+    Current reorder suggestions grouped by supplier
+
+    Returns:
+        Dict of supplier -> list of (product_id, product_name, qty_on_hand, daily_demand, suggested_qty)
+    """
+    ensure_db(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        grouped = {}
+        for supplier, pid, name, on_hand, daily, suggested in con.execute(
+            """SELECT supplier, product_id, product_name, qty_on_hand, daily_demand, suggested_qty
+            FROM reorder_suggestions ORDER BY supplier, suggested_qty DESC"""
+        ):
+            grouped.setdefault(supplier, []).append((pid, name, on_hand, daily, suggested))
+        return grouped
+    finally:
+        con.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Demand forecasting and reorder suggestions")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="Process new transactions and refresh suggestions")
+    run_parser.add_argument('--model', choices=MODELS, default='ses')
+    run_parser.add_argument('--alpha', type=float, default=0.3, help="Smoothing factor for ses")
+    run_parser.add_argument('--window', type=int, default=56, help="Days of history to use")
+    run_parser.add_argument('--lead-time', type=int, default=7, help="Supplier lead time in days")
+    run_parser.add_argument('--review-days', type=int, default=7, help="Days until the next run")
+    run_parser.add_argument('--rebuild', action='store_true', help="Rebuild demand history from transaction_logs and its archives")
+
+    sub.add_parser('show', help="Print suggestions per supplier")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        forecaster = DemandForecaster(
+            args.db, args.model, args.alpha, args.window, args.lead_time, args.review_days
+        )
+        if args.rebuild:
+            forecaster.reset()
+        stats = forecaster.run()
+        print(
+            f"Processed {stats['new_transactions']} new transaction(s) up to txn {stats['last_txn_id']}, "
+            f"forecast {stats['products']} product(s), {stats['suggestions']} reorder suggestion(s) "
+            f"in {stats['seconds']:.2f}s"
+        )
+    else:
+        grouped = suggestions_by_supplier(args.db)
+        if not grouped:
+            print("No reorder suggestions")
+        for supplier, rows in grouped.items():
+            print(f"\n{supplier}")
+            for pid, name, on_hand, daily, suggested in rows:
+                print(f"  {name:30} on hand {on_hand:6}  demand/day {daily:8.2f}  order {suggested}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
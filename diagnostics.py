@@ -0,0 +1,164 @@
+from tkinter import*
+from tkinter import ttk,messagebox
+import query_profiler
+from event_watchdog import get_watchdog
+
+class diagnosticsClass:
+    def __init__(self,root):
+        self.root=root
+        self.root.geometry("1100x500+320+220")
+        self.root.title("")
+        self.root.config(bg="white")
+        self.root.resizable(False,False)
+        self.root.focus_force()
+
+        #------------ variables -------------
+        self.var_profile=IntVar(value=1 if query_profiler.is_enabled() else 0)
+        self.var_slow=StringVar(value=f"{query_profiler.slow_ms():g}")
+        self.watchdog=get_watchdog(self.root)
+        self.shown_events=None
+        self.events=[]
+        #--------------- title ---------------------
+        lbl_title=Label(self.root,text="Diagnostics",font=("goudy old style",30),bg="#184a45",fg="white",bd=3,relief=RIDGE).pack(side=TOP,fill=X,padx=10,pady=20)
+
+        notebook=ttk.Notebook(self.root)
+        notebook.place(x=10,y=85,width=1080,height=405)
+        query_tab=Frame(notebook,bg="white")
+        notebook.add(query_tab,text="Queries")
+        loop_tab=Frame(notebook,bg="white")
+        notebook.add(loop_tab,text="Event Loop")
+
+        chk_profile=Checkbutton(query_tab,text="Profile Queries",variable=self.var_profile,command=self.toggle,font=("times new roman",15),bg="white").place(x=5,y=3)
+        lbl_slow=Label(query_tab,text="Slow Query Log Above (ms)",font=("times new roman",15),bg="white").place(x=185,y=5)
+        txt_slow=Entry(query_tab,textvariable=self.var_slow,font=("times new roman",15),bg="lightyellow").place(x=425,y=5,width=80)
+        btn_show=Button(query_tab,text="Refresh",command=self.show,font=("times new roman",15,"bold"),bg="#2196f3",fg="white",cursor="hand2").place(x=515,y=5,width=110,height=28)
+        btn_reset=Button(query_tab,text="Reset",command=self.reset,font=("times new roman",15,"bold"),bg="lightgray",cursor="hand2").place(x=635,y=5,width=110,height=28)
+
+        self.lbl_status=Label(query_tab,text="",font=("times new roman",12),bg="white",anchor="w")
+        self.lbl_status.place(x=755,y=5,width=315,height=28)
+
+        #------------ query table -------------
+        query_frame=Frame(query_tab,bd=3,relief=RIDGE)
+        query_frame.place(x=5,y=45,width=1065,height=325)
+
+        scrolly=Scrollbar(query_frame,orient=VERTICAL)
+        scrollx=Scrollbar(query_frame,orient=HORIZONTAL)
+        self.QueryTable=ttk.Treeview(query_frame,columns=("calls","total","mean","max","rows","histogram","sql"),yscrollcommand=scrolly.set,xscrollcommand=scrollx.set)
+        scrollx.pack(side=BOTTOM,fill=X)
+        scrolly.pack(side=RIGHT,fill=Y)
+        scrollx.config(command=self.QueryTable.xview)
+        scrolly.config(command=self.QueryTable.yview)
+        self.QueryTable.heading("calls",text="Calls")
+        self.QueryTable.heading("total",text="Total ms")
+        self.QueryTable.heading("mean",text="Mean ms")
+        self.QueryTable.heading("max",text="Max ms")
+        self.QueryTable.heading("rows",text="Rows")
+        self.QueryTable.heading("histogram",text="Calls by ms: "+" ".join(query_profiler.histogram_labels()))
+        self.QueryTable.heading("sql",text="Query")
+        self.QueryTable["show"]="headings"
+        self.QueryTable.column("calls",width=60)
+        self.QueryTable.column("total",width=80)
+        self.QueryTable.column("mean",width=70)
+        self.QueryTable.column("max",width=70)
+        self.QueryTable.column("rows",width=70)
+        self.QueryTable.column("histogram",width=330)
+        self.QueryTable.column("sql",width=1000)
+        self.QueryTable.pack(fill=BOTH,expand=1)
+
+        #------------ event loop -------------
+        self.lbl_loop=Label(loop_tab,text="",font=("times new roman",13),bg="white",anchor="w")
+        self.lbl_loop.place(x=5,y=5,width=1065,height=28)
+
+        event_frame=Frame(loop_tab,bd=3,relief=RIDGE)
+        event_frame.place(x=5,y=45,width=430,height=325)
+
+        scrolly3=Scrollbar(event_frame,orient=VERTICAL)
+        self.EventTable=ttk.Treeview(event_frame,columns=("time","ms","callback"),yscrollcommand=scrolly3.set)
+        scrolly3.pack(side=RIGHT,fill=Y)
+        scrolly3.config(command=self.EventTable.yview)
+        self.EventTable.heading("time",text="Time")
+        self.EventTable.heading("ms",text="Blocked ms")
+        self.EventTable.heading("callback",text="Callback")
+        self.EventTable["show"]="headings"
+        self.EventTable.column("time",width=130)
+        self.EventTable.column("ms",width=80)
+        self.EventTable.column("callback",width=200)
+        self.EventTable.pack(fill=BOTH,expand=1)
+        self.EventTable.bind("<ButtonRelease-1>",self.get_event)
+
+        stack_frame=Frame(loop_tab,bd=3,relief=RIDGE)
+        stack_frame.place(x=445,y=45,width=625,height=325)
+
+        scrolly4=Scrollbar(stack_frame,orient=VERTICAL)
+        self.stack_area=Text(stack_frame,bg="lightyellow",font=("courier new",9),wrap=NONE,yscrollcommand=scrolly4.set)
+        scrolly4.pack(side=RIGHT,fill=Y)
+        scrolly4.config(command=self.stack_area.yview)
+        self.stack_area.pack(fill=BOTH,expand=1)
+
+        self.show()
+        self.show_loop()
+#----------------------------------------------------------------------------------------------------
+    def toggle(self):
+        if self.var_profile.get()==1:
+            try:
+                query_profiler.enable(slow_ms=float(self.var_slow.get()))
+            except ValueError:
+                self.var_profile.set(0)
+                messagebox.showerror("Error","Slow query time must be a number",parent=self.root)
+                return
+        else:
+            query_profiler.disable()
+        self.show()
+
+    def show(self):
+        self.QueryTable.delete(*self.QueryTable.get_children())
+        for stat in query_profiler.stats():
+            self.QueryTable.insert('',END,values=(
+                stat['calls'],
+                f"{stat['total_ms']:.1f}",
+                f"{stat['mean_ms']:.2f}",
+                f"{stat['max_ms']:.1f}",
+                stat['rows'],
+                " ".join(str(count) for count in stat['histogram']),
+                stat['sql']
+            ))
+        if query_profiler.is_enabled():
+            self.lbl_status.config(text=f"Slow queries are logged to {query_profiler.slow_log() or 'nowhere'}")
+        else:
+            self.lbl_status.config(text="Profiling is off")
+
+    def reset(self):
+        query_profiler.reset()
+        self.show()
+
+    def show_loop(self):
+        #------- refresh the event loop figures every second while the window is open --------
+        if not self.root.winfo_exists():
+            return
+        if self.watchdog is None:
+            self.lbl_loop.config(text="The event loop watchdog is off (IMS_WATCHDOG=0)")
+            return
+        stats=self.watchdog.stats()
+        self.lbl_loop.config(text=f"Lag now {stats['lag_ms']:.0f} ms, median {stats['lag_p50_ms']:.0f} ms, 99% {stats['lag_p99_ms']:.0f} ms, max {stats['lag_max_ms']:.0f} ms    "
+                             f"{stats['blocked']} of {stats['callbacks']} callbacks over {stats['threshold_ms']:g} ms    Log: {stats['log_path'] or 'none'}")
+        if stats['blocked']!=self.shown_events:
+            self.shown_events=stats['blocked']
+            self.events=self.watchdog.recent_events()
+            self.EventTable.delete(*self.EventTable.get_children())
+            for index,event in enumerate(self.events):
+                self.EventTable.insert('',END,iid=str(index),values=(event['time'],f"{event['ms']:.0f}",event['callback']))
+        self.root.after(1000,self.show_loop)
+
+    def get_event(self,ev):
+        f=self.EventTable.focus()
+        if f=="":
+            return
+        event=self.events[int(f)]
+        self.stack_area.delete('1.0',END)
+        self.stack_area.insert(END,f"{event['callback']} blocked the event loop for {event['ms']:.0f} ms at {event['time']}\n\n{event['stack']}")
+
+
+if __name__=="__main__":
+    root=Tk()
+    obj=diagnosticsClass(root)
+    root.mainloop()
@@ -0,0 +1,235 @@
+"""
+Event Watchdog Module
+Watches the responsiveness of the Tk event loop. A heartbeat scheduled with after()
+measures how late the loop runs it, and every Tk callback (commands, event bindings,
+after() callbacks) is timed through tkinter's CallWrapper. A monitor thread captures the
+Python stack of a callback still running past the threshold, so each freeze is recorded
+with the line it was stuck on - in memory for the diagnostics window and in a log file.
+
+A callback that opens a modal dialog (messagebox, wait_window) runs a nested event loop
+until the dialog closes. Callbacks run by that loop show it is serviced, so only the
+stretches of the outer callback between them count as blocking.
+"""
+
+import os
+import sys
+import time
+import tkinter
+import threading
+import traceback
+from collections import deque
+
+DEFAULT_THRESHOLD_MS = 250
+DEFAULT_LOG = 'event_watchdog.log'
+HEARTBEAT_MS = 100
+# Lag samples kept for percentiles - a minute of heartbeats
+LAG_SAMPLES = 600
+MAX_EVENTS = 200
+MAX_STACK_FRAMES = 25
+# A callback running this long is logged before it returns, in case it never does
+HANG_MS = 5000
+
+_original_call = tkinter.CallWrapper.__call__
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+
+def _timed_call(wrapper, *args):
+    watchdog = _watchdog
+    if watchdog is None or threading.get_ident() != watchdog.thread_id:
+        return _original_call(wrapper, *args)
+    return watchdog._run_callback(wrapper, args)
+
+
+def _callback_name(func):
+    owner = getattr(func, '__self__', None)
+    name = getattr(func, '__name__', None) or type(func).__name__
+    if owner is not None and not isinstance(owner, type(sys)):
+        return f"{type(owner).__name__}.{name}"
+    qualname = getattr(func, '__qualname__', name)
+    # after() wraps callbacks in a local function named after the callback
+    if qualname.endswith('.<locals>.callit'):
+        return f"after: {name}"
+    return f"{getattr(func, '__module__', '') or ''}.{qualname}".lstrip('.')
+
+
+def _format_stack(frame):
+    # The watchdog's own frames between mainloop and the callback are left out
+    stack = [entry for entry in traceback.extract_stack(frame) if entry.filename != __file__]
+    return "".join(traceback.format_list(stack[-MAX_STACK_FRAMES:]))
+
+
+class EventWatchdog:
+    def __init__(self, root, threshold_ms=None, log_path=None, heartbeat_ms=HEARTBEAT_MS):
+        """
+        Initialize the watchdog - call start() on the Tk thread
+
+        Args:
+            root: Tk root whose event loop is watched
+            threshold_ms: Callbacks running longer are recorded (default: IMS_WATCHDOG_MS or 250)
+            log_path: Log file, or '' for none (default: IMS_WATCHDOG_LOG or event_watchdog.log)
+            heartbeat_ms: Interval of the lag heartbeat
+        """
+        self.root = root
+        self.threshold_ms = float(threshold_ms or os.environ.get('IMS_WATCHDOG_MS') or DEFAULT_THRESHOLD_MS)
+        self.log_path = log_path if log_path is not None else os.environ.get('IMS_WATCHDOG_LOG', DEFAULT_LOG)
+        self.heartbeat_ms = heartbeat_ms
+        self.thread_id = None
+        # Callbacks running on the Tk thread, innermost last:
+        # [func, start of the current blocking stretch, stack, logged, longest stretch so far]
+        self.active = []
+        self.lags = deque(maxlen=LAG_SAMPLES)
+        self.max_lag_ms = 0.0
+        self.callbacks = 0
+        self.blocked = 0
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.expected = None
+        self.scheduled = None
+        self.running = False
+        self.monitor = None
+
+    def start(self):
+        """Start the heartbeat and the monitor thread and time every Tk callback"""
+        global _watchdog
+        if self.running:
+            return
+        self.thread_id = threading.get_ident()
+        self.running = True
+        _watchdog = self
+        tkinter.CallWrapper.__call__ = _timed_call
+        self.expected = time.perf_counter() + self.heartbeat_ms / 1000
+        self.scheduled = self.root.after(self.heartbeat_ms, self._heartbeat)
+        self.monitor = threading.Thread(target=self._watch, name='event-watchdog', daemon=True)
+        self.monitor.start()
+
+    def stop(self):
+        """Stop watching"""
+        global _watchdog
+        self.running = False
+        if _watchdog is self:
+            _watchdog = None
+        if self.scheduled is not None:
+            try:
+                self.root.after_cancel(self.scheduled)
+            except tkinter.TclError:
+                pass
+            self.scheduled = None
+
+    def _heartbeat(self):
+        now = time.perf_counter()
+        lag = max((now - self.expected) * 1000, 0.0)
+        self.lags.append(lag)
+        if lag > self.max_lag_ms:
+            self.max_lag_ms = lag
+        self.expected = now + self.heartbeat_ms / 1000
+        if self.running:
+            try:
+                self.scheduled = self.root.after(self.heartbeat_ms, self._heartbeat)
+            except tkinter.TclError:
+                # Application destroyed
+                self.running = False
+
+    def _run_callback(self, wrapper, args):
+        now = time.perf_counter()
+        if self.active:
+            # Called from a nested event loop - the outer callback's stretch ends here
+            outer = self.active[-1]
+            outer[4] = max(outer[4], now - outer[1])
+        entry = [wrapper.func, now, None, False, 0.0]
+        self.active.append(entry)
+        try:
+            return _original_call(wrapper, *args)
+        finally:
+            now = time.perf_counter()
+            if len(self.active) > 1:
+                # The outer callback blocks again from here
+                self.active[-2][1] = now
+            self.active.pop()
+            self.callbacks += 1
+            ms = max(entry[4], now - entry[1]) * 1000
+            if ms >= self.threshold_ms:
+                self._record(entry, ms, done=True)
+
+    def _watch(self):
+        # Check often enough to catch a callback soon after it passes the threshold
+        interval = max(self.threshold_ms / 4, 10) / 1000
+        while self.running:
+            time.sleep(interval)
+            try:
+                entry = self.active[-1]
+            except IndexError:
+                continue
+            ms = (time.perf_counter() - entry[1]) * 1000
+            if entry[2] is None and ms >= self.threshold_ms:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame is not None:
+                    entry[2] = _format_stack(frame)
+            if not entry[3] and ms >= HANG_MS:
+                entry[3] = True
+                self._write_log(self._event(entry, ms, done=False))
+
+    def _event(self, entry, ms, done):
+        return {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time() - ms / 1000)),
+            'ms': ms,
+            'callback': _callback_name(entry[0]),
+            'done': done,
+            'stack': entry[2] or "(returned before the stack was captured)\n"
+        }
+
+    def _record(self, entry, ms, done):
+        event = self._event(entry, ms, done)
+        self.blocked += 1
+        self.events.append(event)
+        self._write_log(event)
+
+    def _write_log(self, event):
+        if not self.log_path:
+            return
+        state = f"blocked the event loop for {event['ms']:.0f} ms" if event['done'] else f"still running after {event['ms']:.0f} ms"
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as log:
+                log.write(f"{event['time']}  {event['callback']} {state}\n{event['stack']}\n")
+        except OSError as ex:
+            print(f"Error writing event watchdog log: {str(ex)}")
+
+    def stats(self):
+        """
+        Responsiveness figures
+
+        Returns:
+            Dict with lag_ms (latest), lag_p50_ms, lag_p99_ms and lag_max_ms of the heartbeat,
+            callbacks timed, blocked (callbacks over the threshold), threshold_ms and log_path
+        """
+        lags = sorted(self.lags)
+        return {
+            'lag_ms': self.lags[-1] if self.lags else 0.0,
+            'lag_p50_ms': lags[len(lags) // 2] if lags else 0.0,
+            'lag_p99_ms': lags[min(int(len(lags) * 0.99), len(lags) - 1)] if lags else 0.0,
+            'lag_max_ms': self.max_lag_ms,
+            'callbacks': self.callbacks,
+            'blocked': self.blocked,
+            'threshold_ms': self.threshold_ms,
+            'log_path': self.log_path
+        }
+
+    def recent_events(self):
+        """Recorded freezes, newest first"""
+        return list(reversed(self.events))
+
+
+def get_watchdog(widget=None):
+    """
+    The process-wide watchdog, started on widget's Tk application if not yet running
+    (unless IMS_WATCHDOG=0)
+
+    Args:
+        widget: Any widget of the application, or None to only look up
+
+    Returns:
+        EventWatchdog, or None if none is running
+    """
+    with _watchdog_lock:
+        if _watchdog is None and widget is not None and os.environ.get('IMS_WATCHDOG', '1').lower() not in ('0', 'false', 'no', 'off'):
+            EventWatchdog(widget._root()).start()
+        return _watchdog
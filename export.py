@@ -0,0 +1,96 @@
+from tkinter import*
+from tkinter import ttk,messagebox,filedialog
+import threading
+from export_data import EXPORTS,FORMATS,export_tables
+
+class exportClass:
+    def __init__(self,root):
+        self.root=root
+        self.root.geometry("600x420+520+220")
+        self.root.title("")
+        self.root.config(bg="white")
+        self.root.resizable(False,False)
+        self.root.focus_force()
+
+        #------------ variables -------------
+        self.var_tables={table:IntVar(value=1) for table in EXPORTS}
+        self.var_format=StringVar(value=FORMATS[0])
+        self.var_from=StringVar()
+        self.var_to=StringVar()
+        self.var_folder=StringVar(value="export")
+        self.progress=""
+        self.worker=None
+        #--------------- title ---------------------
+        lbl_title=Label(self.root,text="Export Data",font=("goudy old style",30),bg="#184a45",fg="white",bd=3,relief=RIDGE).pack(side=TOP,fill=X,padx=10,pady=20)
+
+        y=95
+        for table in EXPORTS:
+            Checkbutton(self.root,text=table,variable=self.var_tables[table],font=("times new roman",14),bg="white").place(x=20,y=y)
+            y+=35
+
+        lbl_format=Label(self.root,text="Format",font=("times new roman",14),bg="white").place(x=250,y=95)
+        cmb_format=ttk.Combobox(self.root,textvariable=self.var_format,values=FORMATS,state='readonly',justify=CENTER,font=("times new roman",14))
+        cmb_format.place(x=380,y=95,width=190)
+
+        lbl_from=Label(self.root,text="From (Y-M-D)",font=("times new roman",14),bg="white").place(x=250,y=135)
+        txt_from=Entry(self.root,textvariable=self.var_from,font=("times new roman",14),bg="lightyellow").place(x=380,y=135,width=190)
+        lbl_to=Label(self.root,text="To (Y-M-D)",font=("times new roman",14),bg="white").place(x=250,y=175)
+        txt_to=Entry(self.root,textvariable=self.var_to,font=("times new roman",14),bg="lightyellow").place(x=380,y=175,width=190)
+
+        lbl_folder=Label(self.root,text="Folder",font=("times new roman",14),bg="white").place(x=20,y=250)
+        txt_folder=Entry(self.root,textvariable=self.var_folder,font=("times new roman",14),bg="lightyellow").place(x=100,y=250,width=370)
+        btn_browse=Button(self.root,text="Browse",command=self.browse,font=("times new roman",12),bg="#607d8b",fg="white",cursor="hand2").place(x=480,y=250,width=90,height=28)
+
+        self.btn_export=Button(self.root,text="Export",command=self.export,font=("times new roman",15,"bold"),bg="#4caf50",fg="white",cursor="hand2")
+        self.btn_export.place(x=20,y=300,width=550,height=35)
+
+        self.lbl_status=Label(self.root,text="Date filters apply to receipts and logs. Products are always exported whole.",font=("times new roman",12),bg="white",anchor="w")
+        self.lbl_status.place(x=20,y=350,width=550,height=28)
+#----------------------------------------------------------------------------------------------------
+    def browse(self):
+        folder=filedialog.askdirectory(parent=self.root)
+        if folder:
+            self.var_folder.set(folder)
+
+    def export(self):
+        tables=[table for table,var in self.var_tables.items() if var.get()==1]
+        if len(tables)==0:
+            messagebox.showerror("Error","Select at least one table",parent=self.root)
+        elif self.var_folder.get()=="":
+            messagebox.showerror("Error","Folder is required",parent=self.root)
+        else:
+            #------- export on a worker thread so the window stays responsive --------
+            self.btn_export.config(state=DISABLED)
+            self.result=None
+            self.worker=threading.Thread(target=self.run_export,args=(tables,self.var_format.get(),self.var_folder.get(),self.var_from.get() or None,self.var_to.get() or None),daemon=True)
+            self.worker.start()
+            self.poll()
+
+    def run_export(self,tables,fmt,folder,date_from,date_to):
+        try:
+            self.result=export_tables(r'ims.db',tables,folder,fmt,date_from,date_to,progress=self.on_progress)
+        except Exception as ex:
+            self.result=ex
+
+    def on_progress(self,table,rows):
+        self.progress=f"Exporting {table}: {rows} rows"
+
+    def poll(self):
+        if self.worker.is_alive():
+            self.lbl_status.config(text=self.progress)
+            self.root.after(200,self.poll)
+            return
+        self.btn_export.config(state=NORMAL)
+        if isinstance(self.result,Exception):
+            self.lbl_status.config(text="Export failed")
+            messagebox.showerror("Error",f"Error due to : {str(self.result)}",parent=self.root)
+        else:
+            total=sum(rows for path,rows in self.result.values())
+            self.lbl_status.config(text=f"Exported {total} rows to {self.var_folder.get()}")
+            messagebox.showinfo("Success",f"Exported {total} rows",parent=self.root)
+
+
+if __name__=="__main__":
+    root=Tk()
+    obj=exportClass(root)
+    root.mainloop()
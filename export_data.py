@@ -0,0 +1,249 @@
+"""
+Data Export Module
+Streams products, receipts and logs to CSV or Parquet in fixed-size chunks
+"""
+
+import os
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+from create_db import ensure_db
+from archive_logs import ARCHIVE_SCHEMA, attached_archives
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+FORMATS = ('csv', 'parquet')
+DEFAULT_CHUNK_SIZE = 10000
+
+# Table -> (query on schema {0}, date column used for --from/--to filters or None,
+# archive_manifest row count of archived tables or None)
+EXPORTS = {
+    'product': ("SELECT pid, Category, Supplier, name, price, qty, status FROM {0}.product", None, None),
+    'receipt_logs': ("SELECT * FROM {0}.receipt_logs", 'upload_date', 'receipt_rows'),
+    'receipt_items': (
+        """SELECT i.item_id, i.receipt_id, i.product_id, i.product_name, i.quantity,
+        i.unit_price, i.total_price, i.action, r.upload_date
+        FROM {0}.receipt_items i JOIN {0}.receipt_logs r ON r.receipt_id=i.receipt_id""",
+        'r.upload_date',
+        'item_rows'
+    ),
+    'transaction_logs': ("SELECT * FROM {0}.transaction_logs", 'timestamp', 'txn_rows'),
+}
+
+
+def build_query(table, date_from=None, date_to=None, schema='main'):
+    """
+    SQL and parameters for one export
+
+    Args:
+        table: Key of EXPORTS
+        date_from: First day 'YYYY-MM-DD' (inclusive) or None
+        date_to: Last day 'YYYY-MM-DD' (inclusive) or None
+        schema: 'main' for the live rows or ARCHIVE_SCHEMA for an attached archive
+
+    Returns:
+        (sql, params)
+    """
+    if table not in EXPORTS:
+        raise ValueError(f"Unknown table '{table}'. Choose from: {', '.join(EXPORTS)}")
+    sql, date_column, _ = EXPORTS[table]
+    sql = sql.format(schema)
+    conditions = []
+    params = []
+    if (date_from or date_to) and not date_column:
+        raise ValueError(f"'{table}' has no date column to filter on")
+    if date_from:
+        conditions.append(f"{date_column}>=?")
+        params.append(date_from)
+    if date_to:
+        # Timestamps carry a time part, so compare against the start of the next day
+        conditions.append(f"{date_column}<date(?, '+1 day')")
+        params.append(date_to)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, params
+
+
+def archive_filter(table, date_from=None, date_to=None):
+    """
+    archive_manifest WHERE clause for the archived months holding rows of the export
+
+    Returns:
+        (where clause, list of parameters), or None if the table is never archived
+    """
+    row_count = EXPORTS[table][2]
+    if not row_count:
+        return None
+    conditions = [f"{row_count}>0"]
+    params = []
+    if date_from:
+        conditions.append("month>=substr(?, 1, 7)")
+        params.append(date_from)
+    if date_to:
+        conditions.append("month<=substr(?, 1, 7)")
+        params.append(date_to)
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def _cursors(con, table, date_from=None, date_to=None):
+    """
+    Yields:
+        A cursor over the rows of each archived month, oldest first, then one over the live rows
+    """
+    archives = archive_filter(table, date_from, date_to)
+    if archives:
+        for _ in attached_archives(con, *archives, newest_first=False):
+            sql, params = build_query(table, date_from, date_to, ARCHIVE_SCHEMA)
+            yield con.execute(sql, params)
+    sql, params = build_query(table, date_from, date_to)
+    yield con.execute(sql, params)
+
+
+def _chunks(cursors, chunk_size):
+    for cur in cursors:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+def _parquet_schema(con, table, columns):
+    """Arrow schema from the declared SQLite column types (text columns stay strings)"""
+    declared = {}
+    for source in ('receipt_logs', 'receipt_items') if table == 'receipt_items' else (table,):
+        for _, name, col_type, *_ in con.execute(f"PRAGMA table_info({source})"):
+            declared.setdefault(name, col_type.upper())
+    types = {'INTEGER': pa.int64(), 'REAL': pa.float64()}
+    return pa.schema([(name, types.get(declared.get(name), pa.string())) for name in columns])
+
+
+def export_table(db_path, table, out_path, fmt='csv', date_from=None, date_to=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Stream one table to a file - at most chunk_size rows are held in memory
+
+    Log tables include the rows of archived months in the date range (all months
+    without one), oldest month first and the live rows last.
+
+    Args:
+        db_path: Path to the SQLite database
+        table: Key of EXPORTS
+        out_path: Output file path
+        fmt: 'csv' or 'parquet'
+        date_from: First day 'YYYY-MM-DD' (inclusive) or None
+        date_to: Last day 'YYYY-MM-DD' (inclusive) or None
+        chunk_size: Rows fetched and written per chunk
+        progress: Optional callable(table, rows_written) called after each chunk
+
+    Returns:
+        Number of rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    if fmt == 'parquet' and not HAS_PYARROW:
+        raise RuntimeError("pyarrow is required for Parquet export. Install with: pip install pyarrow")
+
+    # Column names of the live table - archives are created with the same definitions
+    columns_sql = build_query(table)[0]
+    ensure_db(db_path)
+    con = sqlite3.connect(db_path)
+    tmp_path = out_path + '.part'
+    written = 0
+    chunks = _chunks(_cursors(con, table, date_from, date_to), chunk_size)
+    try:
+        columns = [column[0] for column in con.execute(columns_sql + " LIMIT 0").description]
+
+        if fmt == 'csv':
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for rows in chunks:
+                    writer.writerows(rows)
+                    written += len(rows)
+                    if progress:
+                        progress(table, written)
+        else:
+            schema = _parquet_schema(con, table, columns)
+            with pq.ParquetWriter(tmp_path, schema) as writer:
+                for rows in chunks:
+                    # Each chunk becomes one row group
+                    arrays = [
+                        pa.array([row[i] for row in rows], type=field.type)
+                        for i, field in enumerate(schema)
+                    ]
+                    writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                    written += len(rows)
+                    if progress:
+                        progress(table, written)
+
+        # Only a complete export replaces the output file
+        os.replace(tmp_path, out_path)
+        return written
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        # Detaches an archive left attached by a failed export
+        chunks.close()
+        con.close()
+
+
+def export_tables(db_path, tables, out_dir, fmt='csv', date_from=None, date_to=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Export several tables to <out_dir>/<table>.<fmt>
+
+    Returns:
+        Dict of table -> (path, rows written)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = {}
+    for table in tables:
+        # The product table has no date column - it is always exported whole
+        has_date = EXPORTS[table][1] is not None
+        path = os.path.join(out_dir, f"{table}.{fmt}")
+        rows = export_table(
+            db_path, table, path, fmt,
+            date_from if has_date else None, date_to if has_date else None,
+            chunk_size, progress
+        )
+        results[table] = (path, rows)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export products, receipts and logs")
+    parser.add_argument('tables', nargs='*', help=f"Tables to export: {', '.join(EXPORTS)} (default: all)")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--out-dir', default='export', help="Folder for the exported files")
+    parser.add_argument('--from', dest='date_from', help="First day YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="Last day YYYY-MM-DD")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    for table in args.tables:
+        if table not in EXPORTS:
+            parser.error(f"unknown table '{table}'")
+
+    start = time.perf_counter()
+    results = export_tables(
+        args.db, args.tables or list(EXPORTS), args.out_dir, args.format,
+        args.date_from, args.date_to, args.chunk_size
+    )
+    for table, (path, rows) in results.items():
+        print(f"{table:18} {rows:10} rows -> {path}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+from tkinter import*
+from tkinter import ttk,messagebox,filedialog
+import threading
+from product_import import ProductImporter,write_rejected_report
+
+class importClass:
+    def __init__(self,root):
+        self.root=root
+        self.root.geometry("800x500+420+200")
+        self.root.title("")
+        self.root.config(bg="white")
+        self.root.resizable(False,False)
+        self.root.focus_force()
+
+        #------------ variables -------------
+        self.var_file=StringVar()
+        self.var_create=IntVar(value=0)
+        self.var_dry_run=IntVar(value=0)
+        self.progress=0
+        self.result=None
+        self.worker=None
+        #--------------- title ---------------------
+        lbl_title=Label(self.root,text="Import Products",font=("goudy old style",30),bg="#184a45",fg="white",bd=3,relief=RIDGE).pack(side=TOP,fill=X,padx=10,pady=20)
+
+        lbl_file=Label(self.root,text="File",font=("times new roman",14),bg="white").place(x=20,y=95)
+        txt_file=Entry(self.root,textvariable=self.var_file,font=("times new roman",14),bg="lightyellow").place(x=80,y=95,width=580)
+        btn_browse=Button(self.root,text="Browse",command=self.browse,font=("times new roman",12),bg="#607d8b",fg="white",cursor="hand2").place(x=670,y=95,width=110,height=28)
+
+        Checkbutton(self.root,text="Create missing categories and suppliers",variable=self.var_create,font=("times new roman",13),bg="white").place(x=20,y=135)
+        Checkbutton(self.root,text="Validate only",variable=self.var_dry_run,font=("times new roman",13),bg="white").place(x=370,y=135)
+        self.btn_import=Button(self.root,text="Import",command=self.start_import,font=("times new roman",15,"bold"),bg="#4caf50",fg="white",cursor="hand2")
+        self.btn_import.place(x=520,y=132,width=120,height=32)
+        btn_report=Button(self.root,text="Save Rejected",command=self.save_report,font=("times new roman",12),bg="#f44336",fg="white",cursor="hand2").place(x=650,y=132,width=130,height=32)
+
+        self.lbl_status=Label(self.root,text="Columns: name, category, supplier, price, qty and optionally status, reorder_level",font=("times new roman",12),bg="white",anchor="w")
+        self.lbl_status.place(x=20,y=172,width=760,height=26)
+
+        #------------ rejected rows -------------
+        reject_frame=Frame(self.root,bd=3,relief=RIDGE)
+        reject_frame.place(x=20,y=205,width=760,height=280)
+
+        scrolly=Scrollbar(reject_frame,orient=VERTICAL)
+        self.RejectTable=ttk.Treeview(reject_frame,columns=("row","reason","name"),yscrollcommand=scrolly.set)
+        scrolly.pack(side=RIGHT,fill=Y)
+        scrolly.config(command=self.RejectTable.yview)
+        self.RejectTable.heading("row",text="Row")
+        self.RejectTable.heading("reason",text="Rejected Because")
+        self.RejectTable.heading("name",text="Name")
+        self.RejectTable["show"]="headings"
+        self.RejectTable.column("row",width=60)
+        self.RejectTable.column("reason",width=400)
+        self.RejectTable.column("name",width=250)
+        self.RejectTable.pack(fill=BOTH,expand=1)
+#----------------------------------------------------------------------------------------------------
+    def browse(self):
+        path=filedialog.askopenfilename(parent=self.root,filetypes=[("Product lists","*.csv *.xlsx"),("All files","*.*")])
+        if path:
+            self.var_file.set(path)
+
+    def start_import(self):
+        if self.var_file.get()=="":
+            messagebox.showerror("Error","Select a CSV or XLSX file",parent=self.root)
+        else:
+            #------- import on a worker thread so the window stays responsive --------
+            self.btn_import.config(state=DISABLED)
+            self.RejectTable.delete(*self.RejectTable.get_children())
+            self.progress=0
+            self.result=None
+            self.worker=threading.Thread(target=self.run_import,args=(self.var_file.get(),self.var_create.get()==1,self.var_dry_run.get()==1),daemon=True)
+            self.worker.start()
+            self.poll()
+
+    def run_import(self,path,create_missing,dry_run):
+        try:
+            importer=ProductImporter(r'ims.db',create_missing=create_missing)
+            self.result=importer.import_file(path,dry_run=dry_run,progress=self.on_progress)
+        except Exception as ex:
+            self.result=ex
+
+    def on_progress(self,rows):
+        self.progress=rows
+
+    def poll(self):
+        if self.worker.is_alive():
+            self.lbl_status.config(text=f"Read {self.progress} rows...")
+            self.root.after(200,self.poll)
+            return
+        self.btn_import.config(state=NORMAL)
+        if isinstance(self.result,Exception):
+            self.lbl_status.config(text="Import failed")
+            messagebox.showerror("Error",f"Error due to : {str(self.result)}",parent=self.root)
+            return
+        stats=self.result
+        self.lbl_status.config(text=f"Read {stats['rows']} rows: {stats['inserted']} inserted, {stats['updated']} updated, {len(stats['rejected'])} rejected in {stats['seconds']:.1f}s")
+        for number,reason,raw in stats['rejected']:
+            self.RejectTable.insert('',END,values=(number,reason,raw.get('name','')))
+
+    def save_report(self):
+        if not isinstance(self.result,dict) or len(self.result['rejected'])==0:
+            messagebox.showerror("Error","No rejected rows to save",parent=self.root)
+            return
+        path=filedialog.asksaveasfilename(parent=self.root,defaultextension=".csv",filetypes=[("CSV files","*.csv")],initialfile="rejected_products.csv")
+        if path:
+            try:
+                write_rejected_report(self.result['rejected'],path)
+                messagebox.showinfo("Success",f"Rejected rows saved to {path}",parent=self.root)
+            except Exception as ex:
+                messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
+
+
+if __name__=="__main__":
+    root=Tk()
+    obj=importClass(root)
+    root.mainloop()
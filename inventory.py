@@ -0,0 +1,99 @@
+from tkinter import*
+from tkinter import ttk,messagebox,filedialog
+from inventory_report import InventoryReport
+
+class inventoryClass:
+    def __init__(self,root):
+        self.root=root
+        self.root.geometry("1100x500+320+220")
+        self.root.title("")
+        self.root.config(bg="white")
+        self.root.resizable(False,False)
+        self.root.focus_force()
+
+        #------------ variables -------------
+        self.var_dead_days=StringVar(value="90")
+        self.report=None
+        #--------------- title ---------------------
+        lbl_title=Label(self.root,text="Inventory Valuation",font=("goudy old style",30),bg="#184a45",fg="white",bd=3,relief=RIDGE).pack(side=TOP,fill=X,padx=10,pady=20)
+
+        lbl_dead=Label(self.root,text="Dead Stock After (days)",font=("times new roman",15),bg="white").place(x=10,y=95)
+        txt_dead=Entry(self.root,textvariable=self.var_dead_days,font=("times new roman",15),bg="lightyellow").place(x=230,y=95,width=70)
+        btn_show=Button(self.root,text="Refresh",command=self.show,font=("times new roman",15,"bold"),bg="#2196f3",fg="white",cursor="hand2").place(x=310,y=95,width=110,height=28)
+        btn_export=Button(self.root,text="Export CSV",command=self.export,font=("times new roman",15,"bold"),bg="#4caf50",fg="white",cursor="hand2").place(x=430,y=95,width=130,height=28)
+
+        self.lbl_totals=Label(self.root,text="",font=("times new roman",13),bg="white",anchor="w",justify=LEFT)
+        self.lbl_totals.place(x=570,y=90,width=520,height=40)
+
+        #------------ category / supplier tables -------------
+        self.CategoryTable=self.make_table(10,"Category")
+        self.SupplierTable=self.make_table(555,"Supplier")
+
+        self.show()
+#----------------------------------------------------------------------------------------------------
+    def make_table(self,x,title):
+        frame=Frame(self.root,bd=3,relief=RIDGE)
+        frame.place(x=x,y=140,width=535,height=350)
+
+        scrolly=Scrollbar(frame,orient=VERTICAL)
+        table=ttk.Treeview(frame,columns=("name","skus","units","value","out","dead","dead_value"),yscrollcommand=scrolly.set)
+        scrolly.pack(side=RIGHT,fill=Y)
+        scrolly.config(command=table.yview)
+        table.heading("name",text=title)
+        table.heading("skus",text="SKUs")
+        table.heading("units",text="Units")
+        table.heading("value",text="Stock Value")
+        table.heading("out",text="Out")
+        table.heading("dead",text="Dead")
+        table.heading("dead_value",text="Dead Value")
+        table["show"]="headings"
+        table.column("name",width=120)
+        table.column("skus",width=50)
+        table.column("units",width=60)
+        table.column("value",width=100)
+        table.column("out",width=40)
+        table.column("dead",width=45)
+        table.column("dead_value",width=100)
+        table.pack(fill=BOTH,expand=1)
+        return table
+
+    def build(self):
+        dead_days=int(self.var_dead_days.get())
+        if self.report is None:
+            self.report=InventoryReport(dead_days=dead_days)
+        self.report.dead_days=dead_days
+        return self.report.build()
+
+    def show(self):
+        try:
+            result=self.build()
+            totals=result['totals']
+            self.lbl_totals.config(text=f"Stock Value Rs.{totals['value']:.2f} | SKUs {totals['skus']} | Units {totals['units']}\n"
+                                        f"Out of Stock {totals['out_of_stock']} | Dead Stock {totals['dead_stock']} (Rs.{totals['dead_value']:.2f})")
+            for table,rows in ((self.CategoryTable,result['by_category']),(self.SupplierTable,result['by_supplier'])):
+                table.delete(*table.get_children())
+                for row in rows:
+                    table.insert('',END,values=(row['name'],row['skus'],row['units'],f"{row['value']:.2f}",row['out_of_stock'],row['dead_stock'],f"{row['dead_value']:.2f}"))
+        except ValueError:
+            messagebox.showerror("Error","Dead stock days must be a number",parent=self.root)
+        except Exception as ex:
+            messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
+
+    def export(self):
+        path=filedialog.asksaveasfilename(parent=self.root,defaultextension=".csv",filetypes=[("CSV files","*.csv")],initialfile="inventory_report.csv")
+        if not path:
+            return
+        try:
+            self.build()
+            self.report.export_csv(path)
+            messagebox.showinfo("Success",f"Report saved to {path}",parent=self.root)
+        except ValueError:
+            messagebox.showerror("Error","Dead stock days must be a number",parent=self.root)
+        except Exception as ex:
+            messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
+
+
+if __name__=="__main__":
+    root=Tk()
+    obj=inventoryClass(root)
+    root.mainloop()
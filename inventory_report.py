@@ -0,0 +1,387 @@
+"""
+Inventory Report Module
+Stock valuation and stock health by category and supplier, computed on NumPy column arrays.
+Products come from the process-wide catalog cache and last sale days from a process-wide
+cache of the sales rollups, so only the first report in a process reads every product.
+"""
+
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from operator import itemgetter
+from datetime import datetime, timedelta
+from create_db import ensure_db
+from catalog_cache import get_catalog
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+DAY_FORMAT = '%Y-%m-%d'
+EPOCH = datetime(1970, 1, 1)
+UNCATEGORIZED = 'Uncategorized'
+NO_SUPPLIER = 'No Supplier'
+# Julian day of 1970-01-01
+EPOCH_JULIAN = 2440587.5
+
+_last_sold = {}
+_last_sold_lock = threading.Lock()
+
+
+def _price(value):
+    # Like CAST(price AS REAL) for the usual values - text that is not a number counts as 0
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+
+class LastSoldCache:
+    """
+    Last sale day of every product that ever sold, from sales_daily_product
+
+    Sales only add to the rollups of the day they happen on, so after the first load
+    only days from the newest loaded day on are read again. Earlier days change only
+    when the rollups are rebuilt or pulled onto a till; a row count and id total of
+    those days detects that and forces a full load.
+    """
+
+    def __init__(self, db_path='ims.db'):
+        """
+        Args:
+            db_path: Path to the SQLite database
+        """
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy is required for the inventory report. Install with: pip install numpy")
+        ensure_db(db_path)
+        self.con = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.pids = np.zeros(0, dtype=np.int64)
+        self.days = np.zeros(0, dtype=np.int32)
+        # Newest loaded day and the (count, id total) of the rows before it
+        self.newest = None
+        self.fingerprint = None
+
+    def _rows(self, since=None):
+        rows = self.con.execute(
+            f"""SELECT product_id, CAST(julianday(MAX(day)) - {EPOCH_JULIAN} AS INTEGER), MAX(day)
+            FROM sales_daily_product {'WHERE day>=?' if since else ''}
+            GROUP BY product_id ORDER BY product_id""",
+            (since,) if since else ()
+        ).fetchall()
+        pids = np.fromiter(map(itemgetter(0), rows), dtype=np.int64, count=len(rows))
+        days = np.fromiter(map(itemgetter(1), rows), dtype=np.int32, count=len(rows))
+        return pids, days, max(map(itemgetter(2), rows), default=since)
+
+    def _fingerprint(self):
+        return self.con.execute(
+            "SELECT COUNT(*), TOTAL(product_id) FROM sales_daily_product WHERE day<?", (self.newest or '',)
+        ).fetchone()
+
+    def refresh(self):
+        """Bring the cache up to date if another connection committed since the last check"""
+        with self.lock:
+            data_version = self.con.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self.data_version:
+                return
+            self.con.execute("BEGIN")
+            try:
+                if self.newest is None or self._fingerprint() != self.fingerprint:
+                    self.pids, self.days, self.newest = self._rows()
+                else:
+                    pids, days, self.newest = self._rows(self.newest)
+                    index = np.searchsorted(self.pids, pids)
+                    found = index < self.pids.size
+                    found[found] = self.pids[index[found]] == pids[found]
+                    self.days[index[found]] = np.maximum(self.days[index[found]], days[found])
+                    # New pids are sorted, so inserting them at their positions keeps self.pids sorted
+                    self.pids = np.insert(self.pids, index[~found], pids[~found])
+                    self.days = np.insert(self.days, index[~found], days[~found])
+                self.fingerprint = self._fingerprint()
+            finally:
+                self.con.execute("COMMIT")
+            self.data_version = data_version
+
+    def lookup(self, pids):
+        """
+        Last sale day of each product
+
+        Args:
+            pids: Sorted array of product ids
+
+        Returns:
+            Array of days since 1970-01-01, -1 for products that never sold
+        """
+        with self.lock:
+            last_sold = np.full(pids.size, -1, dtype=np.int32)
+            if self.pids.size and pids.size:
+                index = np.searchsorted(pids, self.pids)
+                index[index == pids.size] = 0
+                found = pids[index] == self.pids
+                last_sold[index[found]] = self.days[found]
+            return last_sold
+
+
+def get_last_sold(db_path='ims.db'):
+    """
+    The process-wide last sale cache for db_path, brought up to date
+
+    Returns:
+        LastSoldCache
+    """
+    with _last_sold_lock:
+        cache = _last_sold.get(db_path)
+        if cache is None:
+            cache = _last_sold[db_path] = LastSoldCache(db_path)
+    cache.refresh()
+    return cache
+
+
+class InventoryReport:
+    """
+    Copies the product catalog into column arrays once and builds the report from them
+
+    Both the columns and the finished report are cached against PRAGMA data_version
+    of a connection held open by the report, so they are rebuilt only after another
+    connection commits a change.
+    """
+
+    def __init__(self, db_path='ims.db', dead_days=90):
+        """
+        Args:
+            db_path: Path to the SQLite database
+            dead_days: Products in stock but not sold for this many days count as dead stock
+                (products added within that time are not counted)
+        """
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy is required for the inventory report. Install with: pip install numpy")
+        ensure_db(db_path)
+        self.db_path = db_path
+        self.dead_days = dead_days
+        self.con = sqlite3.connect(db_path, check_same_thread=False)
+        self.columns = None
+        self.columns_version = None
+        self.report = None
+        self.report_key = None
+
+    def data_version(self):
+        """Version stamp that changes whenever another connection commits"""
+        return self.con.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_columns(self):
+        """
+        Copy the product columns out of the catalog cache (cached until the data changes)
+
+        Returns:
+            Dict of arrays: pid, price, qty, active, category, supplier (int codes),
+            last_sold (days since epoch, -1 if never) and the category/supplier name lists
+        """
+        version = self.data_version()
+        if self.columns is not None and self.columns_version == version:
+            return self.columns
+
+        catalog = get_catalog(self.db_path)
+        with catalog.lock:
+            count = len(catalog)
+            pids = np.array(catalog.pids, dtype=np.int64)
+            qtys = np.array(catalog.qtys, dtype=np.int64)
+            category_codes = np.array(catalog.category_codes, dtype=np.int64)
+            supplier_codes = np.array(catalog.supplier_codes, dtype=np.int64)
+            status_codes = np.array(catalog.status_codes, dtype=np.int64)
+            active_code = catalog.statuses.codes.get('Active', -1)
+            texts = list(catalog.texts.values)
+            # Prices are kept as text, one string per distinct price
+            price_of = {}
+            prices = np.fromiter(
+                (price_of[price] if price in price_of else price_of.setdefault(price, _price(price))
+                 for price in catalog.prices),
+                dtype=np.float64, count=count
+            )
+
+        def regroup(codes, default):
+            # The catalog codes all its repeating text together - number the values
+            # used here from 0 and merge empty names into the default group
+            names = {}
+            remap = np.zeros(len(texts), dtype=np.int32)
+            for code in np.unique(codes).tolist():
+                remap[code] = names.setdefault(texts[code] or default, len(names))
+            return remap[codes], list(names)
+
+        category, category_names = regroup(category_codes, UNCATEGORIZED)
+        supplier, supplier_names = regroup(supplier_codes, NO_SUPPLIER)
+        columns = {
+            'pid': pids,
+            'price': prices,
+            'qty': qtys,
+            'active': status_codes == active_code,
+            'category': category,
+            'supplier': supplier,
+            'category_names': category_names,
+            'supplier_names': supplier_names,
+            # Last sale day from the daily rollups (bills and sales receipts), as days
+            # since 1970-01-01 so the dead stock test is a single comparison
+            'last_sold': get_last_sold(self.db_path).lookup(pids),
+        }
+
+        self.columns = columns
+        self.columns_version = version
+        return columns
+
+    def new_products(self, since):
+        """
+        Products added on or after a day, by the opening stock row start_tracking writes
+
+        A later 'adjust' up from 0 (restocking by hand) is not an opening row, so the
+        product must have no earlier movement or checkpoint.
+
+        Args:
+            since: 'YYYY-MM-DD'
+
+        Returns:
+            Array of product ids
+        """
+        rows = self.con.execute(
+            """SELECT DISTINCT t.product_id FROM transaction_logs t
+            WHERE t.timestamp>=? AND t.action='adjust' AND t.old_qty=0
+            AND NOT EXISTS (SELECT 1 FROM transaction_logs e WHERE e.product_id=t.product_id AND e.txn_id<t.txn_id)
+            AND NOT EXISTS (SELECT 1 FROM stock_checkpoints c WHERE c.product_id=t.product_id AND c.txn_id<t.txn_id)""",
+            (since,)
+        ).fetchall()
+        return np.fromiter(map(itemgetter(0), rows), dtype=np.int64, count=len(rows))
+
+    def build(self, today=None):
+        """
+        Build the valuation and stock-health report (cached per data version and day)
+
+        Args:
+            today: datetime used for the dead stock cut-off (default: now)
+
+        Returns:
+            Dict with 'totals' (dict), 'by_category' and 'by_supplier'
+            (lists of dicts with name, skus, units, value, out_of_stock, dead_stock, dead_value)
+        """
+        today = today or datetime.now()
+        columns = self.load_columns()
+        key = (self.columns_version, self.dead_days, today.strftime(DAY_FORMAT))
+        if self.report is not None and self.report_key == key:
+            return self.report
+
+        qty = columns['qty']
+        units = np.clip(qty, 0, None)
+        value = units * columns['price']
+        out_of_stock = qty <= 0
+        cutoff_day = today - timedelta(days=self.dead_days)
+        cutoff = (cutoff_day - EPOCH).days
+        dead = (units > 0) & (columns['last_sold'] < cutoff)
+        # Products added within the window have not had the chance to sell yet
+        dead &= ~np.isin(columns['pid'], self.new_products(cutoff_day.strftime(DAY_FORMAT)))
+
+        totals = {
+            'skus': int(qty.size),
+            'active': int(columns['active'].sum()),
+            'units': int(units.sum()),
+            'value': float(value.sum()),
+            'out_of_stock': int(out_of_stock.sum()),
+            'dead_stock': int(dead.sum()),
+            'dead_value': float(value[dead].sum()),
+        }
+
+        self.report = {
+            'totals': totals,
+            'by_category': self._group(columns['category'], columns['category_names'], units, value, out_of_stock, dead),
+            'by_supplier': self._group(columns['supplier'], columns['supplier_names'], units, value, out_of_stock, dead),
+        }
+        self.report_key = key
+        return self.report
+
+    def _group(self, codes, names, units, value, out_of_stock, dead):
+        """Vectorized group-by over integer codes, largest stock value first"""
+        size = len(names)
+        skus = np.bincount(codes, minlength=size)
+        group_units = np.bincount(codes, weights=units, minlength=size)
+        group_value = np.bincount(codes, weights=value, minlength=size)
+        group_out = np.bincount(codes[out_of_stock], minlength=size)
+        group_dead = np.bincount(codes[dead], minlength=size)
+        group_dead_value = np.bincount(codes[dead], weights=value[dead], minlength=size)
+
+        return [
+            {
+                'name': names[i],
+                'skus': int(skus[i]),
+                'units': int(group_units[i]),
+                'value': float(group_value[i]),
+                'out_of_stock': int(group_out[i]),
+                'dead_stock': int(group_dead[i]),
+                'dead_value': float(group_dead_value[i]),
+            }
+            for i in np.argsort(-group_value, kind='stable')
+        ]
+
+    def export_csv(self, path, today=None):
+        """
+        Write the report to a CSV file - one row per category and supplier plus a total row
+
+        Args:
+            path: Output file path
+            today: datetime used for the dead stock cut-off (default: now)
+        """
+        report = self.build(today)
+        fields = ['name', 'skus', 'units', 'value', 'out_of_stock', 'dead_stock', 'dead_value']
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['group'] + fields)
+            for group in ('by_category', 'by_supplier'):
+                for row in report[group]:
+                    writer.writerow([group[3:]] + [
+                        f"{row[field]:.2f}" if isinstance(row[field], float) else row[field]
+                        for field in fields
+                    ])
+            totals = report['totals']
+            writer.writerow(['total', 'All Products'] + [
+                f"{totals[field]:.2f}" if isinstance(totals[field], float) else totals[field]
+                for field in fields[1:]
+            ])
+
+    def close(self):
+        self.con.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inventory valuation and stock-health report")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    parser.add_argument('--dead-days', type=int, default=90, help="Days without a sale before stock counts as dead")
+    parser.add_argument('--csv', help="Write the report to this CSV file")
+    args = parser.parse_args(argv)
+
+    report = InventoryReport(args.db, args.dead_days)
+    try:
+        start = time.perf_counter()
+        report.load_columns()
+        loaded = time.perf_counter()
+        result = report.build()
+        built = time.perf_counter()
+
+        totals = result['totals']
+        print(f"SKUs: {totals['skus']} ({totals['active']} active)")
+        print(f"Units in stock: {totals['units']}")
+        print(f"Stock value: {totals['value']:.2f}")
+        print(f"Out of stock: {totals['out_of_stock']}")
+        print(f"Dead stock (> {args.dead_days} days): {totals['dead_stock']} SKUs, value {totals['dead_value']:.2f}")
+        print(f"Load {loaded - start:.3f}s, compute {built - loaded:.3f}s")
+
+        if args.csv:
+            report.export_csv(args.csv)
+            print(f"Report written to {args.csv}")
+    finally:
+        report.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
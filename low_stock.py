@@ -0,0 +1,75 @@
+"""
+Low Stock Module
+Per-product reorder levels and the trigger-maintained low-stock watchlist
+"""
+
+# Used by the create_db triggers for products without their own reorder level
+DEFAULT_REORDER_LEVEL = 5
+
+
+def get_reorder_level(cur, pid):
+    """
+    Reorder level of a product
+
+    Args:
+        cur: Cursor or connection
+        pid: Product ID
+
+    Returns:
+        Reorder level as int (DEFAULT_REORDER_LEVEL if none was set)
+    """
+    row = cur.execute("SELECT reorder_level FROM product_reorder WHERE pid=?", (pid,)).fetchone()
+    return row[0] if row else DEFAULT_REORDER_LEVEL
+
+
+def set_reorder_level(cur, pid, level):
+    """
+    Set or clear the reorder level of a product
+
+    Triggers re-check the product against the new level, so the watchlist
+    is current when the caller commits.
+
+    Args:
+        cur: Cursor inside the caller's transaction
+        pid: Product ID
+        level: Reorder level, or None to fall back to DEFAULT_REORDER_LEVEL
+    """
+    if level is None:
+        cur.execute("DELETE FROM product_reorder WHERE pid=?", (pid,))
+    else:
+        cur.execute(
+            """INSERT INTO product_reorder (pid, reorder_level) VALUES (?, ?)
+            ON CONFLICT(pid) DO UPDATE SET reorder_level=excluded.reorder_level
+            WHERE reorder_level<>excluded.reorder_level""",
+            (pid, int(level))
+        )
+
+
+def watchlist_version(cur):
+    """
+    Version of the watchlist - changes only when a low-stock row is added, changed or removed
+
+    Args:
+        cur: Cursor or connection
+
+    Returns:
+        Version number
+    """
+    row = cur.execute("SELECT version FROM low_stock_state WHERE id=1").fetchone()
+    return row[0] if row else 0
+
+
+def low_stock_items(cur):
+    """
+    Products at or below their reorder level, most urgent first
+
+    Args:
+        cur: Cursor or connection
+
+    Returns:
+        List of (pid, name, qty, reorder_level, since)
+    """
+    return cur.execute(
+        """SELECT pid, name, qty, reorder_level, since FROM low_stock
+        ORDER BY qty - reorder_level, qty, name"""
+    ).fetchall()
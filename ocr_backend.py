@@ -0,0 +1,320 @@
+"""
+OCR Backend Module
+Pluggable text recognition backends used by ReceiptProcessor
+"""
+
+import os
+import queue
+import atexit
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# Try to import optional dependencies
+try:
+    import pytesseract
+    HAS_TESSERACT = True
+except ImportError:
+    HAS_TESSERACT = False
+    print("Warning: pytesseract not available. Manual entry will be used.")
+
+try:
+    import tesserocr
+    HAS_TESSEROCR = True
+except ImportError:
+    HAS_TESSEROCR = False
+
+try:
+    import pdf2image
+    HAS_PDF2IMAGE = True
+except ImportError:
+    HAS_PDF2IMAGE = False
+    print("Warning: pdf2image not available. PDF processing disabled.")
+
+
+DEFAULT_BACKEND = 'tesseract'
+
+
+class OCRBackend(ABC):
+    """Base class for OCR backends - turns receipt files into raw text"""
+
+    name = None
+
+    def is_available(self):
+        """Return True if the backend can extract text in this environment"""
+        return True
+
+    @abstractmethod
+    def image_to_string(self, image):
+        """
+        Recognize text in a single image
+
+        Args:
+            image: PIL image (already converted to grayscale)
+
+        Returns:
+            Extracted text string
+        """
+
+    def images_to_string(self, images):
+        """
+        Recognize text in several images (e.g. PDF pages)
+
+        Args:
+            images: List of PIL images
+
+        Returns:
+            List of extracted text strings, in page order
+        """
+        return [self.image_to_string(image) for image in images]
+
+    def extract_text(self, file_path):
+        """
+        Extract text from an image or PDF file
+
+        Args:
+            file_path: Path to the image or PDF file
+
+        Returns:
+            Extracted text string or empty string if not available
+        """
+        if file_path.lower().endswith('.pdf'):
+            if not HAS_PDF2IMAGE:
+                print("Note: pdf2image not available. Please enter items manually.")
+                return ""
+
+            # Convert PDF to grayscale page images
+            images = [page.convert('L') for page in pdf2image.convert_from_path(file_path)]
+            return "".join(text + "\n" for text in self.images_to_string(images))
+
+        # Convert to grayscale for better OCR
+        image = Image.open(file_path).convert('L')
+        return self.image_to_string(image)
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class TesseractBackend(OCRBackend):
+    """Runs the tesseract executable through pytesseract for every image"""
+
+    name = 'tesseract'
+
+    def __init__(self, lang='eng', config=''):
+        """
+        Args:
+            lang: Tesseract language code
+            config: Extra tesseract command line options
+        """
+        self.lang = lang
+        self.config = config
+
+    def is_available(self):
+        return HAS_TESSERACT
+
+    def image_to_string(self, image):
+        return pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+
+
+class TesserocrPoolBackend(OCRBackend):
+    """
+    Keeps a pool of warm tesseract engines (via tesserocr) and reuses them
+
+    Each engine loads the language model once and is then borrowed for every
+    image, so there is no process startup or temp file per receipt. Engines
+    release the GIL while recognizing, so threads share the pool in parallel.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, workers=2, lang='eng', tessdata_path=None):
+        """
+        Args:
+            workers: Number of engines kept warm
+            lang: Tesseract language code
+            tessdata_path: Optional tessdata directory
+        """
+        self.workers = max(1, int(workers))
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self._engines = queue.Queue()
+        self._all_engines = []
+        # Engines borrowed when the pool was closed - ended when they are returned
+        self._retired = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def is_available(self):
+        return HAS_TESSEROCR
+
+    def _new_engine(self):
+        if self.tessdata_path:
+            return tesserocr.PyTessBaseAPI(path=self.tessdata_path, lang=self.lang)
+        return tesserocr.PyTessBaseAPI(lang=self.lang)
+
+    def _acquire(self):
+        """Borrow an engine, starting a new one while the pool is below size"""
+        try:
+            return self._engines.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all_engines) < self.workers:
+                engine = self._new_engine()
+                self._all_engines.append(engine)
+                return engine
+
+        return self._engines.get()
+
+    def image_to_string(self, image):
+        engine = self._acquire()
+        try:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+        finally:
+            self._release(engine)
+
+    def _release(self, engine):
+        with self._lock:
+            if engine in self._retired:
+                self._retired.discard(engine)
+                engine.End()
+                return
+            # Under the lock, so close() cannot miss an engine put back meanwhile
+            self._engines.put(engine)
+
+    def images_to_string(self, images):
+        if len(images) < 2:
+            return [self.image_to_string(image) for image in images]
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr')
+        return list(self._executor.map(self.image_to_string, images))
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # Waited for without the lock - the running threads need it to return their engines
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._lock:
+            # Only idle engines are ended now; engines still in use by another
+            # thread are ended when they are returned
+            idle = set()
+            while True:
+                try:
+                    idle.add(self._engines.get_nowait())
+                except queue.Empty:
+                    break
+            for engine in self._all_engines:
+                if engine in idle:
+                    engine.End()
+                else:
+                    self._retired.add(engine)
+            self._all_engines = []
+            self._engines = queue.Queue()
+
+
+class FakeOCRBackend(OCRBackend):
+    """
+    Deterministic backend for tests - returns canned text without touching files
+
+    Text is looked up by full path first, then by file name, then falls back
+    to default_text. Every call is recorded in self.calls.
+    """
+
+    name = 'fake'
+
+    def __init__(self, responses=None, default_text=''):
+        """
+        Args:
+            responses: Dict mapping file path or file name to extracted text
+            default_text: Text returned for files not in responses
+        """
+        self.responses = dict(responses or {})
+        self.default_text = default_text
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def image_to_string(self, image):
+        return self.default_text
+
+    def extract_text(self, file_path):
+        with self._lock:
+            self.calls.append(file_path)
+
+        if file_path in self.responses:
+            return self.responses[file_path]
+        return self.responses.get(os.path.basename(file_path), self.default_text)
+
+
+OCR_BACKENDS = {
+    TesseractBackend.name: TesseractBackend,
+    TesserocrPoolBackend.name: TesserocrPoolBackend,
+    FakeOCRBackend.name: FakeOCRBackend,
+}
+
+_shared_backends = {}
+_shared_lock = threading.Lock()
+
+
+def create_ocr_backend(name=None, workers=None, **options):
+    """
+    Create a new OCR backend
+
+    Args:
+        name: Backend name ('tesseract', 'tesserocr' or 'fake').
+              Defaults to the IMS_OCR_BACKEND environment variable.
+        workers: Number of warm engines for pooled backends.
+                 Defaults to the IMS_OCR_WORKERS environment variable.
+        **options: Extra backend constructor arguments
+
+    Returns:
+        OCRBackend instance
+    """
+    name = (name or os.environ.get('IMS_OCR_BACKEND') or DEFAULT_BACKEND).lower()
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}")
+
+    if name == TesserocrPoolBackend.name:
+        if not HAS_TESSEROCR:
+            print("Warning: tesserocr not available. Falling back to tesseract backend.")
+            return TesseractBackend(lang=options.get('lang', 'eng'))
+        if workers is None:
+            workers = int(os.environ.get('IMS_OCR_WORKERS') or min(4, os.cpu_count() or 1))
+        return TesserocrPoolBackend(workers=workers, **options)
+
+    return OCR_BACKENDS[name](**options)
+
+
+def get_ocr_backend(name=None, workers=None):
+    """
+    Get the process-wide shared backend so warm workers are reused
+
+    Args:
+        name: Backend name (see create_ocr_backend)
+        workers: Number of warm engines for pooled backends
+
+    Returns:
+        Shared OCRBackend instance
+    """
+    name = (name or os.environ.get('IMS_OCR_BACKEND') or DEFAULT_BACKEND).lower()
+    with _shared_lock:
+        backend = _shared_backends.get(name)
+        if backend is None:
+            backend = create_ocr_backend(name, workers)
+            _shared_backends[name] = backend
+        return backend
+
+
+@atexit.register
+def shutdown_ocr_backends():
+    """Close all shared backends"""
+    with _shared_lock:
+        for backend in _shared_backends.values():
+            backend.close()
+        _shared_backends.clear()
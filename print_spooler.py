@@ -0,0 +1,143 @@
+"""
+Print Spooler Module
+Background thread that sends rendered bills to a printer, so printing never blocks the
+till. The printer is a command (the job goes to its standard input, or to a temporary
+file named by {file}) or, with a 'file:' prefix, a device or file the job is written to.
+"""
+
+import os
+import sys
+import queue
+import atexit
+import shlex
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future
+from bill_render import RENDERERS
+
+DEFAULT_FORMAT = 'text'
+# Seconds a printer command may take before the job counts as failed
+COMMAND_TIMEOUT = 60
+
+_shared_spooler = None
+_shared_lock = threading.Lock()
+
+
+def default_printer():
+    """Printer used when IMS_PRINTER is not set"""
+    if sys.platform.startswith('win'):
+        return 'notepad /p {file}'
+    for command in ('lp', 'lpr'):
+        if shutil.which(command):
+            return command
+    return None
+
+
+class PrintSpooler:
+    def __init__(self, printer=None, fmt=None):
+        """
+        Start the spooler thread
+
+        Args:
+            printer: Printer command or 'file:<path>' (default: IMS_PRINTER or default_printer())
+            fmt: Job format, a key of bill_render.RENDERERS (default: IMS_PRINT_FORMAT or 'text')
+        """
+        self.printer = printer or os.environ.get('IMS_PRINTER') or default_printer()
+        self.format = (fmt or os.environ.get('IMS_PRINT_FORMAT') or DEFAULT_FORMAT).lower()
+        if self.format not in RENDERERS:
+            raise ValueError(f"Unknown print format '{self.format}'. Choose from: {', '.join(RENDERERS)}")
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='print-spooler', daemon=True)
+        self.thread.start()
+
+    def submit(self, data, name='job'):
+        """
+        Queue raw job bytes
+
+        Args:
+            data: Bytes in the printer's format
+            name: Job name used in error messages
+
+        Returns:
+            Future resolved when the printer accepted the job
+        """
+        future = Future()
+        self.jobs.put((data, name, future))
+        return future
+
+    def print_bill(self, bill):
+        """
+        Render a bill (dict from bill_render.make_bill) in the spooler's format and queue it
+
+        Returns:
+            Future resolved when the printer accepted the job
+        """
+        return self.submit(RENDERERS[self.format](bill), f"bill {bill['invoice']}")
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            data, name, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._send(data)
+                future.set_result(name)
+            except Exception as ex:
+                print(f"Error printing {name}: {str(ex)}")
+                future.set_exception(ex)
+
+    def _send(self, data):
+        if not self.printer:
+            raise RuntimeError("No printer configured - set IMS_PRINTER")
+        if self.printer.startswith('file:'):
+            with open(self.printer[5:], 'ab') as device:
+                device.write(data)
+            return
+        args = shlex.split(self.printer, posix=not sys.platform.startswith('win'))
+        if '{file}' not in self.printer:
+            subprocess.run(args, input=data, check=True, timeout=COMMAND_TIMEOUT,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            return
+        suffix = {'pdf': '.pdf', 'escpos': '.bin'}.get(self.format, '.txt')
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix='bill-')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            subprocess.run([arg.replace('{file}', path) for arg in args], check=True, timeout=COMMAND_TIMEOUT,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        finally:
+            os.remove(path)
+
+    def close(self, timeout=COMMAND_TIMEOUT):
+        """Print the queued jobs, then stop the thread"""
+        self.jobs.put(None)
+        self.thread.join(timeout)
+
+
+def get_print_spooler():
+    """
+    Get the process-wide spooler, configured from IMS_PRINTER and IMS_PRINT_FORMAT
+
+    Returns:
+        Shared PrintSpooler instance
+    """
+    global _shared_spooler
+    with _shared_lock:
+        if _shared_spooler is None:
+            _shared_spooler = PrintSpooler()
+        return _shared_spooler
+
+
+@atexit.register
+def shutdown_print_spooler():
+    """Finish the shared spooler's queued jobs"""
+    global _shared_spooler
+    with _shared_lock:
+        spooler, _shared_spooler = _shared_spooler, None
+    if spooler is not None:
+        spooler.close()
@@ -2,6 +2,11 @@ from tkinter import*
 from PIL import Image,ImageTk
 from tkinter import ttk,messagebox
 import sqlite3
+from create_db import ensure_db
+from low_stock import DEFAULT_REORDER_LEVEL,get_reorder_level,set_reorder_level
+from stock_ledger import record_movement,start_tracking
+from change_bus import get_bus
+from catalog_cache import get_catalog
 
 class productClass:
     def __init__(self,root):
@@ -11,6 +16,7 @@ class productClass:
         self.root.config(bg="white")
         self.root.resizable(False,False)
         self.root.focus_force()
+        ensure_db()
         #---------------------------------------
         #----------- variables -------------
         self.var_cat=StringVar()
@@ -23,8 +29,10 @@ class productClass:
         self.var_price=StringVar()
         self.var_qty=StringVar()
         self.var_status=StringVar()
+        self.var_reorder=StringVar(value=str(DEFAULT_REORDER_LEVEL))
         self.var_searchby=StringVar()
         self.var_searchtxt=StringVar()
+        self.search_filter=None
 
         product_Frame=Frame(self.root,bd=2,relief=RIDGE,bg="white")
         product_Frame.place(x=10,y=10,width=450,height=480)
@@ -38,14 +46,15 @@ class productClass:
         lbl_price=Label(product_Frame,text="Price",font=("goudy old style",18),bg="white").place(x=30,y=210)
         lbl_qty=Label(product_Frame,text="Quantity",font=("goudy old style",18),bg="white").place(x=30,y=260)
         lbl_status=Label(product_Frame,text="Status",font=("goudy old style",18),bg="white").place(x=30,y=310)
+        lbl_reorder=Label(product_Frame,text="Reorder At",font=("goudy old style",18),bg="white").place(x=30,y=355)
 
-        cmb_cat=ttk.Combobox(product_Frame,textvariable=self.var_cat,values=self.cat_list,state='readonly',justify=CENTER,font=("goudy old style",15))
-        cmb_cat.place(x=150,y=60,width=200)
-        cmb_cat.current(0)
+        self.cmb_cat=ttk.Combobox(product_Frame,textvariable=self.var_cat,values=self.cat_list,state='readonly',justify=CENTER,font=("goudy old style",15))
+        self.cmb_cat.place(x=150,y=60,width=200)
+        self.cmb_cat.current(0)
 
-        cmb_sup=ttk.Combobox(product_Frame,textvariable=self.var_sup,values=self.sup_list,state='readonly',justify=CENTER,font=("goudy old style",15))
-        cmb_sup.place(x=150,y=110,width=200)
-        cmb_sup.current(0)
+        self.cmb_sup=ttk.Combobox(product_Frame,textvariable=self.var_sup,values=self.sup_list,state='readonly',justify=CENTER,font=("goudy old style",15))
+        self.cmb_sup.place(x=150,y=110,width=200)
+        self.cmb_sup.current(0)
 
         txt_name=Entry(product_Frame,textvariable=self.var_name,font=("goudy old style",15),bg="lightyellow").place(x=150,y=160,width=200)
         txt_price=Entry(product_Frame,textvariable=self.var_price,font=("goudy old style",15),bg="lightyellow").place(x=150,y=210,width=200)
@@ -55,6 +64,8 @@ class productClass:
         cmb_status.place(x=150,y=310,width=200)
         cmb_status.current(0)
 
+        txt_reorder=Entry(product_Frame,textvariable=self.var_reorder,font=("goudy old style",15),bg="lightyellow").place(x=150,y=355,width=200)
+
         #-------------- buttons -----------------
         btn_add=Button(product_Frame,text="Save",command=self.add,font=("goudy old style",15),bg="#2196f3",fg="white",cursor="hand2").place(x=10,y=400,width=100,height=40)
         btn_update=Button(product_Frame,text="Update",command=self.update,font=("goudy old style",15),bg="#4caf50",fg="white",cursor="hand2").place(x=120,y=400,width=100,height=40)
@@ -105,27 +116,26 @@ class productClass:
         self.ProductTable.bind("<ButtonRelease-1>",self.get_data)
         self.show()
         self.fetch_cat_sup()
+        #------- follow changes made in other windows --------
+        get_bus(self.root).subscribe(self.root,("product","category","supplier"),self.refresh)
 #-----------------------------------------------------------------------------------------------------
     def fetch_cat_sup(self):
         self.cat_list.append("Empty")
         self.sup_list.append("Empty")
-        con=sqlite3.connect(database=r'ims.db')
-        cur=con.cursor()
         try:
-            cur.execute("select name from category")
-            cat=cur.fetchall()
+            catalog=get_catalog()
+            cat=catalog.category_names()
             if len(cat)>0:
                 del self.cat_list[:]
                 self.cat_list.append("Select")
                 for i in cat:
-                    self.cat_list.append(i[0])
-            cur.execute("select name from supplier")
-            sup=cur.fetchall()
+                    self.cat_list.append(i)
+            sup=catalog.supplier_names()
             if len(sup)>0:
                 del self.sup_list[:]
                 self.sup_list.append("Select")
                 for i in sup:
-                    self.sup_list.append(i[0])
+                    self.sup_list.append(i)
         except Exception as ex:
             messagebox.showerror("Error",f"Error due to : {str(ex)}")
 
@@ -151,6 +161,9 @@ class productClass:
                         self.var_qty.get(),
                         self.var_status.get(),
                     ))
+                    pid=cur.lastrowid
+                    start_tracking(cur,pid,self.var_name.get(),int(self.var_qty.get()))
+                    set_reorder_level(cur,pid,self.reorder_level())
                     con.commit()
                     messagebox.showinfo("Success","Product Added Successfully",parent=self.root)
                     self.clear()
@@ -158,12 +171,28 @@ class productClass:
         except Exception as ex:
             messagebox.showerror("Error",f"Error due to : {str(ex)}")
 
+    def refresh(self,changed):
+        if "category" in changed or "supplier" in changed:
+            del self.cat_list[:]
+            del self.sup_list[:]
+            self.fetch_cat_sup()
+            self.cmb_cat.config(values=self.cat_list)
+            self.cmb_sup.config(values=self.sup_list)
+        if "product" in changed:
+            #------- keep showing the current search --------
+            if self.search_filter==None:
+                self.show()
+            else:
+                column,text=self.search_filter
+                rows=get_catalog().products(column,text)
+                self.ProductTable.delete(*self.ProductTable.get_children())
+                for row in rows:
+                    self.ProductTable.insert('',END,values=row)
+
     def show(self):
-        con=sqlite3.connect(database=r'ims.db')
-        cur=con.cursor()
+        self.search_filter=None
         try:
-            cur.execute("select * from product")
-            rows=cur.fetchall()
+            rows=get_catalog().products()
             self.ProductTable.delete(*self.ProductTable.get_children())
             for row in rows:
                 self.ProductTable.insert('',END,values=row)
@@ -181,6 +210,17 @@ class productClass:
         self.var_price.set(row[4])
         self.var_qty.set(row[5])
         self.var_status.set(row[6])
+        con=sqlite3.connect(database=r'ims.db')
+        try:
+            self.var_reorder.set(str(get_reorder_level(con,row[0])))
+        finally:
+            con.close()
+
+    def reorder_level(self):
+        #------- empty means the default level --------
+        if self.var_reorder.get().strip()=="":
+            return None
+        return int(self.var_reorder.get())
 
     def update(self):
         con=sqlite3.connect(database=r'ims.db')
@@ -194,6 +234,8 @@ class productClass:
                 if row==None:
                     messagebox.showerror("Error","Invalid Product",parent=self.root)
                 else:
+                    cur.execute("select cast(qty as integer) from product where pid=?",(self.var_pid.get(),))
+                    old_qty=cur.fetchone()[0]
                     cur.execute("update product set Category=?,Supplier=?,name=?,price=?,qty=?,status=? where pid=?",(
                         self.var_cat.get(),
                         self.var_sup.get(),
@@ -203,6 +245,11 @@ class productClass:
                         self.var_status.get(),
                         self.var_pid.get(),
                     ))
+                    #------- manual stock edits go to the stock ledger --------
+                    new_qty=int(self.var_qty.get())
+                    if new_qty!=old_qty:
+                        record_movement(cur,self.var_pid.get(),self.var_name.get(),'adjust',new_qty-old_qty,old_qty,new_qty)
+                    set_reorder_level(cur,self.var_pid.get(),self.reorder_level())
                     con.commit()
                     messagebox.showinfo("Success","Product Updated Successfully",parent=self.root)
                     self.show()
@@ -237,6 +284,7 @@ class productClass:
         self.var_price.set("")
         self.var_qty.set("")
         self.var_status.set("Active")
+        self.var_reorder.set(str(DEFAULT_REORDER_LEVEL))
         self.var_pid.set("")
         self.var_searchby.set("Select")
         self.var_searchtxt.set("")
@@ -244,17 +292,15 @@ class productClass:
 
     
     def search(self):
-        con=sqlite3.connect(database=r'ims.db')
-        cur=con.cursor()
         try:
             if self.var_searchby.get()=="Select":
                 messagebox.showerror("Error","Select Search By option",parent=self.root)
             elif self.var_searchtxt.get()=="":
                 messagebox.showerror("Error","Search input should be required",parent=self.root)
             else:
-                cur.execute("select * from product where "+self.var_searchby.get()+" LIKE '%"+self.var_searchtxt.get()+"%'")
-                rows=cur.fetchall()
+                rows=get_catalog().products(self.var_searchby.get(),self.var_searchtxt.get())
                 if len(rows)!=0:
+                    self.search_filter=(self.var_searchby.get(),self.var_searchtxt.get())
                     self.ProductTable.delete(*self.ProductTable.get_children())
                     for row in rows:
                         self.ProductTable.insert('',END,values=row)
@@ -0,0 +1,339 @@
+"""
+Product Import Module
+Bulk import of a product catalog from CSV/XLSX - validated, upserted by name in chunked transactions
+"""
+
+import os
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+from create_db import ensure_db
+
+try:
+    from openpyxl import load_workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_CHUNK_SIZE = 2000
+# Names per "IN (...)" lookup - stays below SQLite's bound parameter limit
+LOOKUP_BATCH = 500
+
+REQUIRED_COLUMNS = ('name', 'category', 'supplier', 'price', 'qty')
+OPTIONAL_COLUMNS = ('status', 'reorder_level')
+STATUSES = ('Active', 'Inactive')
+
+
+def read_rows(path):
+    """
+    Stream rows from a CSV or XLSX file as dicts with lower-case keys
+
+    Args:
+        path: .csv or .xlsx file
+
+    Yields:
+        (row_number, dict) - row numbers count the header as row 1
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xlsx':
+        if not HAS_OPENPYXL:
+            raise RuntimeError("openpyxl is required for .xlsx import. Install with: pip install openpyxl")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(cell or '').strip().lower() for cell in next(rows, ())]
+            for number, values in enumerate(rows, start=2):
+                yield number, dict(zip(header, values))
+        finally:
+            workbook.close()
+    elif ext == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = [column.strip().lower() for column in next(reader, [])]
+            for number, values in enumerate(reader, start=2):
+                yield number, dict(zip(header, values))
+    else:
+        raise ValueError(f"Unsupported file type '{ext}'. Use .csv or .xlsx")
+
+
+class ProductImporter:
+    def __init__(self, db_path='ims.db', chunk_size=DEFAULT_CHUNK_SIZE, create_missing=False):
+        """
+        Initialize the importer
+
+        Args:
+            db_path: Path to the SQLite database
+            chunk_size: Rows written per transaction
+            create_missing: Create unknown categories/suppliers instead of rejecting the row
+        """
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        ensure_db(db_path)
+
+    def _load_names(self, con, table):
+        # Case-insensitive lookup -> name as stored
+        return {name.strip().lower(): name for (name,) in con.execute(f"SELECT name FROM {table}") if name}
+
+    def validate(self, raw, categories, suppliers):
+        """
+        Validate and normalise one row
+
+        Args:
+            raw: Dict read from the file
+            categories: Lower-case name -> stored category name
+            suppliers: Lower-case name -> stored supplier name
+
+        Returns:
+            (product dict, None) or (None, reason)
+        """
+        values = {key: ('' if value is None else str(value).strip()) for key, value in raw.items()}
+        missing = [column for column in REQUIRED_COLUMNS if not values.get(column)]
+        if missing:
+            return None, f"Missing {', '.join(missing)}"
+
+        try:
+            price = float(values['price'])
+        except ValueError:
+            return None, f"Invalid price '{values['price']}'"
+        if price < 0:
+            return None, "Price must not be negative"
+
+        try:
+            qty = int(float(values['qty']))
+        except ValueError:
+            return None, f"Invalid qty '{values['qty']}'"
+        if qty < 0:
+            return None, "Qty must not be negative"
+
+        status = (values.get('status') or 'Active').capitalize()
+        if status not in STATUSES:
+            return None, f"Invalid status '{values['status']}'"
+
+        reorder_level = None
+        if values.get('reorder_level'):
+            try:
+                reorder_level = int(float(values['reorder_level']))
+            except ValueError:
+                return None, f"Invalid reorder_level '{values['reorder_level']}'"
+
+        category = categories.get(values['category'].lower())
+        supplier = suppliers.get(values['supplier'].lower())
+        if not self.create_missing:
+            if category is None:
+                return None, f"Unknown category '{values['category']}'"
+            if supplier is None:
+                return None, f"Unknown supplier '{values['supplier']}'"
+
+        return {
+            'name': values['name'],
+            'category': category or values['category'],
+            'supplier': supplier or values['supplier'],
+            # price and qty are stored as text like the product form stores them
+            'price': f"{price:g}",
+            'qty': qty,
+            'status': status,
+            'reorder_level': reorder_level
+        }, None
+
+    def _existing(self, cur, names):
+        """Map product name -> (pid, qty) for names already in the catalog"""
+        found = {}
+        for start in range(0, len(names), LOOKUP_BATCH):
+            batch = names[start:start + LOOKUP_BATCH]
+            for pid, name, qty in cur.execute(
+                f"""SELECT pid, name, CAST(qty AS INTEGER) FROM product
+                WHERE name IN ({','.join('?' * len(batch))}) ORDER BY pid""",
+                batch
+            ):
+                found.setdefault(name, (pid, qty))
+        return found
+
+    def write_chunk(self, con, chunk, categories, suppliers):
+        """
+        Upsert one chunk of validated products in a single transaction
+
+        Products are matched by name: existing ones are updated, new ones inserted.
+        Stock changes are written to the stock ledger.
+
+        Returns:
+            (inserted, updated)
+        """
+        now = datetime.now().strftime(TIME_FORMAT)
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            created_names = []
+            if self.create_missing:
+                for table, names in (('category', categories), ('supplier', suppliers)):
+                    new = {}
+                    for row in chunk:
+                        if row[table].lower() not in names:
+                            new.setdefault(row[table].lower(), row[table])
+                    cur.executemany(f"INSERT INTO {table} (name) VALUES (?)", [(name,) for name in new.values()])
+                    created_names.append((names, new))
+
+            existing = self._existing(cur, [row['name'] for row in chunk])
+            updates = [row for row in chunk if row['name'] in existing]
+            inserts = [row for row in chunk if row['name'] not in existing]
+
+            cur.executemany(
+                "UPDATE product SET Category=?, Supplier=?, price=?, qty=?, status=? WHERE pid=?",
+                [(row['category'], row['supplier'], row['price'], row['qty'], row['status'],
+                  existing[row['name']][0]) for row in updates]
+            )
+            cur.executemany(
+                "INSERT INTO product (Category, Supplier, name, price, qty, status) VALUES (?, ?, ?, ?, ?, ?)",
+                [(row['category'], row['supplier'], row['name'], row['price'], row['qty'], row['status'])
+                 for row in inserts]
+            )
+            created = self._existing(cur, [row['name'] for row in inserts])
+
+            # Opening stock of new products plus their first checkpoint (see stock_ledger.start_tracking)
+            cur.execute("SELECT COALESCE(MAX(txn_id), 0) FROM transaction_logs")
+            first_txn = cur.fetchone()[0]
+            cur.executemany(
+                """INSERT INTO transaction_logs
+                (product_id, product_name, quantity, action, old_qty, new_qty, timestamp)
+                VALUES (?, ?, ?, 'adjust', 0, ?, ?)""",
+                [(created[row['name']][0], row['name'], row['qty'], row['qty'], now) for row in inserts]
+            )
+            cur.execute(
+                """INSERT OR IGNORE INTO stock_checkpoints (product_id, txn_id, timestamp, qty)
+                SELECT product_id, txn_id, timestamp, new_qty FROM transaction_logs WHERE txn_id>?""",
+                (first_txn,)
+            )
+            # Stock changes of existing products are manual adjustments
+            adjustments = []
+            for row in updates:
+                pid, old_qty = existing[row['name']]
+                if row['qty'] != old_qty:
+                    adjustments.append((pid, row['name'], row['qty'] - old_qty, old_qty, row['qty'], now))
+            cur.executemany(
+                """INSERT INTO transaction_logs
+                (product_id, product_name, quantity, action, old_qty, new_qty, timestamp)
+                VALUES (?, ?, ?, 'adjust', ?, ?, ?)""",
+                adjustments
+            )
+
+            pids = {**{name: value[0] for name, value in existing.items()},
+                    **{name: value[0] for name, value in created.items()}}
+            cur.executemany(
+                """INSERT INTO product_reorder (pid, reorder_level) VALUES (?, ?)
+                ON CONFLICT(pid) DO UPDATE SET reorder_level=excluded.reorder_level
+                WHERE reorder_level<>excluded.reorder_level""",
+                [(pids[row['name']], row['reorder_level']) for row in chunk if row['reorder_level'] is not None]
+            )
+            cur.execute("COMMIT")
+            # Only remember new categories/suppliers once they are committed
+            for names, new in created_names:
+                names.update(new)
+            return len(inserts), len(updates)
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    def import_file(self, path, dry_run=False, progress=None):
+        """
+        Import a CSV/XLSX product list
+
+        Args:
+            path: .csv or .xlsx file with columns name, category, supplier, price, qty
+                  and optionally status and reorder_level
+            dry_run: Only validate - nothing is written
+            progress: Optional callable(rows_read) called after each chunk
+
+        Returns:
+            Dict with rows, inserted, updated, rejected (list of (row_number, reason, raw dict))
+            and seconds
+        """
+        start = time.perf_counter()
+        stats = {'rows': 0, 'inserted': 0, 'updated': 0, 'rejected': [], 'seconds': 0.0}
+        con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            categories = self._load_names(con, 'category')
+            suppliers = self._load_names(con, 'supplier')
+            seen = {}
+            chunk = []
+
+            for number, raw in read_rows(path):
+                if not any(value not in (None, '') for value in raw.values()):
+                    continue
+                stats['rows'] += 1
+                row, reason = self.validate(raw, categories, suppliers)
+                if row and row['name'] in seen:
+                    row, reason = None, f"Duplicate name, first seen on row {seen[row['name']]}"
+                if not row:
+                    stats['rejected'].append((number, reason, raw))
+                    continue
+                seen[row['name']] = number
+                chunk.append(row)
+
+                if len(chunk) >= self.chunk_size:
+                    self._flush(con, chunk, categories, suppliers, stats, dry_run)
+                    chunk = []
+                    if progress:
+                        progress(stats['rows'])
+
+            self._flush(con, chunk, categories, suppliers, stats, dry_run)
+            if progress:
+                progress(stats['rows'])
+        finally:
+            con.close()
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+
+    def _flush(self, con, chunk, categories, suppliers, stats, dry_run):
+        if not chunk or dry_run:
+            return
+        inserted, updated = self.write_chunk(con, chunk, categories, suppliers)
+        stats['inserted'] += inserted
+        stats['updated'] += updated
+
+
+def write_rejected_report(rejected, path):
+    """
+    Write rejected rows to a CSV file with the row number and reason first
+
+    Args:
+        rejected: List of (row_number, reason, raw dict) from import_file
+        path: Output CSV path
+    """
+    columns = list(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
+    for _, _, raw in rejected:
+        columns.extend(key for key in raw if key not in columns)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['row', 'reason'] + columns)
+        for number, reason, raw in rejected:
+            writer.writerow([number, reason] + [raw.get(column, '') for column in columns])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import products from CSV or XLSX")
+    parser.add_argument('file', help=".csv or .xlsx with name, category, supplier, price, qty[, status, reorder_level]")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per transaction")
+    parser.add_argument('--create-missing', action='store_true', help="Create unknown categories and suppliers")
+    parser.add_argument('--dry-run', action='store_true', help="Validate only")
+    parser.add_argument('--rejected', default='rejected_products.csv', help="Report file for rejected rows")
+    args = parser.parse_args(argv)
+
+    importer = ProductImporter(args.db, args.chunk_size, args.create_missing)
+    stats = importer.import_file(args.file, dry_run=args.dry_run)
+    print(
+        f"Read {stats['rows']} row(s): {stats['inserted']} inserted, {stats['updated']} updated, "
+        f"{len(stats['rejected'])} rejected in {stats['seconds']:.2f}s"
+    )
+    if stats['rejected']:
+        write_rejected_report(stats['rejected'], args.rejected)
+        print(f"Rejected rows written to {args.rejected}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
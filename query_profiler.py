@@ -0,0 +1,413 @@
+"""
+Query Profiler Module
+Records the time, rows and parameter shape of every SQL statement run through
+connections opened while profiling is on, keeps a latency histogram per statement
+and appends statements slower than a threshold to a slow-query log.
+
+Profiling is switched on and off at runtime with enable() and disable(), or when a program
+starts with IMS_PROFILE_SQL=1 (IMS_SLOW_QUERY_MS and IMS_SLOW_QUERY_LOG set the threshold
+and log file). enable() routes sqlite3.connect through this module, so the queries of every
+module are seen. While profiling is off, new connections are plain sqlite3 connections.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from bisect import bisect_left
+
+DEFAULT_SLOW_MS = 100.0
+DEFAULT_SLOW_LOG = 'slow_queries.log'
+# Upper bucket edges in ms; the last bucket holds everything slower
+HISTOGRAM_MS = (0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000)
+# Statements built with values in the text would each get an entry - past this many,
+# new statements are counted together
+MAX_STATEMENTS = 1000
+OTHER_STATEMENTS = '(other statements)'
+
+_enabled = False
+_slow_ms = DEFAULT_SLOW_MS
+_slow_log = DEFAULT_SLOW_LOG
+_stats = {}
+_keys = {}
+_lock = threading.Lock()
+_plain_connect = None
+
+
+class _Stat:
+    __slots__ = ('calls', 'total', 'max', 'rows', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(HISTOGRAM_MS) + 1)
+
+
+def _statement_key(sql):
+    key = _keys.get(sql)
+    if key is None:
+        key = " ".join(sql.split())
+        if len(_keys) < MAX_STATEMENTS * 4:
+            _keys[sql] = key
+    return key
+
+
+def _params_shape(parameters):
+    if isinstance(parameters, dict):
+        return "{" + ",".join(sorted(parameters)) + "}"
+    try:
+        return f"({len(parameters)})"
+    except TypeError:
+        return "(?)"
+
+
+def record(sql, seconds, rows=0, params='()', database=''):
+    """
+    Add one statement run to the statistics, and to the slow-query log if it was slow
+
+    Args:
+        sql: Statement text
+        seconds: Wall time, including fetching its rows
+        rows: Rows returned (SELECT) or changed
+        params: Parameter shape, e.g. '(3)' or '{name,qty}'
+        database: Database the statement ran against
+    """
+    key = _statement_key(sql)
+    ms = seconds * 1000
+    with _lock:
+        stat = _stats.get(key)
+        if stat is None:
+            if len(_stats) >= MAX_STATEMENTS:
+                key = OTHER_STATEMENTS
+                stat = _stats.get(key)
+            if stat is None:
+                stat = _stats[key] = _Stat()
+        stat.calls += 1
+        stat.total += ms
+        stat.rows += rows
+        if ms > stat.max:
+            stat.max = ms
+        stat.buckets[bisect_left(HISTOGRAM_MS, ms)] += 1
+        if ms >= _slow_ms and _slow_log:
+            try:
+                with open(_slow_log, 'a', encoding='utf-8') as log:
+                    log.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')}\t{ms:.1f}\t{rows}\t{params}\t{database}\t{key}\n")
+            except OSError as ex:
+                print(f"Error writing slow query log: {str(ex)}")
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute until its rows are fetched"""
+
+    _query = None
+    _fetching = False
+
+    def _start(self, sql, params):
+        self._finish()
+        self._query = [sql, params, 0.0, 0]
+
+    def _finish(self):
+        query = self._query
+        if query is None:
+            return
+        self._query = None
+        sql, params, seconds, rows = query
+        if self.description is None and self.rowcount > 0:
+            rows = self.rowcount
+        record(sql, seconds, rows, params, getattr(self.connection, 'database', ''))
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._query is not None:
+                self._query[2] += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, _params_shape(parameters))
+        try:
+            self._timed(super().execute, sql, parameters)
+        except Exception:
+            self._finish()
+            raise
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None)
+        count = [0, '()']
+
+        def counted():
+            for parameters in seq_of_parameters:
+                if count[0] == 0:
+                    count[1] = _params_shape(parameters)
+                count[0] += 1
+                yield parameters
+        try:
+            self._timed(super().executemany, sql, counted())
+        finally:
+            self._query[1] = f"{count[0]} x {count[1]}"
+            self._finish()
+        return self
+
+    def executescript(self, sql_script):
+        self._start(sql_script, '()')
+        try:
+            self._timed(super().executescript, sql_script)
+        finally:
+            self._finish()
+        return self
+
+    def _fetch(self, method, *args):
+        # The fetch methods may read rows through __next__ themselves, depending on the
+        # Python version - rows are counted once, here
+        self._fetching = True
+        try:
+            return self._timed(method, *args)
+        finally:
+            self._fetching = False
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._query is not None:
+            self._query[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._fetch(super().fetchmany, self.arraysize if size is None else size)
+        if not rows:
+            self._finish()
+        elif self._query is not None:
+            self._query[3] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        if self._query is not None:
+            self._query[3] += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        if self._fetching:
+            return super().__next__()
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._query is not None:
+            self._query[3] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Statements whose rows were never all fetched are recorded when the cursor goes away
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose cursors are profiled while profiling is on"""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.database = os.path.basename(str(database))
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = ProfiledCursor if _enabled else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        if not _enabled:
+            return super().commit()
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            record('COMMIT', time.perf_counter() - start, 0, '()', self.database)
+
+
+def connect(database, **kwargs):
+    """
+    Open a connection that is profiled while profiling is on
+
+    Takes the arguments of sqlite3.connect; a factory given by the caller wins.
+
+    Returns:
+        sqlite3.Connection
+    """
+    if _enabled:
+        kwargs.setdefault('factory', ProfiledConnection)
+    return (_plain_connect or sqlite3.connect)(database, **kwargs)
+
+
+def install():
+    """Route sqlite3.connect through connect(), so every module's connections can be profiled"""
+    global _plain_connect
+    with _lock:
+        if _plain_connect is None:
+            _plain_connect = sqlite3.connect
+            sqlite3.connect = connect
+
+
+def enable(slow_ms=None, slow_log=None):
+    """
+    Start profiling connections opened from now on
+
+    Args:
+        slow_ms: Log statements taking at least this many ms (default: unchanged)
+        slow_log: Slow-query log file, or '' for none (default: unchanged)
+    """
+    global _enabled, _slow_ms, _slow_log
+    install()
+    if slow_ms is not None:
+        _slow_ms = float(slow_ms)
+    if slow_log is not None:
+        _slow_log = slow_log
+    _enabled = True
+
+
+def disable():
+    """Stop profiling - statistics are kept until reset()"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def slow_ms():
+    """Current slow-query threshold in ms"""
+    return _slow_ms
+
+
+def slow_log():
+    """Current slow-query log file ('' for none)"""
+    return _slow_log
+
+
+def reset():
+    """Clear the statistics"""
+    with _lock:
+        _stats.clear()
+        _keys.clear()
+
+
+def stats():
+    """
+    Statistics per statement, slowest total first
+
+    Returns:
+        List of dicts with sql, calls, total_ms, mean_ms, max_ms, rows and
+        histogram (counts per HISTOGRAM_MS bucket, the last for slower)
+    """
+    with _lock:
+        items = [(key, stat.calls, stat.total, stat.max, stat.rows, list(stat.buckets)) for key, stat in _stats.items()]
+    items.sort(key=lambda item: item[2], reverse=True)
+    return [{
+        'sql': key,
+        'calls': calls,
+        'total_ms': total,
+        'mean_ms': total / calls,
+        'max_ms': maximum,
+        'rows': rows,
+        'histogram': buckets
+    } for key, calls, total, maximum, rows, buckets in items]
+
+
+def histogram_labels():
+    """Bucket labels matching the histogram lists, e.g. '<=0.1' ... '>1000'"""
+    return [f"<={edge:g}" for edge in HISTOGRAM_MS] + [f">{HISTOGRAM_MS[-1]:g}"]
+
+
+def report(top=20):
+    """
+    Text table of the slowest statements by total time
+
+    Returns:
+        str
+    """
+    lines = [f"{'Calls':>8} {'Total ms':>10} {'Mean ms':>8} {'Max ms':>8} {'Rows':>9}  Histogram (ms: {' '.join(histogram_labels())})"]
+    for stat in stats()[:top]:
+        lines.append(
+            f"{stat['calls']:>8} {stat['total_ms']:>10.1f} {stat['mean_ms']:>8.2f} {stat['max_ms']:>8.1f} {stat['rows']:>9}  "
+            f"{' '.join(str(count) for count in stat['histogram'])}\n    {stat['sql'][:200]}"
+        )
+    return "\n".join(lines)
+
+
+def summarize_slow_log(path=DEFAULT_SLOW_LOG):
+    """
+    Slow-query log entries grouped by statement, slowest total first
+
+    Returns:
+        List of (sql, count, total_ms, max_ms)
+    """
+    groups = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as log:
+        for line in log:
+            fields = line.rstrip("\n").split("\t", 5)
+            if len(fields) < 6:
+                continue
+            try:
+                ms = float(fields[1])
+            except ValueError:
+                continue
+            group = groups.setdefault(fields[5], [0, 0.0, 0.0])
+            group[0] += 1
+            group[1] += ms
+            group[2] = max(group[2], ms)
+    return sorted(((sql, count, total, maximum) for sql, (count, total, maximum) in groups.items()),
+                  key=lambda item: item[2], reverse=True)
+
+
+def enable_from_env():
+    """Enable profiling if IMS_PROFILE_SQL is set, with IMS_SLOW_QUERY_MS and IMS_SLOW_QUERY_LOG"""
+    if os.environ.get('IMS_PROFILE_SQL', '').lower() in ('1', 'true', 'yes', 'on'):
+        enable(os.environ.get('IMS_SLOW_QUERY_MS'), os.environ.get('IMS_SLOW_QUERY_LOG'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the slow-query log")
+    parser.add_argument('log', nargs='?', default=DEFAULT_SLOW_LOG, help="Slow-query log file")
+    parser.add_argument('--top', type=int, default=20, help="Statements to show")
+    args = parser.parse_args(argv)
+
+    try:
+        groups = summarize_slow_log(args.log)
+    except OSError as ex:
+        print(f"Error: {str(ex)}")
+        return 1
+    print(f"{'Count':>7} {'Total ms':>10} {'Max ms':>9}  Statement")
+    for sql, count, total, maximum in groups[:args.top]:
+        print(f"{count:>7} {total:>10.1f} {maximum:>9.1f}  {sql[:200]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
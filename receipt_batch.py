@@ -0,0 +1,211 @@
+"""
+Batch Receipt Reprocessing Tool
+Runs archives of receipts through ReceiptHandler on a process pool and writes a report
+"""
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ocr_backend import create_ocr_backend
+from receipt_handler import ReceiptHandler, PRODUCT_NOT_FOUND
+
+RECEIPT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.pdf')
+
+REPORT_FIELDS = [
+    'file', 'status', 'receipt_id', 'seconds', 'items_found',
+    'items_processed', 'items_failed', 'unmatched', 'message'
+]
+
+# Handler owned by each worker process
+_handler = None
+
+
+def collect_files(sources, recursive=False):
+    """
+    Expand directories and glob patterns into a sorted list of receipt files
+
+    Args:
+        sources: Directories, files or glob patterns
+        recursive: Also walk sub-directories of given directories
+
+    Returns:
+        Sorted list of unique file paths
+    """
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            pattern = os.path.join(source, '**', '*') if recursive else os.path.join(source, '*')
+            matches = glob.glob(pattern, recursive=recursive)
+        else:
+            matches = glob.glob(source, recursive=True)
+
+        for path in matches:
+            if os.path.isfile(path) and path.lower().endswith(RECEIPT_EXTENSIONS):
+                files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def _init_worker(db_path, ocr_backend_name):
+    global _handler
+    # One warm OCR engine per process - the pool itself provides the parallelism
+    _handler = ReceiptHandler(db_path, create_ocr_backend(ocr_backend_name, workers=1))
+
+
+def process_file(file_path, dry_run=True, receipt_type_override=None):
+    """
+    Process one receipt in a worker process
+
+    Returns:
+        Report row dict
+    """
+    started = time.perf_counter()
+    try:
+        result = _handler.process_receipt_workflow(
+            file_path,
+            receipt_type_override=receipt_type_override,
+            dry_run=dry_run
+        )
+    except Exception as e:
+        result = {
+            'success': False,
+            'receipt_id': None,
+            'processed_items': [],
+            'failed_items': [],
+            'message': f"Error processing receipt: {str(e)}"
+        }
+    elapsed = time.perf_counter() - started
+
+    # Items failing for other reasons (e.g. insufficient stock) matched a product
+    unmatched = [item['name'] for item in result['failed_items'] if item['reason'] == PRODUCT_NOT_FOUND]
+    return {
+        'file': file_path,
+        'status': 'ok' if result['success'] else 'failed',
+        'receipt_id': result['receipt_id'],
+        'seconds': round(elapsed, 4),
+        'items_found': len(result['processed_items']) + len(result['failed_items']),
+        'items_processed': len(result['processed_items']),
+        'items_failed': len(result['failed_items']),
+        'unmatched': unmatched,
+        'failed_items': result['failed_items'],
+        'message': result['message']
+    }
+
+
+def run_batch(files, db_path='ims.db', workers=None, dry_run=True,
+              receipt_type_override=None, ocr_backend_name=None, progress=True):
+    """
+    Run receipts across a process pool
+
+    Args:
+        files: List of receipt file paths
+        db_path: Path to the SQLite database
+        workers: Number of worker processes (default: CPU count)
+        dry_run: Parse and match only, no stock changes
+        receipt_type_override: Optional 'purchase' or 'sales'
+        ocr_backend_name: OCR backend used by the workers
+        progress: Print a line per finished file
+
+    Returns:
+        List of report rows in input order
+    """
+    rows = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(db_path, ocr_backend_name)
+    ) as executor:
+        futures = {
+            executor.submit(process_file, path, dry_run, receipt_type_override): path
+            for path in files
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            rows[futures[future]] = row
+            if progress:
+                print(f"[{done}/{len(files)}] {row['status']:6} {row['seconds']:.2f}s {os.path.basename(row['file'])}: {row['message']}")
+    return [rows[path] for path in files]
+
+
+def summarize(rows, dry_run, elapsed):
+    """Build the report summary"""
+    return {
+        'mode': 'dry-run' if dry_run else 'apply',
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'files': len(rows),
+        'ok': sum(1 for row in rows if row['status'] == 'ok'),
+        'failed': sum(1 for row in rows if row['status'] != 'ok'),
+        'items_found': sum(row['items_found'] for row in rows),
+        'items_processed': sum(row['items_processed'] for row in rows),
+        'items_failed': sum(row['items_failed'] for row in rows),
+        'items_unmatched': sum(len(row['unmatched']) for row in rows),
+        'wall_seconds': round(elapsed, 3),
+        'busy_seconds': round(sum(row['seconds'] for row in rows), 3)
+    }
+
+
+def write_report(path, rows, summary):
+    """Write the report as JSON or CSV depending on the file extension"""
+    if path.lower().endswith('.json'):
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump({'summary': summary, 'files': rows}, fp, indent=2, default=str)
+        return
+
+    with open(path, 'w', newline='', encoding='utf-8') as fp:
+        writer = csv.DictWriter(fp, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, unmatched='; '.join(row['unmatched'])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprocess archived receipts in bulk")
+    parser.add_argument('sources', nargs='+', help="Directories, files or glob patterns")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--recursive', action='store_true', help="Walk sub-directories")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--dry-run', dest='dry_run', action='store_true', default=True,
+                      help="Parse and match only, no stock changes (default)")
+    mode.add_argument('--apply', dest='dry_run', action='store_false',
+                      help="Update stock and write receipt logs")
+    parser.add_argument('--type', choices=['purchase', 'sales'], default=None, help="Override receipt type")
+    parser.add_argument('--ocr-backend', default=None, help="OCR backend (tesseract, tesserocr, fake)")
+    parser.add_argument('--report', default='receipt_batch_report.csv', help="Report file (.csv or .json)")
+    parser.add_argument('--quiet', action='store_true', help="Only print the summary")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.sources, args.recursive)
+    if not files:
+        print("No receipt files found")
+        return 1
+
+    print(f"{'Dry run' if args.dry_run else 'Applying'}: {len(files)} receipt(s)")
+    started = time.perf_counter()
+    rows = run_batch(
+        files,
+        db_path=args.db,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        receipt_type_override=args.type,
+        ocr_backend_name=args.ocr_backend,
+        progress=not args.quiet
+    )
+    summary = summarize(rows, args.dry_run, time.perf_counter() - started)
+    write_report(args.report, rows, summary)
+
+    print(
+        f"Done: {summary['ok']} ok, {summary['failed']} failed, "
+        f"{summary['items_processed']}/{summary['items_found']} items matched "
+        f"in {summary['wall_seconds']}s. Report: {args.report}"
+    )
+    return 0 if summary['failed'] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Receipt Hot-Folder Daemon
+Watches a folder for scanned receipts and feeds them through the receipt pipeline
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import threading
+import query_profiler
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from receipt_handler import ReceiptHandler, find_receipt_log
+
+RECEIPT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.pdf')
+
+# Partial files left behind by scanners and copy tools
+TEMP_PREFIXES = ('.', '~')
+TEMP_SUFFIXES = ('.part', '.tmp', '.crdownload')
+
+
+class HotFolderDaemon:
+    def __init__(self, watch_dir, done_dir=None, failed_dir=None, db_path='ims.db',
+                 workers=4, poll_interval=2.0, settle_time=3.0, stats_interval=60.0,
+                 receipt_type_override=None):
+        """
+        Initialize the hot-folder daemon
+
+        Args:
+            watch_dir: Folder scanned receipts are dropped into
+            done_dir: Where processed receipts are moved (default: watch_dir/done)
+            failed_dir: Where failed receipts are moved (default: watch_dir/failed)
+            db_path: Path to the SQLite database
+            workers: Number of receipts processed concurrently
+            poll_interval: Seconds between folder scans
+            settle_time: Seconds a file's size and mtime must stay unchanged
+                         before it is considered completely written
+            stats_interval: Seconds between stats summaries
+            receipt_type_override: Optional 'purchase' or 'sales' for every file
+        """
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.done_dir = os.path.abspath(done_dir or os.path.join(watch_dir, 'done'))
+        self.failed_dir = os.path.abspath(failed_dir or os.path.join(watch_dir, 'failed'))
+        self.processing_dir = os.path.join(self.watch_dir, 'processing')
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.stats_interval = stats_interval
+        self.receipt_type_override = receipt_type_override
+
+        # ReceiptHandler keeps no per-receipt state, so all workers share one
+        self.handler = ReceiptHandler(db_path)
+        self.stop_event = threading.Event()
+        self.executor = None
+        self.pending = {}
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.stats = {
+            'started_at': None,
+            'processed': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'items_updated': 0,
+            'items_failed': 0,
+            'total_seconds': 0.0
+        }
+
+    def is_candidate(self, name):
+        """Check if a file name looks like a finished receipt file"""
+        lower = name.lower()
+        if lower.startswith(TEMP_PREFIXES) or lower.endswith(TEMP_SUFFIXES):
+            return False
+        return lower.endswith(RECEIPT_EXTENSIONS)
+
+    def is_unlocked(self, path):
+        """
+        Check that no writer still holds the file
+
+        Renaming a file onto itself fails on Windows while another process
+        has it open; elsewhere opening it for reading is the best we can do.
+        """
+        try:
+            os.rename(path, path)
+            with open(path, 'rb'):
+                pass
+            return True
+        except OSError:
+            return False
+
+    def scan(self):
+        """
+        Scan the watch folder once
+
+        Returns:
+            List of paths that are completely written and ready to process
+        """
+        now = time.monotonic()
+        ready = []
+        seen = set()
+
+        try:
+            entries = list(os.scandir(self.watch_dir))
+        except OSError as e:
+            print(f"Error scanning {self.watch_dir}: {str(e)}")
+            return ready
+
+        for entry in entries:
+            if not entry.is_file() or not self.is_candidate(entry.name):
+                continue
+            path = entry.path
+            seen.add(path)
+
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+
+            signature = (st.st_size, st.st_mtime)
+            previous = self.pending.get(path)
+            if previous is None or previous[0] != signature:
+                # New or still growing - restart the settle timer
+                self.pending[path] = (signature, now)
+                continue
+
+            if st.st_size > 0 and now - previous[1] >= self.settle_time and self.is_unlocked(path):
+                ready.append(path)
+                del self.pending[path]
+
+        # Forget files that disappeared before settling
+        for path in list(self.pending):
+            if path not in seen:
+                del self.pending[path]
+
+        return ready
+
+    def unique_path(self, directory, name):
+        """Return a path in directory that does not overwrite an existing file"""
+        target = os.path.join(directory, name)
+        if not os.path.exists(target):
+            return target
+        base, ext = os.path.splitext(name)
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        return os.path.join(directory, f"{base}_{stamp}{ext}")
+
+    def claim(self, path):
+        """
+        Move a ready file into the processing folder so it is picked up exactly once
+
+        Returns:
+            New path or None if the file vanished
+        """
+        target = self.unique_path(self.processing_dir, os.path.basename(path))
+        try:
+            shutil.move(path, target)
+            return target
+        except OSError as e:
+            print(f"Error claiming {path}: {str(e)}")
+            return None
+
+    def process_file(self, path):
+        """Run one receipt through the pipeline and file it with a JSON sidecar"""
+        started = time.perf_counter()
+        try:
+            result = self.handler.process_receipt_workflow(
+                path,
+                receipt_type_override=self.receipt_type_override
+            )
+        except Exception as e:
+            result = {
+                'success': False,
+                'receipt_id': None,
+                'processed_items': [],
+                'failed_items': [],
+                'message': f"Error processing receipt: {str(e)}"
+            }
+        elapsed = time.perf_counter() - started
+
+        name = os.path.basename(path)
+        try:
+            self.file_receipt(path, result, elapsed)
+
+            with self.lock:
+                self.stats['processed'] += 1
+                self.stats['succeeded' if result['success'] else 'failed'] += 1
+                self.stats['items_updated'] += len(result['processed_items'])
+                self.stats['items_failed'] += len(result['failed_items'])
+                self.stats['total_seconds'] += elapsed
+        finally:
+            # The path always gives back its slot, or the daemon would stop taking new receipts
+            with self.lock:
+                self.in_flight.discard(path)
+
+        status = 'done' if result['success'] else 'failed'
+        print(f"[{status}] {name} ({elapsed:.2f}s): {result['message']}")
+
+    def file_receipt(self, path, result, elapsed):
+        """Move a finished receipt to the done or failed folder and write its JSON sidecar"""
+        target_dir = self.done_dir if result['success'] else self.failed_dir
+        name = os.path.basename(path)
+        target = self.unique_path(target_dir, name)
+        try:
+            shutil.move(path, target)
+        except OSError as e:
+            print(f"Error moving {path}: {str(e)}")
+            target = path
+
+        sidecar = {
+            'file_name': name,
+            'file_path': target,
+            'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'seconds': round(elapsed, 3),
+            'result': result
+        }
+        try:
+            with open(target + '.json', 'w', encoding='utf-8') as fp:
+                json.dump(sidecar, fp, indent=2, default=str)
+        except OSError as e:
+            print(f"Error writing sidecar for {name}: {str(e)}")
+
+    def committed_receipt(self, path):
+        """
+        Find the receipt log committed for a file left in processing by an interrupted run
+
+        Returns:
+            receipt_id or None if the file's stock changes were never committed
+        """
+        st = os.stat(path)
+        # Moving the file into processing updates its ctime (on Windows the
+        # creation time is kept, so the last write bounds it instead)
+        claimed_at = datetime.fromtimestamp(max(st.st_mtime, st.st_ctime)).strftime('%Y-%m-%d %H:%M:%S')
+        con = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            return find_receipt_log(con.cursor(), path, claimed_at)
+        finally:
+            con.close()
+
+    def recover_processing(self):
+        """
+        Handle files left in processing by an interrupted run - files whose receipt
+        was already committed go to done, the rest are processed again
+        """
+        for entry in os.scandir(self.processing_dir):
+            if not (entry.is_file() and self.is_candidate(entry.name)):
+                continue
+            receipt_id = self.committed_receipt(entry.path)
+            if receipt_id is None:
+                self.submit(entry.path)
+                continue
+            self.file_receipt(entry.path, {
+                'success': True,
+                'receipt_id': receipt_id,
+                'processed_items': [],
+                'failed_items': [],
+                'message': 'Receipt was applied before the daemon was interrupted'
+            }, 0.0)
+            print(f"[done] {entry.name}: already applied as receipt {receipt_id}")
+
+    def submit(self, path):
+        with self.lock:
+            self.in_flight.add(path)
+        self.executor.submit(self.process_file, path)
+
+    def format_stats(self):
+        """Build a one-line stats summary"""
+        with self.lock:
+            stats = dict(self.stats)
+            in_flight = len(self.in_flight)
+        uptime = time.monotonic() - stats['started_at'] if stats['started_at'] else 0
+        average = stats['total_seconds'] / stats['processed'] if stats['processed'] else 0
+        rate = stats['processed'] / uptime * 60 if uptime else 0
+        return (
+            f"[stats] processed={stats['processed']} ok={stats['succeeded']} failed={stats['failed']} "
+            f"items_updated={stats['items_updated']} items_failed={stats['items_failed']} "
+            f"in_flight={in_flight} waiting={len(self.pending)} "
+            f"avg={average:.2f}s rate={rate:.1f}/min"
+        )
+
+    def run(self):
+        """Watch the folder until stop() is called"""
+        for directory in (self.watch_dir, self.processing_dir, self.done_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        self.stats['started_at'] = time.monotonic()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='receipt')
+        print(f"Watching {self.watch_dir} with {self.workers} worker(s)")
+
+        self.recover_processing()
+
+        next_stats = time.monotonic() + self.stats_interval
+        try:
+            while not self.stop_event.is_set():
+                with self.lock:
+                    capacity = self.workers * 2 - len(self.in_flight)
+
+                # Keep a bounded backlog in the executor; the rest waits in the folder
+                for path in self.scan()[:max(0, capacity)]:
+                    claimed = self.claim(path)
+                    if claimed:
+                        self.submit(claimed)
+
+                if time.monotonic() >= next_stats:
+                    print(self.format_stats())
+                    next_stats = time.monotonic() + self.stats_interval
+
+                self.stop_event.wait(self.poll_interval)
+        finally:
+            self.executor.shutdown(wait=True)
+            print(self.format_stats())
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a folder and process dropped receipts")
+    parser.add_argument('watch_dir', help="Folder scanned receipts are saved into")
+    parser.add_argument('--done-dir', default=None, help="Folder for processed receipts")
+    parser.add_argument('--failed-dir', default=None, help="Folder for failed receipts")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    parser.add_argument('--workers', type=int, default=4, help="Receipts processed concurrently")
+    parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between folder scans")
+    parser.add_argument('--settle-time', type=float, default=3.0, help="Seconds a file must stay unchanged")
+    parser.add_argument('--stats-interval', type=float, default=60.0, help="Seconds between stats summaries")
+    parser.add_argument('--type', choices=['purchase', 'sales'], default=None, help="Override receipt type")
+    args = parser.parse_args(argv)
+
+    query_profiler.enable_from_env()
+    daemon = HotFolderDaemon(
+        args.watch_dir,
+        done_dir=args.done_dir,
+        failed_dir=args.failed_dir,
+        db_path=args.db,
+        workers=args.workers,
+        poll_interval=args.poll_interval,
+        settle_time=args.settle_time,
+        stats_interval=args.stats_interval,
+        receipt_type_override=args.type
+    )
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("Stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,18 +5,63 @@ Manages receipt workflow - validates products, updates inventory, logs transacti
 
 import sqlite3
 from datetime import datetime
-from receipt_processor import ReceiptProcessor
+from receipt_processor import ReceiptProcessor, ReceiptResult
+from create_db import ensure_db
+from sales_rollup import record_sale
+from stock_ledger import record_movement
+from archive_logs import ARCHIVE_SCHEMA, attached_archives
+from audit_log import get_audit_logger
+from catalog_cache import get_catalog
+
+# Failure reason of receipt items that match no product
+PRODUCT_NOT_FOUND = 'Product not found in inventory'
+
+
+def receipt_file_name(file_path):
+    """File name stored in receipt_logs for a receipt file"""
+    return file_path.split('\\')[-1] if '\\' in file_path else file_path
+
+
+def find_receipt_log(cur, file_path, since):
+    """
+    Look up a committed receipt log for a receipt file - a run that was
+    interrupted after its stock transaction must not be applied again
+    
+    Args:
+        cur: Database cursor
+        file_path: Path of the receipt file as passed to process_receipt_workflow
+        since: Only logs uploaded at or after this 'YYYY-MM-DD HH:MM:SS' time count
+        
+    Returns:
+        receipt_id or None
+    """
+    row = cur.execute(
+        """SELECT receipt_id FROM receipt_logs
+        WHERE file_name=? AND upload_date>=?
+        ORDER BY receipt_id DESC LIMIT 1""",
+        (receipt_file_name(file_path), since)
+    ).fetchone()
+    return row[0] if row else None
 
 class ReceiptHandler:
-    def __init__(self, db_path='ims.db'):
+    """
+    Receipt workflow - keeps no per-receipt state, so one handler can be
+    shared by a pool of threads (every call opens its own connection)
+    """
+    
+    def __init__(self, db_path='ims.db', ocr_backend=None):
         """
         Initialize Receipt Handler
         
         Args:
             db_path: Path to the SQLite database
+            ocr_backend: Optional OCRBackend passed to the ReceiptProcessor
         """
         self.db_path = db_path
-        self.processor = ReceiptProcessor()
+        self.processor = ReceiptProcessor(ocr_backend)
+        ensure_db(db_path)
+        # Receipt item rows are written behind by the process-wide audit logger
+        self.audit = get_audit_logger(db_path)
     
     def get_product_by_name(self, product_name):
         """
@@ -29,25 +74,15 @@ class ReceiptHandler:
             Product tuple (pid, Category, Supplier, name, price, qty, status) or None
         """
         try:
-            con = sqlite3.connect(self.db_path)
-            cur = con.cursor()
-            
-            # Search for product with similar name
-            cur.execute(
-                "SELECT * FROM product WHERE name LIKE ?",
-                (f"%{product_name}%",)
-            )
-            result = cur.fetchone()
-            con.close()
-            
-            return result
+            # Same match as "name LIKE '%...%'", answered from the shared catalog cache
+            return get_catalog(self.db_path).find_product(product_name)
         except Exception as e:
             print(f"Error fetching product: {str(e)}")
             return None
     
     def update_product_quantity(self, product_id, quantity_change, action='add'):
         """
-        Update product quantity in inventory
+        Update product quantity in inventory and write the movement to the stock ledger
         
         Args:
             product_id: ID of the product
@@ -58,157 +93,135 @@ class ReceiptHandler:
             Tuple of (success: bool, old_qty: int, new_qty: int, message: str)
         """
         try:
-            con = sqlite3.connect(self.db_path)
+            con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
             cur = con.cursor()
             
-            # Get current quantity
-            cur.execute("SELECT qty FROM product WHERE pid=?", (product_id,))
-            result = cur.fetchone()
-            
-            if not result:
-                return (False, 0, 0, "Product not found")
-            
-            old_qty = int(result[0])
-            
-            # Calculate new quantity
-            if action == 'add':
-                new_qty = old_qty + quantity_change
-            else:  # subtract
-                if old_qty < quantity_change:
-                    con.close()
-                    return (False, old_qty, 0, f"Insufficient stock. Available: {old_qty}, Required: {quantity_change}")
-                new_qty = old_qty - quantity_change
-            
-            # Update quantity
-            cur.execute(
-                "UPDATE product SET qty=? WHERE pid=?",
-                (new_qty, product_id)
-            )
-            con.commit()
+            # Take the write lock before reading so concurrent updates cannot be lost
+            cur.execute("BEGIN IMMEDIATE")
+            result = self.change_quantity(cur, product_id, quantity_change, action)
+            if result[0]:
+                cur.execute("SELECT name FROM product WHERE pid=?", (product_id,))
+                record_movement(cur, product_id, cur.fetchone()[0], action, quantity_change, result[1], result[2])
+            cur.execute("COMMIT" if result[0] else "ROLLBACK")
             con.close()
             
-            return (True, old_qty, new_qty, "Quantity updated successfully")
+            return result
         
         except Exception as e:
             return (False, 0, 0, f"Error updating quantity: {str(e)}")
     
-    def save_receipt_log(self, receipt_type, file_name, total_items, total_amount):
+    def change_quantity(self, cur, product_id, quantity_change, action='add'):
         """
-        Save receipt log to database
+        Update product quantity using the caller's open transaction
         
         Args:
-            receipt_type: 'purchase' or 'sales'
-            file_name: Original file name
-            total_items: Number of items in receipt
-            total_amount: Total amount
+            cur: Cursor of a transaction holding the write lock
+            product_id: ID of the product
+            quantity_change: Amount to add or subtract
+            action: 'add' for purchase or 'subtract' for sales
             
         Returns:
-            receipt_id or None
+            Tuple of (success: bool, old_qty: int, new_qty: int, message: str)
         """
-        try:
-            con = sqlite3.connect(self.db_path)
-            cur = con.cursor()
-            
-            upload_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            cur.execute(
-                """INSERT INTO receipt_logs 
-                (receipt_type, upload_date, file_name, total_items, total_amount, status, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (receipt_type, upload_date, file_name, total_items, total_amount, 'completed', 'Auto-processed')
-            )
-            con.commit()
-            receipt_id = cur.lastrowid
-            con.close()
-            
-            return receipt_id
+        # Get current quantity
+        cur.execute("SELECT qty FROM product WHERE pid=?", (product_id,))
+        result = cur.fetchone()
         
-        except Exception as e:
-            print(f"Error saving receipt log: {str(e)}")
-            return None
+        if not result:
+            return (False, 0, 0, "Product not found")
+        
+        old_qty = int(result[0])
+        
+        # Calculate new quantity
+        if action == 'add':
+            new_qty = old_qty + quantity_change
+        else:  # subtract
+            if old_qty < quantity_change:
+                return (False, old_qty, 0, f"Insufficient stock. Available: {old_qty}, Required: {quantity_change}")
+            new_qty = old_qty - quantity_change
+        
+        # Update quantity
+        cur.execute(
+            "UPDATE product SET qty=? WHERE pid=?",
+            (new_qty, product_id)
+        )
+        
+        return (True, old_qty, new_qty, "Quantity updated successfully")
     
-    def save_receipt_items(self, receipt_id, items_data):
+    def apply_stock_changes(self, matched_items, action, failed_items, receipt_log):
         """
-        Save individual receipt items
+        Log a receipt and update inventory for all its matched items in one transaction
+        Each change is written to the stock ledger (transaction_logs) and sales
+        receipts are added to the daily sales rollups in the same transaction, so an
+        interrupted run leaves neither the receipt log nor any of its stock changes
         
         Args:
-            receipt_id: ID of the receipt
-            items_data: List of dicts with item info
+            matched_items: List of (ReceiptItem, product row) tuples
+            action: 'add' for purchase or 'subtract' for sales
+            failed_items: List that items without enough stock are appended to
+            receipt_log: (receipt_type, file_name, total_items, total_amount) of the receipt
             
         Returns:
-            List of saved item IDs
+            (receipt_id, list of (ReceiptItem, product_id, old_qty, new_qty) for applied items)
         """
+        con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        cur = con.cursor()
         try:
-            con = sqlite3.connect(self.db_path)
-            cur = con.cursor()
-            
-            item_ids = []
-            
-            for item in items_data:
-                cur.execute(
-                    """INSERT INTO receipt_items
-                    (receipt_id, product_id, product_name, quantity, unit_price, total_price, action)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        receipt_id,
-                        item.get('product_id'),
-                        item.get('product_name'),
-                        item.get('quantity'),
-                        item.get('unit_price'),
-                        item.get('total_price'),
-                        item.get('action')
-                    )
-                )
-                item_ids.append(cur.lastrowid)
+            cur.execute("BEGIN IMMEDIATE")
+            receipt_id = self.save_receipt_log(cur, *receipt_log)
+            applied = []
+            rollup_lines = []
             
-            con.commit()
+            for item, product in matched_items:
+                success, old_qty, new_qty, msg = self.change_quantity(cur, product[0], item.qty, action)
+                
+                if not success:
+                    failed_items.append({
+                        'name': item.name,
+                        'reason': msg
+                    })
+                    continue
+                
+                record_movement(cur, product[0], item.name, action, item.qty, old_qty, new_qty, receipt_id)
+                applied.append((item, product[0], old_qty, new_qty))
+                if action == 'subtract':
+                    # (product_id, product_name, category, units, revenue, discount)
+                    rollup_lines.append((product[0], product[3], product[1], item.qty, item.qty * item.price, 0.0))
+            
+            record_sale(cur, rollup_lines)
+            cur.execute("COMMIT")
+            return receipt_id, applied
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
             con.close()
-            
-            return item_ids
-        
-        except Exception as e:
-            print(f"Error saving receipt items: {str(e)}")
-            return []
     
-    def save_transaction_log(self, receipt_id, product_id, product_name, quantity, action, old_qty, new_qty):
+    def save_receipt_log(self, cur, receipt_type, file_name, total_items, total_amount):
         """
-        Save transaction log for audit trail
+        Save receipt log in the caller's transaction
         
         Args:
-            receipt_id: ID of the receipt
-            product_id: ID of the product
-            product_name: Name of the product
-            quantity: Quantity changed
-            action: 'add' or 'subtract'
-            old_qty: Previous quantity
-            new_qty: New quantity
+            cur: Cursor of the open transaction
+            receipt_type: 'purchase' or 'sales'
+            file_name: Original file name
+            total_items: Number of items in receipt
+            total_amount: Total amount
             
         Returns:
-            transaction_id or None
+            receipt_id
         """
-        try:
-            con = sqlite3.connect(self.db_path)
-            cur = con.cursor()
-            
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            cur.execute(
-                """INSERT INTO transaction_logs
-                (receipt_id, product_id, product_name, quantity, action, old_qty, new_qty, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (receipt_id, product_id, product_name, quantity, action, old_qty, new_qty, timestamp)
-            )
-            con.commit()
-            txn_id = cur.lastrowid
-            con.close()
-            
-            return txn_id
+        upload_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        except Exception as e:
-            print(f"Error saving transaction log: {str(e)}")
-            return None
+        cur.execute(
+            """INSERT INTO receipt_logs 
+            (receipt_type, upload_date, file_name, total_items, total_amount, status, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (receipt_type, upload_date, file_name, total_items, total_amount, 'completed', 'Auto-processed')
+        )
+        return cur.lastrowid
     
-    def process_receipt_workflow(self, file_path, manual_items=None, receipt_type_override=None):
+    def process_receipt_workflow(self, file_path, manual_items=None, receipt_type_override=None, dry_run=False):
         """
         Complete workflow: Extract → Parse → Match products → Update inventory → Log
         
@@ -216,102 +229,79 @@ class ReceiptHandler:
             file_path: Path to receipt file (image/PDF) or temporary name for manual entry
             manual_items: Optional list of manually entered items
             receipt_type_override: Override receipt type detection
+            dry_run: Only parse and match products - no stock changes or logs are written
             
         Returns:
-            Dict with processing results
+            Dict with processing results - 'retry' is True when the failure is
+            transient and nothing was written, so the receipt can be run again
         """
         result = {
             'success': False,
             'receipt_id': None,
             'processed_items': [],
             'failed_items': [],
-            'message': ''
+            'message': '',
+            'retry': False
         }
         
         try:
             # Step 1: Process receipt (OCR + NLP or use manual items)
-            self.processor.reset()
-            
             if manual_items:
                 # Use manually entered items
-                receipt_data = {
-                    'items': manual_items,
-                    'receipt_type': receipt_type_override or 'purchase',
-                    'extracted_text': 'Manual Entry',
-                    'total_amount': sum(item['qty'] * item['price'] for item in manual_items)
-                }
+                receipt_data = ReceiptResult(
+                    manual_items,
+                    receipt_type_override or 'purchase',
+                    'Manual Entry'
+                )
             else:
                 receipt_data = self.processor.process_receipt(file_path)
+                if receipt_type_override:
+                    receipt_data = receipt_data.replace(receipt_type=receipt_type_override)
             
-            if not receipt_data or not receipt_data['items']:
+            if not receipt_data.items:
                 result['message'] = 'No items found in receipt. Please add items manually.'
                 return result
             
-            # Step 2: Save receipt log
-            receipt_id = self.save_receipt_log(
-                receipt_data['receipt_type'],
-                file_path.split('\\')[-1] if '\\' in file_path else file_path,
-                len(receipt_data['items']),
-                receipt_data['total_amount']
-            )
-            
-            if not receipt_id:
-                result['message'] = 'Failed to save receipt log'
-                return result
+            if dry_run:
+                return self.preview_receipt_items(receipt_data, result)
             
-            result['receipt_id'] = receipt_id
+            # Step 2: Find matching products
+            action = 'add' if receipt_data.receipt_type == 'purchase' else 'subtract'
+            matched_items = []
             
-            # Step 3: Process each item
-            for item in receipt_data['items']:
-                # Find matching product
-                product = self.get_product_by_name(item['name'])
+            for item in receipt_data.items:
+                product = self.get_product_by_name(item.name)
                 
                 if not product:
                     result['failed_items'].append({
-                        'name': item['name'],
-                        'reason': 'Product not found in inventory'
+                        'name': item.name,
+                        'reason': PRODUCT_NOT_FOUND
                     })
                     continue
                 
-                product_id = product[0]
-                
-                # Determine action based on receipt type
-                action = 'add' if receipt_data['receipt_type'] == 'purchase' else 'subtract'
-                
-                # Update inventory
-                success, old_qty, new_qty, msg = self.update_product_quantity(
-                    product_id,
-                    item['qty'],
-                    action
-                )
-                
-                if not success:
-                    result['failed_items'].append({
-                        'name': item['name'],
-                        'reason': msg
-                    })
-                    continue
-                
-                # Save receipt item
-                item_data = {
-                    'product_id': product_id,
-                    'product_name': item['name'],
-                    'quantity': item['qty'],
-                    'unit_price': item['price'],
-                    'total_price': item['qty'] * item['price'],
-                    'action': action
-                }
-                self.save_receipt_items(receipt_id, [item_data])
-                
-                # Save transaction log
-                self.save_transaction_log(
-                    receipt_id, product_id, item['name'],
-                    item['qty'], action, old_qty, new_qty
+                matched_items.append((item, product))
+            
+            # Steps 3-4: Save receipt log and update inventory, stock ledger and sales
+            # rollups in one transaction
+            receipt_log = (
+                receipt_data.receipt_type,
+                receipt_file_name(file_path),
+                len(receipt_data.items),
+                receipt_data.total_amount
+            )
+            receipt_id, applied = self.apply_stock_changes(matched_items, action, result['failed_items'], receipt_log)
+            result['receipt_id'] = receipt_id
+            
+            # Step 5: Queue each updated item for the audit log
+            for item, product_id, old_qty, new_qty in applied:
+                self.audit.log(
+                    'receipt_items',
+                    (receipt_id, product_id, item.name, item.qty, item.price, item.qty * item.price, action)
                 )
                 
                 result['processed_items'].append({
-                    'name': item['name'],
-                    'qty': item['qty'],
+                    'name': item.name,
+                    'qty': item.qty,
                     'old_qty': old_qty,
                     'new_qty': new_qty,
                     'action': action
@@ -322,9 +312,59 @@ class ReceiptHandler:
             
         except Exception as e:
             result['message'] = f"Error processing receipt: {str(e)}"
+            # Safe to run again only if the stock transaction was not committed
+            result['retry'] = result['receipt_id'] is None
         
         return result
     
+    def preview_receipt_items(self, receipt_data, result):
+        """
+        Match parsed items against inventory and report the stock changes
+        that would be made, without writing anything
+        
+        Args:
+            receipt_data: Parsed ReceiptResult
+            result: Result dict to fill in
+            
+        Returns:
+            Result dict in the same shape as process_receipt_workflow
+        """
+        action = 'add' if receipt_data.receipt_type == 'purchase' else 'subtract'
+        
+        for item in receipt_data.items:
+            product = self.get_product_by_name(item.name)
+            
+            if not product:
+                result['failed_items'].append({
+                    'name': item.name,
+                    'reason': PRODUCT_NOT_FOUND
+                })
+                continue
+            
+            old_qty = int(product[5])
+            if action == 'add':
+                new_qty = old_qty + item.qty
+            elif old_qty < item.qty:
+                result['failed_items'].append({
+                    'name': item.name,
+                    'reason': f"Insufficient stock. Available: {old_qty}, Required: {item.qty}"
+                })
+                continue
+            else:
+                new_qty = old_qty - item.qty
+            
+            result['processed_items'].append({
+                'name': item.name,
+                'qty': item.qty,
+                'old_qty': old_qty,
+                'new_qty': new_qty,
+                'action': action
+            })
+        
+        result['success'] = True
+        result['message'] = f"Dry run: {len(result['processed_items'])} items would be updated"
+        return result
+    
     def get_receipt_history(self, limit=10):
         """
         Get recent receipt history
@@ -341,7 +381,7 @@ class ReceiptHandler:
             
             cur.execute(
                 """SELECT * FROM receipt_logs 
-                ORDER BY receipt_id DESC LIMIT ?""",
+                ORDER BY upload_date DESC, receipt_id DESC LIMIT ?""",
                 (limit,)
             )
             results = cur.fetchall()
@@ -353,10 +393,178 @@ class ReceiptHandler:
             print(f"Error fetching receipt history: {str(e)}")
             return []
     
+    def _history_filters(self, receipt_type=None, date_from=None, date_to=None, status=None, file_name=None):
+        """
+        WHERE clause for receipt history filters
+        
+        Returns:
+            (list of conditions, list of parameters)
+        """
+        conditions = []
+        params = []
+        if receipt_type:
+            conditions.append("receipt_type=?")
+            params.append(receipt_type)
+        if date_from:
+            conditions.append("upload_date>=?")
+            params.append(date_from)
+        if date_to:
+            # upload_date has a time part, so compare against the start of the next day
+            conditions.append("upload_date<date(?, '+1 day')")
+            params.append(date_to)
+        if status:
+            conditions.append("status=?")
+            params.append(status)
+        if file_name:
+            conditions.append("file_name LIKE ?")
+            params.append(f"%{file_name}%")
+        return conditions, params
+    
+    def _archive_filter(self, date_from=None, date_to=None, after=None):
+        """
+        archive_manifest WHERE clause for the months a history query can reach
+        
+        Returns:
+            (where clause, list of parameters)
+        """
+        conditions = ["receipt_rows>0"]
+        params = []
+        if date_from:
+            conditions.append("month>=substr(?, 1, 7)")
+            params.append(date_from)
+        if date_to:
+            conditions.append("month<=substr(?, 1, 7)")
+            params.append(date_to)
+        if after:
+            conditions.append("month<=substr(?, 1, 7)")
+            params.append(after[0])
+        return "WHERE " + " AND ".join(conditions), params
+    
+    def get_receipt_page(self, receipt_type=None, date_from=None, date_to=None, status=None,
+                         file_name=None, after=None, page_size=50, include_aggregates=None):
+        """
+        Get one page of receipt history, newest first, using keyset pagination
+        
+        Pages continue from the (upload_date, receipt_id) of the last row seen
+        instead of an OFFSET, so with the receipt_logs indexes every page costs
+        the same however far back the history goes. Once the live receipts
+        run out, the monthly archives are attached newest first.
+        
+        Args:
+            receipt_type: 'purchase', 'sales' or None for both
+            date_from: First day 'YYYY-MM-DD' (inclusive) or None
+            date_to: Last day 'YYYY-MM-DD' (inclusive) or None
+            status: Receipt status or None
+            file_name: Part of the file name or None
+            after: next_after of the previous page (None for the first page)
+            page_size: Receipts per page
+            include_aggregates: Also total all matching receipts (default: first page only)
+            
+        Returns:
+            Dict with rows, next_after (None on the last page), page_totals
+            and aggregates (None when not included)
+        """
+        page = {
+            'rows': [],
+            'next_after': None,
+            'page_totals': {'count': 0, 'items': 0, 'amount': 0.0},
+            'aggregates': None
+        }
+        if include_aggregates is None:
+            include_aggregates = after is None
+        
+        try:
+            con = sqlite3.connect(self.db_path)
+            cur = con.cursor()
+            conditions, params = self._history_filters(receipt_type, date_from, date_to, status, file_name)
+            
+            page_conditions = conditions + (["(upload_date, receipt_id)<(?, ?)"] if after else [])
+            page_params = params + (list(after) if after else [])
+            where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+            page_sql = f"""SELECT * FROM {{}}.receipt_logs {where}
+                ORDER BY upload_date DESC, receipt_id DESC LIMIT ?"""
+            # Fetch one extra row to know whether another page follows
+            cur.execute(page_sql.format('main'), page_params + [page_size + 1])
+            rows = cur.fetchall()
+            if len(rows) <= page_size:
+                # Archived months are all older than the live receipts
+                archive_where, archive_params = self._archive_filter(date_from, date_to, after)
+                for month in attached_archives(con, archive_where, archive_params):
+                    cur.execute(page_sql.format(ARCHIVE_SCHEMA), page_params + [page_size + 1 - len(rows)])
+                    rows += cur.fetchall()
+                    if len(rows) > page_size:
+                        break
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                page['next_after'] = (rows[-1][2], rows[-1][0])
+            
+            page['rows'] = rows
+            page['page_totals'] = {
+                'count': len(rows),
+                'items': sum(row[4] or 0 for row in rows),
+                'amount': sum(row[5] or 0 for row in rows)
+            }
+            
+            if include_aggregates:
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                totals_sql = f"""SELECT receipt_type, COUNT(*), COALESCE(SUM(total_items), 0), COALESCE(SUM(total_amount), 0)
+                    FROM {{}}.receipt_logs {where} GROUP BY receipt_type"""
+                cur.execute(totals_sql.format('main'), params)
+                totals = cur.fetchall()
+                archive_where, archive_params = self._archive_filter(date_from, date_to)
+                for month in attached_archives(con, archive_where, archive_params):
+                    cur.execute(totals_sql.format(ARCHIVE_SCHEMA), params)
+                    totals += cur.fetchall()
+                by_type = {}
+                for receipt_type, count, items, amount in totals:
+                    value = by_type.setdefault(receipt_type, {'count': 0, 'items': 0, 'amount': 0.0})
+                    value['count'] += count
+                    value['items'] += items
+                    value['amount'] += amount
+                page['aggregates'] = {
+                    'count': sum(value['count'] for value in by_type.values()),
+                    'items': sum(value['items'] for value in by_type.values()),
+                    'amount': sum(value['amount'] for value in by_type.values()),
+                    'by_type': by_type
+                }
+            
+            con.close()
+        
+        except Exception as e:
+            print(f"Error fetching receipt history: {str(e)}")
+        
+        return page
+    
+    def get_receipt_statuses(self):
+        """
+        Get the distinct receipt statuses for filter choices
+        
+        Returns:
+            List of status strings
+        """
+        try:
+            con = sqlite3.connect(self.db_path)
+            cur = con.cursor()
+            status_sql = "SELECT DISTINCT status FROM {}.receipt_logs WHERE status IS NOT NULL"
+            cur.execute(status_sql.format('main'))
+            statuses = {row[0] for row in cur.fetchall()}
+            for month in attached_archives(con, "WHERE receipt_rows>0"):
+                cur.execute(status_sql.format(ARCHIVE_SCHEMA))
+                statuses.update(row[0] for row in cur.fetchall())
+            con.close()
+            return sorted(statuses)
+        
+        except Exception as e:
+            print(f"Error fetching receipt statuses: {str(e)}")
+            return []
+    
     def get_receipt_details(self, receipt_id):
         """
         Get detailed information about a specific receipt
         
+        Receipts no longer in the live database are looked up in the
+        archive whose receipt id range covers them.
+        
         Args:
             receipt_id: ID of the receipt
             
@@ -364,6 +572,7 @@ class ReceiptHandler:
             Dict with receipt and items details
         """
         try:
+            self.audit.flush()
             con = sqlite3.connect(self.db_path)
             cur = con.cursor()
             
@@ -379,6 +588,19 @@ class ReceiptHandler:
             cur.execute("SELECT * FROM transaction_logs WHERE receipt_id=?", (receipt_id,))
             transactions = cur.fetchall()
             
+            if receipt is None:
+                for month in attached_archives(
+                    con, "WHERE first_receipt_id<=? AND last_receipt_id>=?", (receipt_id, receipt_id)
+                ):
+                    cur.execute(f"SELECT * FROM {ARCHIVE_SCHEMA}.receipt_logs WHERE receipt_id=?", (receipt_id,))
+                    receipt = cur.fetchone()
+                    if receipt is not None:
+                        cur.execute(f"SELECT * FROM {ARCHIVE_SCHEMA}.receipt_items WHERE receipt_id=?", (receipt_id,))
+                        items = cur.fetchall()
+                        cur.execute(f"SELECT * FROM {ARCHIVE_SCHEMA}.transaction_logs WHERE receipt_id=?", (receipt_id,))
+                        transactions = cur.fetchall() + transactions
+                        break
+            
             con.close()
             
             return {
@@ -0,0 +1,456 @@
+"""
+Receipt Job Queue Module
+Persistent background processing of receipts - jobs survive app restarts
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+from create_db import ensure_db
+from receipt_handler import ReceiptHandler, find_receipt_log
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class ReceiptJobQueue:
+    def __init__(self, db_path='ims.db', base_delay=5, stale_after=60):
+        """
+        Initialize the job queue
+
+        Args:
+            db_path: Path to the SQLite database
+            base_delay: Seconds before the first retry (doubles on each attempt)
+            stale_after: Seconds without a heartbeat after which a worker's
+                running jobs are considered abandoned
+        """
+        self.db_path = db_path
+        self.base_delay = base_delay
+        self.stale_after = stale_after
+        ensure_db(db_path)
+
+    def _connect(self):
+        con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        return con
+
+    def enqueue(self, file_path, receipt_type_override=None, max_attempts=3):
+        """
+        Add a receipt file to the queue
+
+        Args:
+            file_path: Path to receipt file (image/PDF)
+            receipt_type_override: Optional 'purchase' or 'sales'
+            max_attempts: Attempts before the job is marked failed
+
+        Returns:
+            job_id
+        """
+        return self.enqueue_many([file_path], receipt_type_override, max_attempts)[0]
+
+    def enqueue_many(self, file_paths, receipt_type_override=None, max_attempts=3):
+        """
+        Add several receipt files to the queue in one transaction
+
+        Returns:
+            List of job_ids
+        """
+        now = datetime.now().strftime(TIME_FORMAT)
+        con = self._connect()
+        try:
+            job_ids = []
+            con.execute("BEGIN IMMEDIATE")
+            for file_path in file_paths:
+                cur = con.execute(
+                    """INSERT INTO receipt_jobs
+                    (file_path, receipt_type, status, attempts, max_attempts, next_attempt_at, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (file_path, receipt_type_override, JOB_QUEUED, 0, max_attempts, now, now)
+                )
+                job_ids.append(cur.lastrowid)
+            con.execute("COMMIT")
+            return job_ids
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def claim(self, worker):
+        """
+        Atomically claim the next due job
+
+        Args:
+            worker: Name of the claiming worker
+
+        Returns:
+            Job dict or None if nothing is due
+        """
+        now = datetime.now().strftime(TIME_FORMAT)
+        con = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock, so two workers can never claim the same job
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute(
+                """SELECT job_id FROM receipt_jobs
+                WHERE status=? AND next_attempt_at<=?
+                ORDER BY next_attempt_at, job_id LIMIT 1""",
+                (JOB_QUEUED, now)
+            ).fetchone()
+
+            if not row:
+                con.execute("COMMIT")
+                return None
+
+            con.execute(
+                """UPDATE receipt_jobs
+                SET status=?, attempts=attempts+1, started_at=?, worker=?
+                WHERE job_id=?""",
+                (JOB_RUNNING, now, worker, row['job_id'])
+            )
+            job = con.execute("SELECT * FROM receipt_jobs WHERE job_id=?", (row['job_id'],)).fetchone()
+            con.execute("COMMIT")
+            return dict(job)
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def complete(self, job_id, receipt_id, message):
+        """Mark a job as done"""
+        self._finish(job_id, JOB_DONE, receipt_id, message)
+
+    def fail(self, job_id, attempts, max_attempts, message, retry=True, receipt_id=None):
+        """
+        Record a failed attempt - requeue with exponential backoff or mark failed
+
+        Args:
+            job_id: ID of the job
+            attempts: Attempts made so far (including this one)
+            max_attempts: Maximum attempts for the job
+            message: Failure reason
+            retry: False if the failure is permanent
+            receipt_id: Receipt log written before the failure, if any
+        """
+        if not retry or attempts >= max_attempts:
+            self._finish(job_id, JOB_FAILED, receipt_id, message)
+            return
+
+        delay = self.base_delay * (2 ** (attempts - 1))
+        next_attempt = (datetime.now() + timedelta(seconds=delay)).strftime(TIME_FORMAT)
+        con = self._connect()
+        try:
+            con.execute(
+                """UPDATE receipt_jobs
+                SET status=?, next_attempt_at=?, worker=NULL, message=?
+                WHERE job_id=?""",
+                (JOB_QUEUED, next_attempt, f"Retry {attempts}/{max_attempts} in {delay}s: {message}", job_id)
+            )
+        finally:
+            con.close()
+
+    def _finish(self, job_id, status, receipt_id, message):
+        now = datetime.now().strftime(TIME_FORMAT)
+        con = self._connect()
+        try:
+            con.execute(
+                """UPDATE receipt_jobs
+                SET status=?, finished_at=?, receipt_id=?, message=?
+                WHERE job_id=?""",
+                (status, now, receipt_id, message, job_id)
+            )
+        finally:
+            con.close()
+
+    def heartbeat(self, workers):
+        """Record that the named workers are alive - their running jobs are left alone"""
+        now = datetime.now().strftime(TIME_FORMAT)
+        con = self._connect()
+        try:
+            con.executemany(
+                "INSERT OR REPLACE INTO receipt_workers(worker, heartbeat_at) VALUES (?, ?)",
+                [(worker, now) for worker in workers]
+            )
+        finally:
+            con.close()
+
+    def forget_workers(self, workers):
+        """Remove the heartbeats of workers that stopped cleanly"""
+        con = self._connect()
+        try:
+            con.executemany("DELETE FROM receipt_workers WHERE worker=?", [(worker,) for worker in workers])
+        finally:
+            con.close()
+
+    def recover_stale(self):
+        """
+        Recover running jobs whose worker stopped sending heartbeats (e.g. app closed mid-run)
+
+        A job whose receipt log was already committed is marked done instead of
+        requeued, so its stock changes are not applied a second time.
+
+        Returns:
+            Number of jobs recovered
+        """
+        now = datetime.now()
+        cutoff = (now - timedelta(seconds=self.stale_after)).strftime(TIME_FORMAT)
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            jobs = con.execute(
+                """SELECT job_id, file_path, created_at FROM receipt_jobs
+                WHERE status=? AND worker NOT IN
+                (SELECT worker FROM receipt_workers WHERE heartbeat_at>=?)""",
+                (JOB_RUNNING, cutoff)
+            ).fetchall()
+            for job in jobs:
+                receipt_id = find_receipt_log(con, job['file_path'], job['created_at'])
+                if receipt_id is None:
+                    con.execute(
+                        """UPDATE receipt_jobs
+                        SET status=?, worker=NULL, message='Recovered after interrupted run'
+                        WHERE job_id=?""",
+                        (JOB_QUEUED, job['job_id'])
+                    )
+                else:
+                    con.execute(
+                        """UPDATE receipt_jobs
+                        SET status=?, finished_at=?, receipt_id=?, message='Receipt was applied before the run was interrupted'
+                        WHERE job_id=?""",
+                        (JOB_DONE, now.strftime(TIME_FORMAT), receipt_id, job['job_id'])
+                    )
+            con.execute("COMMIT")
+            return len(jobs)
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    def get_job(self, job_id):
+        """Get a single job as a dict, or None"""
+        con = self._connect()
+        try:
+            row = con.execute("SELECT * FROM receipt_jobs WHERE job_id=?", (job_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            con.close()
+
+    def list_jobs(self, limit=50):
+        """
+        Get the most recent jobs for status display
+
+        Returns:
+            List of job dicts, newest first
+        """
+        con = self._connect()
+        try:
+            rows = con.execute(
+                "SELECT * FROM receipt_jobs ORDER BY job_id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            con.close()
+
+    def status_counts(self):
+        """
+        Count jobs per status
+
+        Returns:
+            Dict like {'queued': 3, 'running': 1, 'done': 10, 'failed': 0}
+        """
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        con = self._connect()
+        try:
+            for status, count in con.execute("SELECT status, COUNT(*) FROM receipt_jobs GROUP BY status"):
+                counts[status] = count
+            return counts
+        finally:
+            con.close()
+
+
+class ReceiptJobWorker(threading.Thread):
+    def __init__(self, queue, name, poll_interval=1.0, handler=None):
+        """
+        Background worker that claims and processes receipt jobs
+
+        Args:
+            queue: ReceiptJobQueue
+            name: Worker name stored on claimed jobs
+            poll_interval: Seconds to sleep when no job is due
+            handler: ReceiptHandler (a new one is created if omitted)
+        """
+        super().__init__(name=name, daemon=True)
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.handler = handler or ReceiptHandler(queue.db_path)
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if not self.run_once():
+                self.stop_event.wait(self.poll_interval)
+
+    def run_once(self):
+        """
+        Claim and process one job
+
+        Returns:
+            True if a job was processed
+        """
+        try:
+            job = self.queue.claim(self.name)
+        except sqlite3.OperationalError as e:
+            print(f"Error claiming receipt job: {str(e)}")
+            return False
+
+        if not job:
+            return False
+
+        try:
+            result = self.handler.process_receipt_workflow(
+                job['file_path'],
+                receipt_type_override=job['receipt_type']
+            )
+        except Exception as e:
+            result = {'success': False, 'receipt_id': None, 'message': f"Error processing receipt: {str(e)}", 'retry': True}
+
+        if result['success']:
+            self.queue.complete(job['job_id'], result['receipt_id'], result['message'])
+        else:
+            self.queue.fail(
+                job['job_id'], job['attempts'], job['max_attempts'],
+                result['message'], retry=result['retry'], receipt_id=result['receipt_id']
+            )
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class ReceiptJobPool:
+    def __init__(self, db_path='ims.db', workers=2, poll_interval=1.0, heartbeat_interval=10):
+        """
+        Group of worker threads sharing one job queue
+
+        Args:
+            db_path: Path to the SQLite database
+            workers: Number of worker threads
+            poll_interval: Seconds each idle worker waits between polls
+            heartbeat_interval: Seconds between worker heartbeats and checks
+                for jobs abandoned by other processes
+        """
+        self.queue = ReceiptJobQueue(db_path)
+        self.handler = ReceiptHandler(db_path)
+        self.workers_count = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.workers = []
+        self.heartbeat_thread = None
+        self.stop_event = None
+
+    def start(self):
+        """Recover abandoned jobs and start the worker threads"""
+        if self.workers:
+            return
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self.workers = [
+            ReceiptJobWorker(self.queue, f"{prefix}-{i + 1}", self.poll_interval, self.handler)
+            for i in range(self.workers_count)
+        ]
+        # Alive before the first claim, so no other process recovers our jobs
+        self.queue.heartbeat([worker.name for worker in self.workers])
+        self.queue.recover_stale()
+        for worker in self.workers:
+            worker.start()
+        self.stop_event = threading.Event()
+        self.heartbeat_thread = threading.Thread(
+            target=self._beat, args=(self.workers, self.stop_event), name='receipt-heartbeat', daemon=True
+        )
+        self.heartbeat_thread.start()
+
+    def _beat(self, workers, stop_event):
+        names = [worker.name for worker in workers]
+        while True:
+            stopping = stop_event.wait(self.heartbeat_interval)
+            # After stop, keep beating until the jobs in progress are finished
+            if stopping and not any(worker.is_alive() for worker in workers):
+                break
+            try:
+                self.queue.heartbeat(names)
+                if not stopping:
+                    # Jobs of workers that died after our start (in any process) are picked up here
+                    self.queue.recover_stale()
+            except sqlite3.OperationalError as e:
+                print(f"Error recording receipt worker heartbeat: {str(e)}")
+        try:
+            self.queue.forget_workers(names)
+        except sqlite3.OperationalError as e:
+            print(f"Error removing receipt worker heartbeat: {str(e)}")
+
+    def stop(self, wait=True):
+        """Stop the workers - a job in progress is finished first when wait is True"""
+        if not self.workers:
+            return
+        for worker in self.workers:
+            worker.stop()
+        self.stop_event.set()
+        if wait:
+            for worker in self.workers:
+                worker.join()
+            self.heartbeat_thread.join()
+        self.workers = []
+        self.heartbeat_thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receipt job queue")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = sub.add_parser('enqueue', help="Queue receipt files")
+    enqueue_parser.add_argument('files', nargs='+')
+    enqueue_parser.add_argument('--type', choices=['purchase', 'sales'], default=None)
+    enqueue_parser.add_argument('--max-attempts', type=int, default=3)
+
+    worker_parser = sub.add_parser('worker', help="Run worker threads until interrupted")
+    worker_parser.add_argument('--workers', type=int, default=2)
+
+    sub.add_parser('status', help="Show job counts")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'enqueue':
+        queue = ReceiptJobQueue(args.db)
+        job_ids = queue.enqueue_many(args.files, args.type, args.max_attempts)
+        print(f"Queued {len(job_ids)} receipt job(s)")
+    elif args.command == 'worker':
+        pool = ReceiptJobPool(args.db, args.workers)
+        pool.start()
+        print(f"Started {args.workers} receipt worker(s). Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("Stopping workers...")
+            pool.stop()
+    else:
+        queue = ReceiptJobQueue(args.db)
+        for status, count in queue.status_counts().items():
+            print(f"{status:10} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,270 +4,359 @@ Handles OCR extraction and NLP parsing of receipt data from images/PDFs
 """
 
 import re
-from PIL import Image
 from datetime import datetime
 import json
+from ocr_backend import get_ocr_backend
 
-# Try to import optional dependencies
-try:
-    import pytesseract
-    HAS_TESSERACT = True
-except ImportError:
-    HAS_TESSERACT = False
-    print("Warning: pytesseract not available. Manual entry will be used.")
+# Pattern to match: Item Name [Qty] [Price]
+# Supports variations like: "Product 10 500", "Item: 5 qty 250.50"
+ITEM_PATTERN = re.compile(r'([a-zA-Z\s]+?)\s+(\d+)\s+([\d.]+)')
 
-try:
-    import pdf2image
-    HAS_PDF2IMAGE = True
-except ImportError:
-    HAS_PDF2IMAGE = False
-    print("Warning: pdf2image not available. PDF processing disabled.")
+# Keywords for purchase receipts
+PURCHASE_KEYWORDS = ('purchase', 'invoice', 'supplier', 'bill', 'order', 'wholesale', 'received')
 
+# Keywords for sales receipts
+SALES_KEYWORDS = ('sale', 'receipt', 'customer', 'sold', 'invoice #', 'retail', 'bill to')
 
-class ReceiptProcessor:
-    def __init__(self):
-        """Initialize the Receipt Processor with OCR and NLP capabilities"""
-        self.receipt_data = {
-            'items': [],
-            'total_amount': 0,
-            'receipt_type': None,
-            'extracted_text': ''
+
+class ReceiptItem:
+    """
+    Immutable receipt line - name, quantity and unit price
+
+    Uses __slots__ so receipts with thousands of lines stay small, and
+    supports item['name'] style access for code written against the old dicts.
+    """
+
+    __slots__ = ('name', 'qty', 'price')
+
+    def __init__(self, name, qty, price):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'qty', qty)
+        object.__setattr__(self, 'price', price)
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        Build an item from a ReceiptItem or a {'name', 'qty', 'price'} dict
+
+        Args:
+            value: ReceiptItem or dict
+
+        Returns:
+            ReceiptItem
+        """
+        if isinstance(value, cls):
+            return value
+        return cls(value['name'], value['qty'], value['price'])
+
+    @property
+    def total(self):
+        return self.qty * self.price
+
+    def to_dict(self):
+        return {'name': self.name, 'qty': self.qty, 'price': self.price}
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ReceiptItem is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("ReceiptItem is immutable")
+
+    def __reduce__(self):
+        return (ReceiptItem, (self.name, self.qty, self.price))
+
+    def __eq__(self, other):
+        if not isinstance(other, ReceiptItem):
+            return NotImplemented
+        return (self.name, self.qty, self.price) == (other.name, other.qty, other.price)
+
+    def __hash__(self):
+        return hash((self.name, self.qty, self.price))
+
+    def __repr__(self):
+        return f"ReceiptItem(name={self.name!r}, qty={self.qty!r}, price={self.price!r})"
+
+
+class ReceiptResult:
+    """
+    Immutable result of processing one receipt
+
+    Changes return a new result, so a result can be shared between threads.
+    Supports result['items'] style access for code written against the old dict.
+    """
+
+    __slots__ = ('items', 'total_amount', 'receipt_type', 'extracted_text')
+
+    def __init__(self, items=(), receipt_type=None, extracted_text='', total_amount=None):
+        """
+        Args:
+            items: Iterable of ReceiptItem or item dicts
+            receipt_type: 'purchase', 'sales' or None
+            extracted_text: Raw OCR text
+            total_amount: Total (calculated from items when omitted)
+        """
+        items = tuple(ReceiptItem.from_value(item) for item in items)
+        if total_amount is None:
+            total_amount = sum(item.qty * item.price for item in items)
+        object.__setattr__(self, 'items', items)
+        object.__setattr__(self, 'total_amount', total_amount)
+        object.__setattr__(self, 'receipt_type', receipt_type)
+        object.__setattr__(self, 'extracted_text', extracted_text)
+
+    def replace(self, **changes):
+        """
+        Return a copy with some fields changed
+
+        Returns:
+            New ReceiptResult (total is recalculated when items change)
+        """
+        values = {
+            'items': self.items,
+            'receipt_type': self.receipt_type,
+            'extracted_text': self.extracted_text,
+            'total_amount': None if 'items' in changes else self.total_amount
+        }
+        values.update(changes)
+        return ReceiptResult(**values)
+
+    def with_item(self, name, qty, price):
+        """Return a copy with one more item"""
+        return self.replace(items=self.items + (ReceiptItem(name, qty, price),))
+
+    def without_item(self, index):
+        """Return a copy with the item at index removed"""
+        return self.replace(items=self.items[:index] + self.items[index + 1:])
+
+    def to_dict(self):
+        return {
+            'items': [item.to_dict() for item in self.items],
+            'total_amount': self.total_amount,
+            'receipt_type': self.receipt_type,
+            'extracted_text': self.extracted_text
         }
-    
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ReceiptResult is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("ReceiptResult is immutable")
+
+    def __reduce__(self):
+        return (ReceiptResult, (self.items, self.receipt_type, self.extracted_text, self.total_amount))
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return (
+            f"ReceiptResult(items={len(self.items)}, total_amount={self.total_amount!r}, "
+            f"receipt_type={self.receipt_type!r})"
+        )
+
+
+EMPTY_RESULT = ReceiptResult()
+
+
+class ReceiptProcessor:
+    """
+    Stateless receipt processor - every call returns a new ReceiptResult,
+    so one processor can be shared by many threads
+    """
+
+    def __init__(self, ocr_backend=None):
+        """
+        Initialize the Receipt Processor with OCR and NLP capabilities
+
+        Args:
+            ocr_backend: OCRBackend used for text extraction
+                         (defaults to the shared backend from ocr_backend.get_ocr_backend)
+        """
+        self.ocr_backend = ocr_backend or get_ocr_backend()
+
     def extract_text_from_image(self, image_path):
         """
-        Extract text from image using Tesseract OCR (if available)
+        Extract text from image using the configured OCR backend (if available)
         Falls back to manual entry if OCR not available
-        
+
         Args:
             image_path: Path to the image file
-            
+
         Returns:
             Extracted text string or empty string if not available
         """
         try:
-            if not HAS_TESSERACT:
-                print(f"Note: Tesseract not installed. Please enter items manually for {image_path}")
+            if not self.ocr_backend.is_available():
+                print(f"Note: OCR backend '{self.ocr_backend.name}' not available. Please enter items manually for {image_path}")
                 return ""
-            
-            # Open image
-            image = Image.open(image_path)
-            
-            # Convert to grayscale for better OCR
-            image = image.convert('L')
-            
-            # Extract text using Tesseract
-            extracted_text = pytesseract.image_to_string(image)
-            self.receipt_data['extracted_text'] = extracted_text
-            
-            return extracted_text
+
+            return self.ocr_backend.extract_text(image_path)
         except Exception as e:
             print(f"Error extracting text from image: {str(e)}")
             return ""
-    
+
     def extract_text_from_pdf(self, pdf_path):
         """
-        Extract text from PDF using pdf2image and OCR
-        
+        Extract text from PDF using the configured OCR backend
+
         Args:
             pdf_path: Path to the PDF file
-            
+
         Returns:
             Extracted text string
         """
         try:
-            if not HAS_PDF2IMAGE:
-                print("Note: pdf2image not available. Please enter items manually.")
+            if not self.ocr_backend.is_available():
+                print(f"Note: OCR backend '{self.ocr_backend.name}' not available. Please enter items manually.")
                 return ""
-            
-            if not HAS_TESSERACT:
-                print("Note: Tesseract not installed. Please enter items manually.")
-                return ""
-            
-            # Convert PDF to images
-            images = pdf2image.convert_from_path(pdf_path)
-            extracted_text = ""
-            
-            for image in images:
-                # Convert PIL image to grayscale
-                image = image.convert('L')
-                
-                # Extract text
-                text = pytesseract.image_to_string(image)
-                extracted_text += text + "\n"
-            
-            self.receipt_data['extracted_text'] = extracted_text
-            return extracted_text
+
+            return self.ocr_backend.extract_text(pdf_path)
         except Exception as e:
             print(f"Error extracting text from PDF: {str(e)}")
             return ""
-    
+
     def parse_receipt_items(self, text):
         """
         Parse extracted text to identify items, quantities, and prices using NLP patterns
-        
+
         Args:
             text: Raw extracted text from receipt
-            
+
         Returns:
-            List of parsed items with structure: {'name': str, 'qty': int, 'price': float}
+            Tuple of ReceiptItem(name, qty, price)
         """
         items = []
-        lines = text.split('\n')
-        
-        # Pattern to match: Item Name [Qty] [Price]
-        # Supports variations like: "Product 10 500", "Item: 5 qty 250.50"
-        item_pattern = r'([a-zA-Z\s]+?)\s+(\d+)\s+([\d.]+)'
-        
-        for line in lines:
+        search = ITEM_PATTERN.search
+
+        for line in text.split('\n'):
             line = line.strip()
-            if not line or len(line) < 5:
+            if len(line) < 5:
                 continue
-            
+
             # Try to match item pattern
-            match = re.search(item_pattern, line)
+            match = search(line)
             if match:
                 item_name = match.group(1).strip()
                 quantity = int(match.group(2))
-                price = float(match.group(3))
-                
+                try:
+                    price = float(match.group(3))
+                except ValueError:
+                    # e.g. "1.2.3" picked up from a date
+                    continue
+
                 # Validate data
                 if item_name and quantity > 0 and price > 0:
-                    items.append({
-                        'name': item_name,
-                        'qty': quantity,
-                        'price': price
-                    })
-        
-        self.receipt_data['items'] = items
-        return items
-    
+                    items.append(ReceiptItem(item_name, quantity, price))
+
+        return tuple(items)
+
     def detect_receipt_type(self, text):
         """
         Detect if receipt is for Purchase (stock addition) or Sales (stock deduction)
-        
+
         Args:
             text: Extracted receipt text
-            
+
         Returns:
             'purchase' or 'sales'
         """
         text_lower = text.lower()
-        
-        # Keywords for purchase receipts
-        purchase_keywords = ['purchase', 'invoice', 'supplier', 'bill', 'order', 'wholesale', 'received']
-        
-        # Keywords for sales receipts
-        sales_keywords = ['sale', 'receipt', 'customer', 'sold', 'invoice #', 'retail', 'bill to']
-        
-        purchase_count = sum(1 for keyword in purchase_keywords if keyword in text_lower)
-        sales_count = sum(1 for keyword in sales_keywords if keyword in text_lower)
-        
-        receipt_type = 'purchase' if purchase_count >= sales_count else 'sales'
-        self.receipt_data['receipt_type'] = receipt_type
-        
-        return receipt_type
-    
-    def calculate_total(self):
+
+        purchase_count = sum(1 for keyword in PURCHASE_KEYWORDS if keyword in text_lower)
+        sales_count = sum(1 for keyword in SALES_KEYWORDS if keyword in text_lower)
+
+        return 'purchase' if purchase_count >= sales_count else 'sales'
+
+    def calculate_total(self, items):
         """
         Calculate total amount from parsed items
-        
+
+        Args:
+            items: Iterable of ReceiptItem or item dicts
+
         Returns:
             Total amount as float
         """
-        total = sum(item['qty'] * item['price'] for item in self.receipt_data['items'])
-        self.receipt_data['total_amount'] = total
-        return total
-    
+        return sum(item['qty'] * item['price'] for item in items)
+
     def process_receipt(self, file_path, manual_items=None):
         """
         Complete workflow: Read file → Extract text → Parse items → Detect type → Calculate total
-        
+
         Args:
             file_path: Path to image or PDF file
             manual_items: Optional list of manually entered items for fallback
-            
+
         Returns:
-            Dictionary with processed receipt data
+            ReceiptResult with processed receipt data
         """
         # Determine file type
         file_ext = file_path.lower().split('.')[-1]
-        
+
         # Extract text based on file type
         if file_ext == 'pdf':
             text = self.extract_text_from_pdf(file_path)
         else:
             text = self.extract_text_from_image(file_path)
-        
+
         # If OCR didn't extract text but manual items provided, use them
         if not text and manual_items:
-            self.receipt_data['items'] = manual_items
-            self.receipt_data['total_amount'] = self.calculate_total()
-            self.detect_receipt_type("manual entry")
-            return self.receipt_data
-        
+            return ReceiptResult(manual_items, self.detect_receipt_type("manual entry"))
+
         if not text:
             # If no text extracted and no manual items, return empty
-            return self.receipt_data
-        
-        # Parse items from text
-        self.parse_receipt_items(text)
-        
-        # Detect receipt type
-        self.detect_receipt_type(text)
-        
-        # Calculate total
-        self.calculate_total()
-        
-        return self.receipt_data
-    
-    def get_processed_data(self):
-        """Return the processed receipt data"""
-        return self.receipt_data
-    
-    def reset(self):
-        """Reset receipt data for processing new receipt"""
-        self.receipt_data = {
-            'items': [],
-            'total_amount': 0,
-            'receipt_type': None,
-            'extracted_text': ''
-        }
-    
-    def add_manual_item(self, name, qty, price):
+            return EMPTY_RESULT
+
+        # Parse items, detect receipt type and calculate total
+        return ReceiptResult(
+            self.parse_receipt_items(text),
+            self.detect_receipt_type(text),
+            text
+        )
+
+    def add_manual_item(self, result, name, qty, price):
         """
-        Manually add an item to the receipt
-        
+        Manually add an item to a receipt
+
         Args:
+            result: ReceiptResult to add to
             name: Product name
             qty: Quantity
             price: Unit price
-            
+
         Returns:
-            Updated items list
+            New ReceiptResult, or None if the item is invalid
         """
         if name and qty > 0 and price > 0:
-            self.receipt_data['items'].append({
-                'name': name,
-                'qty': qty,
-                'price': price
-            })
-            self.calculate_total()
-            return True
-        return False
-    
-    def remove_item(self, index):
+            return result.with_item(name, qty, price)
+        return None
+
+    def remove_item(self, result, index):
         """
-        Remove an item from the receipt by index
-        
+        Remove an item from a receipt by index
+
         Args:
+            result: ReceiptResult to remove from
             index: Index of item to remove
-            
+
         Returns:
-            Updated items list
+            New ReceiptResult, or None if the index is out of range
         """
-        if 0 <= index < len(self.receipt_data['items']):
-            self.receipt_data['items'].pop(index)
-            self.calculate_total()
-            return True
-        return False
+        if 0 <= index < len(result.items):
+            return result.without_item(index)
+        return None
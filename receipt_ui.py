@@ -9,6 +9,10 @@ from PIL import Image, ImageTk
 import os
 from datetime import datetime
 from receipt_handler import ReceiptHandler
+from receipt_jobs import ReceiptJobPool
+
+# Receipts loaded per page in the History tab
+HISTORY_PAGE_SIZE = 100
 
 class ReceiptProcessingUI:
     def __init__(self, root):
@@ -19,10 +23,15 @@ class ReceiptProcessingUI:
         self.root.configure(bg='white')
         
         self.handler = ReceiptHandler()
+        self.job_pool = ReceiptJobPool(self.handler.db_path)
         self.selected_file = None
         self.manual_items = []
         
         self.create_ui()
+        
+        # Background workers keep processing queued receipts while the window is open
+        self.job_pool.start()
+        self.root.bind("<Destroy>", self.on_destroy, add="+")
     
     def create_ui(self):
         """Create the user interface"""
@@ -58,6 +67,11 @@ class ReceiptProcessingUI:
         tab3 = Frame(notebook, bg='white')
         notebook.add(tab3, text="History")
         self.create_history_tab(tab3)
+        
+        # Tab 4: Background jobs
+        tab4 = Frame(notebook, bg='white')
+        notebook.add(tab4, text="Queued Jobs")
+        self.create_jobs_tab(tab4)
     
     def create_upload_tab(self, parent):
         """Create file upload tab"""
@@ -117,6 +131,19 @@ class ReceiptProcessingUI:
         )
         process_btn.pack(side=LEFT, padx=5)
         
+        queue_btn = Button(
+            button_frame,
+            text="📥 Queue Receipts",
+            command=self.queue_receipts,
+            font=("times new roman", 11, "bold"),
+            bg="#FF9800",
+            fg="white",
+            cursor="hand2",
+            padx=15,
+            pady=8
+        )
+        queue_btn.pack(side=LEFT, padx=5)
+        
         # Right panel - Results section
         right_panel = Frame(parent, bg='white')
         right_panel.pack(side=RIGHT, fill=BOTH, expand=True, padx=10, pady=10)
@@ -262,31 +289,90 @@ class ReceiptProcessingUI:
         """Create history tab"""
         history_label = Label(
             parent,
-            text="Recent Receipt History",
+            text="Receipt History",
             font=("times new roman", 14, "bold"),
             bg='white'
         )
         history_label.pack(pady=10)
         
+        # Filters
+        filter_frame = Frame(parent, bg='white')
+        filter_frame.pack(fill=X, padx=20)
+        
+        self.history_type = StringVar(value='All')
+        self.history_status = StringVar(value='All')
+        self.history_from = StringVar()
+        self.history_to = StringVar()
+        self.history_file = StringVar()
+        
+        Label(filter_frame, text="Type:", font=("times new roman", 11), bg='white').pack(side=LEFT)
+        ttk.Combobox(
+            filter_frame, textvariable=self.history_type, values=('All', 'purchase', 'sales'),
+            state='readonly', width=9
+        ).pack(side=LEFT, padx=5)
+        
+        Label(filter_frame, text="From (Y-M-D):", font=("times new roman", 11), bg='white').pack(side=LEFT)
+        Entry(filter_frame, textvariable=self.history_from, width=11).pack(side=LEFT, padx=5)
+        Label(filter_frame, text="To:", font=("times new roman", 11), bg='white').pack(side=LEFT)
+        Entry(filter_frame, textvariable=self.history_to, width=11).pack(side=LEFT, padx=5)
+        
+        Label(filter_frame, text="Status:", font=("times new roman", 11), bg='white').pack(side=LEFT)
+        self.history_status_combo = ttk.Combobox(
+            filter_frame, textvariable=self.history_status, values=('All',), state='readonly', width=11
+        )
+        self.history_status_combo.pack(side=LEFT, padx=5)
+        
+        Label(filter_frame, text="File:", font=("times new roman", 11), bg='white').pack(side=LEFT)
+        Entry(filter_frame, textvariable=self.history_file, width=18).pack(side=LEFT, padx=5)
+        
+        Button(
+            filter_frame,
+            text="🔍 Search",
+            command=self.load_receipt_history,
+            font=("times new roman", 10, "bold"),
+            bg="#009688",
+            fg="white",
+            cursor="hand2",
+            padx=10
+        ).pack(side=LEFT, padx=5)
+        
+        self.history_summary = Label(
+            parent,
+            text="",
+            font=("times new roman", 11),
+            bg='white'
+        )
+        self.history_summary.pack(pady=5)
+        
         # History table
         table_frame = Frame(parent, bg='white')
         table_frame.pack(fill=BOTH, expand=True, padx=20, pady=10)
         
+        scrollbar = Scrollbar(table_frame)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        
         # Create treeview for history
-        columns = ('Receipt ID', 'Type', 'Date', 'Items', 'Amount', 'Status')
-        self.history_tree = ttk.Treeview(table_frame, columns=columns, height=15, show='headings')
+        columns = ('Receipt ID', 'Type', 'Date', 'File', 'Items', 'Amount', 'Status')
+        self.history_tree = ttk.Treeview(
+            table_frame, columns=columns, height=15, show='headings',
+            yscrollcommand=lambda first, last: self.on_history_scroll(scrollbar, first, last)
+        )
         
         # Define column headings and widths
-        widths = [100, 80, 150, 60, 100, 100]
+        widths = [100, 80, 150, 220, 60, 100, 100]
         for i, col in enumerate(columns):
             self.history_tree.column(col, width=widths[i])
             self.history_tree.heading(col, text=col)
         
         self.history_tree.pack(fill=BOTH, expand=True)
+        scrollbar.config(command=self.history_tree.yview)
+        
+        # Refresh / load more buttons
+        button_frame = Frame(parent, bg='white')
+        button_frame.pack(pady=10)
         
-        # Refresh button
         refresh_btn = Button(
-            parent,
+            button_frame,
             text="🔄 Refresh",
             command=self.load_receipt_history,
             font=("times new roman", 10, "bold"),
@@ -296,11 +382,71 @@ class ReceiptProcessingUI:
             padx=20,
             pady=8
         )
-        refresh_btn.pack(pady=10)
+        refresh_btn.pack(side=LEFT, padx=5)
+        
+        self.history_more_btn = Button(
+            button_frame,
+            text="⬇ Load More",
+            command=self.load_more_history,
+            font=("times new roman", 10, "bold"),
+            bg="#607d8b",
+            fg="white",
+            cursor="hand2",
+            padx=20,
+            pady=8
+        )
+        self.history_more_btn.pack(side=LEFT, padx=5)
         
         # Load initial history
+        self.history_filters = {}
+        self.history_next = None
+        self.history_loaded = 0
+        self.history_page_amount = 0.0
+        self.history_aggregates = None
+        self.history_pending = False
         self.load_receipt_history()
     
+    def create_jobs_tab(self, parent):
+        """Create background jobs tab"""
+        jobs_label = Label(
+            parent,
+            text="Queued Receipt Jobs",
+            font=("times new roman", 14, "bold"),
+            bg='white'
+        )
+        jobs_label.pack(pady=10)
+        
+        self.jobs_summary = Label(
+            parent,
+            text="Queued: 0 | Running: 0 | Done: 0 | Failed: 0",
+            font=("times new roman", 11),
+            bg='white'
+        )
+        self.jobs_summary.pack(pady=5)
+        
+        # Jobs table
+        table_frame = Frame(parent, bg='white')
+        table_frame.pack(fill=BOTH, expand=True, padx=20, pady=10)
+        
+        scrollbar = Scrollbar(table_frame)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        
+        columns = ('Job ID', 'File', 'Status', 'Attempts', 'Receipt ID', 'Message')
+        self.jobs_tree = ttk.Treeview(table_frame, columns=columns, height=15, show='headings', yscrollcommand=scrollbar.set)
+        
+        widths = [70, 220, 80, 70, 80, 400]
+        for i, col in enumerate(columns):
+            self.jobs_tree.column(col, width=widths[i])
+            self.jobs_tree.heading(col, text=col)
+        
+        self.jobs_tree.pack(fill=BOTH, expand=True)
+        scrollbar.config(command=self.jobs_tree.yview)
+        
+        # Poll job status while the window is open
+        self.jobs_snapshot = None
+        self.jobs_after_id = None
+        self.poll_jobs()
+    
     def select_file(self):
         """Open file dialog to select receipt"""
         file_types = [
@@ -319,6 +465,71 @@ class ReceiptProcessingUI:
             file_name = os.path.basename(file_path)
             self.file_label.config(text=f"✓ Selected: {file_name}", fg='green')
     
+    def queue_receipts(self):
+        """Queue one or more receipt files for background processing"""
+        file_types = [
+            ("Image files", "*.png *.jpg *.jpeg *.bmp"),
+            ("PDF files", "*.pdf"),
+            ("All files", "*.*")
+        ]
+        
+        file_paths = filedialog.askopenfilenames(
+            title="Select Receipt Files",
+            filetypes=file_types
+        )
+        
+        if file_paths:
+            job_ids = self.job_pool.queue.enqueue_many(list(file_paths))
+            messagebox.showinfo(
+                "Queued",
+                f"{len(job_ids)} receipt(s) queued for processing.\n"
+                f"You can keep working - progress is shown in the Queued Jobs tab."
+            )
+            self.poll_jobs(reschedule=False)
+    
+    def poll_jobs(self, reschedule=True):
+        """Refresh job status table and summary, redrawing only when something changed"""
+        try:
+            counts = self.job_pool.queue.status_counts()
+            jobs = self.job_pool.queue.list_jobs(limit=100)
+        except Exception as e:
+            print(f"Error polling receipt jobs: {str(e)}")
+            counts, jobs = None, None
+        
+        snapshot = (counts, jobs)
+        if jobs is not None and snapshot != self.jobs_snapshot:
+            self.jobs_snapshot = snapshot
+            self.jobs_summary.config(
+                text=f"Queued: {counts['queued']} | Running: {counts['running']} | "
+                     f"Done: {counts['done']} | Failed: {counts['failed']}"
+            )
+            self.jobs_tree.delete(*self.jobs_tree.get_children())
+            for job in jobs:
+                self.jobs_tree.insert(
+                    '',
+                    'end',
+                    values=(
+                        job['job_id'],
+                        os.path.basename(job['file_path']),
+                        job['status'].upper(),
+                        f"{job['attempts']}/{job['max_attempts']}",
+                        job['receipt_id'] or '',
+                        job['message'] or ''
+                    )
+                )
+            if counts['done']:
+                self.load_receipt_history()
+        
+        if reschedule:
+            self.jobs_after_id = self.root.after(1000, self.poll_jobs)
+    
+    def on_destroy(self, event):
+        """Stop background workers when the window closes - unfinished jobs stay queued"""
+        if event.widget is self.root:
+            if self.jobs_after_id:
+                self.root.after_cancel(self.jobs_after_id)
+            self.job_pool.stop(wait=False)
+    
     def add_manual_item(self):
         """Add item to manual list"""
         name = self.entry_name.get().strip()
@@ -485,29 +696,84 @@ class ReceiptProcessingUI:
         self.results_text.insert(END, "=" * 50 + "\n")
     
     def load_receipt_history(self):
-        """Load and display recent receipt history"""
+        """Apply the history filters and load the first page"""
+        self.history_filters = {
+            'receipt_type': None if self.history_type.get() == 'All' else self.history_type.get(),
+            'date_from': self.history_from.get().strip() or None,
+            'date_to': self.history_to.get().strip() or None,
+            'status': None if self.history_status.get() == 'All' else self.history_status.get(),
+            'file_name': self.history_file.get().strip() or None
+        }
+        self.history_status_combo.config(values=['All'] + self.handler.get_receipt_statuses())
+        
         # Clear existing items
         for item in self.history_tree.get_children():
             self.history_tree.delete(item)
+        self.history_next = None
+        self.history_loaded = 0
+        self.history_page_amount = 0.0
+        self.history_aggregates = None
         
-        # Fetch recent receipts
-        receipts = self.handler.get_receipt_history(limit=15)
+        self.load_more_history(first_page=True)
+    
+    def load_more_history(self, first_page=False):
+        """Append the next page of receipt history"""
+        self.history_pending = False
+        if not first_page and self.history_next is None:
+            return
+        
+        page = self.handler.get_receipt_page(
+            after=None if first_page else self.history_next,
+            page_size=HISTORY_PAGE_SIZE,
+            **self.history_filters
+        )
+        if page['aggregates'] is not None:
+            self.history_aggregates = page['aggregates']
+        self.history_next = page['next_after']
+        self.history_loaded += page['page_totals']['count']
+        self.history_page_amount += page['page_totals']['amount']
         
         # Populate table
-        for receipt in receipts:
+        for receipt in page['rows']:
             # receipt format: (receipt_id, receipt_type, upload_date, file_name, total_items, total_amount, status, notes)
             self.history_tree.insert(
                 '',
                 'end',
                 values=(
                     receipt[0],  # Receipt ID
-                    receipt[1].upper(),  # Type
+                    (receipt[1] or '').upper(),  # Type
                     receipt[2],  # Date
+                    receipt[3],  # File
                     receipt[4],  # Items
-                    f"₹{receipt[5]:.2f}",  # Amount
+                    f"₹{receipt[5] or 0:.2f}",  # Amount
                     receipt[6]  # Status
                 )
             )
+        
+        self.history_more_btn.config(state=NORMAL if self.history_next else DISABLED)
+        self.update_history_summary()
+    
+    def update_history_summary(self):
+        """Show loaded rows and totals for all receipts matching the filters"""
+        aggregates = self.history_aggregates or {'count': 0, 'amount': 0.0, 'by_type': {}}
+        by_type = " | ".join(
+            f"{receipt_type.capitalize()}: {values['count']} (₹{values['amount']:.2f})"
+            for receipt_type, values in sorted(aggregates['by_type'].items(), key=lambda item: str(item[0]))
+        )
+        self.history_summary.config(
+            text=f"Showing {self.history_loaded} of {aggregates['count']} receipts "
+                 f"(₹{self.history_page_amount:.2f} of ₹{aggregates['amount']:.2f})"
+                 + (f"  —  {by_type}" if by_type else "")
+        )
+    
+    def on_history_scroll(self, scrollbar, first, last):
+        """Update the scrollbar and load the next page when the end of the list is reached"""
+        scrollbar.set(first, last)
+        if (float(last) >= 1.0 and self.history_next is not None
+                and not self.history_pending and self.history_tree.get_children()):
+            # Let the current scroll finish before inserting more rows
+            self.history_pending = True
+            self.root.after_idle(self.load_more_history)
 
 
 def open_receipt_window(parent_root):
@@ -0,0 +1,154 @@
+from tkinter import*
+from tkinter import ttk,messagebox
+import sqlite3
+import time
+from create_db import ensure_db
+from sales_rollup import monthly_revenue,period_totals,top_products,category_totals
+
+MONTHS=["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
+
+class reportsClass:
+    def __init__(self,root):
+        self.root=root
+        self.root.geometry("1100x500+320+220")
+        self.root.title("")
+        self.root.config(bg="white")
+        self.root.resizable(False,False)
+        self.root.focus_force()
+        ensure_db()
+
+        #------------ variables -------------
+        self.var_year=StringVar()
+        self.year_list=[]
+        self.fetch_years()
+        #--------------- title ---------------------
+        lbl_title=Label(self.root,text="Sales Reports",font=("goudy old style",30),bg="#184a45",fg="white",bd=3,relief=RIDGE).pack(side=TOP,fill=X,padx=10,pady=20)
+
+        lbl_year=Label(self.root,text="Year",font=("times new roman",15),bg="white").place(x=10,y=95)
+        cmb_year=ttk.Combobox(self.root,textvariable=self.var_year,values=self.year_list,state='readonly',justify=CENTER,font=("times new roman",15))
+        cmb_year.place(x=70,y=95,width=120)
+        cmb_year.current(0)
+        btn_show=Button(self.root,text="Show",command=self.show,font=("times new roman",15,"bold"),bg="#2196f3",fg="white",cursor="hand2").place(x=200,y=95,width=100,height=28)
+
+        self.lbl_totals=Label(self.root,text="",font=("times new roman",12),bg="white",anchor="w")
+        self.lbl_totals.place(x=310,y=95,width=360,height=28)
+
+        #------------ revenue chart -------------
+        self.chart=Canvas(self.root,bg="white",bd=2,relief=RIDGE)
+        self.chart.place(x=10,y=130,width=660,height=360)
+
+        #------------ top products -------------
+        product_frame=Frame(self.root,bd=3,relief=RIDGE)
+        product_frame.place(x=680,y=95,width=410,height=200)
+
+        scrolly=Scrollbar(product_frame,orient=VERTICAL)
+        self.ProductTable=ttk.Treeview(product_frame,columns=("name","units","revenue","bills"),yscrollcommand=scrolly.set)
+        scrolly.pack(side=RIGHT,fill=Y)
+        scrolly.config(command=self.ProductTable.yview)
+        self.ProductTable.heading("name",text="Top Products")
+        self.ProductTable.heading("units",text="Units")
+        self.ProductTable.heading("revenue",text="Net Revenue")
+        self.ProductTable.heading("bills",text="Bills")
+        self.ProductTable["show"]="headings"
+        self.ProductTable.column("name",width=150)
+        self.ProductTable.column("units",width=60)
+        self.ProductTable.column("revenue",width=110)
+        self.ProductTable.column("bills",width=60)
+        self.ProductTable.pack(fill=BOTH,expand=1)
+
+        #------------ categories -------------
+        cat_frame=Frame(self.root,bd=3,relief=RIDGE)
+        cat_frame.place(x=680,y=300,width=410,height=190)
+
+        scrolly2=Scrollbar(cat_frame,orient=VERTICAL)
+        self.CategoryTable=ttk.Treeview(cat_frame,columns=("category","units","revenue","bills"),yscrollcommand=scrolly2.set)
+        scrolly2.pack(side=RIGHT,fill=Y)
+        scrolly2.config(command=self.CategoryTable.yview)
+        self.CategoryTable.heading("category",text="Category")
+        self.CategoryTable.heading("units",text="Units")
+        self.CategoryTable.heading("revenue",text="Net Revenue")
+        self.CategoryTable.heading("bills",text="Bills")
+        self.CategoryTable["show"]="headings"
+        self.CategoryTable.column("category",width=150)
+        self.CategoryTable.column("units",width=60)
+        self.CategoryTable.column("revenue",width=110)
+        self.CategoryTable.column("bills",width=60)
+        self.CategoryTable.pack(fill=BOTH,expand=1)
+
+        self.show()
+#----------------------------------------------------------------------------------------------------
+    def fetch_years(self):
+        con=sqlite3.connect(database=r'ims.db')
+        cur=con.cursor()
+        try:
+            cur.execute("select min(substr(day,1,4)),max(substr(day,1,4)) from sales_daily")
+            first,last=cur.fetchone()
+            this_year=int(time.strftime("%Y"))
+            first=int(first) if first else this_year
+            last=max(int(last) if last else this_year,this_year)
+            self.year_list=[str(y) for y in range(last,first-1,-1)]
+        except Exception as ex:
+            self.year_list=[time.strftime("%Y")]
+            messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
+        finally:
+            con.close()
+
+    def show(self):
+        con=sqlite3.connect(database=r'ims.db')
+        try:
+            year=int(self.var_year.get())
+            start,end=f"{year}-01-01",f"{year}-12-31"
+            current=monthly_revenue(con,year)
+            previous=monthly_revenue(con,year-1)
+            totals=period_totals(con,start,end)
+            last_totals=period_totals(con,f"{year-1}-01-01",f"{year-1}-12-31")
+
+            change=""
+            if last_totals['net']:
+                change=f" ({(totals['net']-last_totals['net'])*100/last_totals['net']:+.1f}% YoY)"
+            self.lbl_totals.config(text=f"Net Rs.{totals['net']:.2f}{change} | Bills {totals['bills']}")
+
+            self.ProductTable.delete(*self.ProductTable.get_children())
+            for pid,name,units,revenue,bills in top_products(con,start,end):
+                self.ProductTable.insert('',END,values=(name,units,f"{revenue:.2f}",bills))
+
+            self.CategoryTable.delete(*self.CategoryTable.get_children())
+            for category,units,revenue,bills in category_totals(con,start,end):
+                self.CategoryTable.insert('',END,values=(category,units,f"{revenue:.2f}",bills))
+
+            self.draw_chart(year,current,previous)
+        except Exception as ex:
+            messagebox.showerror("Error",f"Error due to : {str(ex)}",parent=self.root)
+        finally:
+            con.close()
+
+    def draw_chart(self,year,current,previous):
+        self.chart.delete("all")
+        left,top,bottom,width=60,40,320,580
+        peak=max(current+previous) or 1
+        group=width/12
+
+        self.chart.create_text(left,15,text=f"Monthly Net Revenue: {year} vs {year-1}",anchor="w",font=("times new roman",13,"bold"))
+        self.chart.create_rectangle(430,8,442,20,fill="#b0bec5",outline="")
+        self.chart.create_text(446,14,text=str(year-1),anchor="w")
+        self.chart.create_rectangle(500,8,512,20,fill="#009688",outline="")
+        self.chart.create_text(516,14,text=str(year),anchor="w")
+        self.chart.create_line(left,bottom,left+width,bottom)
+
+        for step in range(5):
+            y=bottom-(bottom-top)*step/4
+            self.chart.create_line(left-4,y,left,y)
+            self.chart.create_text(left-6,y,text=f"{peak*step/4:,.0f}",anchor="e",font=("times new roman",8))
+
+        for i in range(12):
+            x=left+i*group
+            for offset,value,colour in ((0.15,previous[i],"#b0bec5"),(0.5,current[i],"#009688")):
+                height=(bottom-top)*value/peak
+                self.chart.create_rectangle(x+group*offset,bottom-height,x+group*(offset+0.35),bottom,fill=colour,outline="")
+            self.chart.create_text(x+group/2,bottom+12,text=MONTHS[i],font=("times new roman",9))
+
+
+if __name__=="__main__":
+    root=Tk()
+    obj=reportsClass(root)
+    root.mainloop()
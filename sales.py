@@ -1,8 +1,10 @@
 from tkinter import*
 from PIL import Image,ImageTk
-from tkinter import ttk,messagebox
+from tkinter import ttk,messagebox,filedialog
 import sqlite3
 import os
+import threading
+from bill_export import DEFAULT_BILL_DIR,FORMATS,EXTENSIONS,export_bills,parse_day
 
 class salesClass:
     def __init__(self,root):
@@ -15,6 +17,12 @@ class salesClass:
 
         self.blll_list=[]
         self.var_invoice=StringVar()
+        self.var_by=StringVar(value="Date")
+        self.var_from=StringVar()
+        self.var_to=StringVar()
+        self.var_format=StringVar(value=FORMATS[0])
+        self.progress=""
+        self.worker=None
         #--------------- title ---------------------
         lbl_title=Label(self.root,text="View Customer Bills",font=("goudy old style",30),bg="#184a45",fg="white",bd=3,relief=RIDGE).pack(side=TOP,fill=X,padx=10,pady=20)
         
@@ -54,7 +62,21 @@ class salesClass:
 
         lbl_image=Label(self.root,image=self.bill_photo,bd=0)
         lbl_image.place(x=700,y=110)
-        
+
+        #------------- bulk export -----------------
+        cmb_by=ttk.Combobox(self.root,textvariable=self.var_by,values=("Date","Invoice"),state='readonly',justify=CENTER,font=("times new roman",12))
+        cmb_by.place(x=700,y=420,width=80,height=28)
+        txt_from=Entry(self.root,textvariable=self.var_from,font=("times new roman",12),bg="lightyellow").place(x=785,y=420,width=140,height=28)
+        lbl_to=Label(self.root,text="to",font=("times new roman",12),bg="white").place(x=930,y=420)
+        txt_to=Entry(self.root,textvariable=self.var_to,font=("times new roman",12),bg="lightyellow").place(x=955,y=420,width=135,height=28)
+
+        cmb_format=ttk.Combobox(self.root,textvariable=self.var_format,values=FORMATS,state='readonly',justify=CENTER,font=("times new roman",12))
+        cmb_format.place(x=700,y=455,width=80,height=28)
+        self.btn_export=Button(self.root,text="Export",command=self.export,font=("times new roman",13,"bold"),bg="#4caf50",fg="white",cursor="hand2")
+        self.btn_export.place(x=785,y=455,width=100,height=28)
+        self.lbl_status=Label(self.root,text="Dates as Y-M-D, blank for all",font=("times new roman",11),bg="white",anchor="w")
+        self.lbl_status.place(x=890,y=455,width=200,height=28)
+
         self.show()
 #----------------------------------------------------------------------------------------------------
     def show(self):
@@ -91,6 +113,55 @@ class salesClass:
         self.show()
         self.bill_area.delete('1.0',END)
 
+    def export(self):
+        date_from=date_to=invoice_from=invoice_to=None
+        if self.var_by.get()=="Invoice":
+            try:
+                invoice_from=int(self.var_from.get()) if self.var_from.get()!="" else None
+                invoice_to=int(self.var_to.get()) if self.var_to.get()!="" else None
+            except ValueError:
+                messagebox.showerror("Error","Invoice no. must be a number",parent=self.root)
+                return
+        else:
+            try:
+                date_from=parse_day(self.var_from.get()) if self.var_from.get()!="" else None
+                date_to=parse_day(self.var_to.get()) if self.var_to.get()!="" else None
+            except ValueError:
+                messagebox.showerror("Error","Dates must be in YYYY-MM-DD format, e.g. 2024-01-31",parent=self.root)
+                return
+        fmt=self.var_format.get()
+        out=filedialog.asksaveasfilename(parent=self.root,defaultextension=EXTENSIONS[fmt],initialfile=f"bills{EXTENSIONS[fmt]}")
+        if not out:
+            return
+        #------- export on a worker thread so the window stays responsive --------
+        self.btn_export.config(state=DISABLED)
+        self.result=None
+        self.worker=threading.Thread(target=self.run_export,args=(out,fmt,date_from,date_to,invoice_from,invoice_to),daemon=True)
+        self.worker.start()
+        self.poll()
+
+    def run_export(self,out,fmt,date_from,date_to,invoice_from,invoice_to):
+        try:
+            self.result=export_bills(DEFAULT_BILL_DIR,out,fmt,date_from,date_to,invoice_from,invoice_to,progress=self.on_progress)
+        except Exception as ex:
+            self.result=ex
+
+    def on_progress(self,bills):
+        self.progress=f"Exporting: {bills} bills"
+
+    def poll(self):
+        if self.worker.is_alive():
+            self.lbl_status.config(text=self.progress)
+            self.root.after(200,self.poll)
+            return
+        self.btn_export.config(state=NORMAL)
+        if isinstance(self.result,Exception):
+            self.lbl_status.config(text="Export failed")
+            messagebox.showerror("Error",f"Error due to : {str(self.result)}",parent=self.root)
+        else:
+            self.lbl_status.config(text=f"Exported {self.result} bills")
+            messagebox.showinfo("Success",f"Exported {self.result} bills",parent=self.root)
+
 
 if __name__=="__main__":
     root=Tk()
@@ -0,0 +1,208 @@
+"""
+Sales Rollup Rebuild Module
+Backfills the daily sales rollups for days before they were kept, from the saved bills
+and the sales receipts (live and archived)
+"""
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from create_db import ensure_db
+from sales_rollup import DAY_FORMAT, record_sale
+from archive_logs import ARCHIVE_SCHEMA, attached_archives
+from bill_export import DEFAULT_BILL_DIR, parse_day, select_bills, read_bills
+
+ROLLUP_TABLES = ('sales_daily', 'sales_daily_product', 'sales_daily_category')
+# Item and discount rows of a bill as saved by render_text
+BILL_LINE = re.compile(r"^ (.+?)\t\t\t(\d+)\tRs\.([\d.eE+-]+)$", re.M)
+BILL_DISCOUNT = re.compile(r"^ Discount\t\t\t\tRs\.([\d.eE+-]+)$", re.M)
+# Bills added per transaction, so tills are not held up for the whole folder
+BILLS_PER_COMMIT = 1000
+
+
+def _product_index(con):
+    """
+    Product id and category by name, as bills only name their products
+
+    Names of deleted products are taken from the stock ledger (without a category).
+    """
+    index = {name: (pid, None) for name, pid in con.execute(
+        "SELECT product_name, MAX(product_id) FROM transaction_logs GROUP BY product_name"
+    )}
+    for pid, name, category in con.execute("SELECT pid, name, Category FROM product"):
+        index[name] = (pid, category)
+    return index
+
+
+def clear_rollups(con, before):
+    """Delete the rollups of days before 'before' ('YYYY-MM-DD')"""
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        for table in ROLLUP_TABLES:
+            con.execute(f"DELETE FROM {table} WHERE day<?", (before,))
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+
+def rebuild_bills(con, bill_dir, before):
+    """
+    Add the saved bills of days before 'before' to the rollups
+
+    Args:
+        con: Connection outside any transaction
+        bill_dir: Folder of saved bills
+        before: First day not rebuilt 'YYYY-MM-DD'
+
+    Returns:
+        (bills added, bill lines whose product is unknown)
+    """
+    last_day = (datetime.strptime(before, DAY_FORMAT) - timedelta(days=1)).strftime(DAY_FORMAT)
+    products = _product_index(con)
+    bills = unmatched = 0
+    cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        for _, day, text in read_bills(bill_dir, select_bills(bill_dir, date_to=last_day)):
+            if day is None:
+                continue
+            lines = BILL_LINE.findall(text)
+            bill_amount = sum(float(amount) for _, _, amount in lines)
+            match = BILL_DISCOUNT.search(text)
+            # The bill discount is allocated to lines by amount, as at checkout
+            rate = float(match.group(1)) / bill_amount if match and bill_amount else 0.0
+            rollup_lines = []
+            for name, qty, amount in lines:
+                if name not in products:
+                    unmatched += 1
+                    continue
+                pid, category = products[name]
+                rollup_lines.append((pid, name, category, int(qty), float(amount), float(amount) * rate))
+            record_sale(cur, rollup_lines, day)
+            bills += 1
+            if bills % BILLS_PER_COMMIT == 0:
+                cur.execute("COMMIT")
+                cur.execute("BEGIN IMMEDIATE")
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    return bills, unmatched
+
+
+def _add_receipts(cur, schema, before):
+    """Add the sales receipts in one schema's logs to the rollups - returns the number added"""
+    rows = cur.execute(
+        f"""SELECT l.receipt_id, substr(l.upload_date, 1, 10), i.product_id,
+        COALESCE(p.name, i.product_name), p.Category, i.quantity, i.total_price
+        FROM {schema}.receipt_logs l
+        JOIN {schema}.receipt_items i ON i.receipt_id=l.receipt_id
+        LEFT JOIN main.product p ON p.pid=i.product_id
+        WHERE l.receipt_type='sales' AND i.action='subtract' AND l.upload_date<?
+        ORDER BY l.receipt_id""",
+        (before,)
+    ).fetchall()
+    receipts = {}
+    for receipt_id, day, pid, name, category, qty, amount in rows:
+        # (product_id, product_name, category, units, revenue, discount) as the receipt handler adds them
+        receipts.setdefault(receipt_id, (day, []))[1].append((pid, name, category, qty, amount or 0.0, 0.0))
+    for day, lines in receipts.values():
+        record_sale(cur, lines, day)
+    return len(receipts)
+
+
+def rebuild_receipts(con, before):
+    """
+    Add the sales receipts of days before 'before' to the rollups, archived months first
+
+    Args:
+        con: Connection outside any transaction
+        before: First day not rebuilt 'YYYY-MM-DD'
+
+    Returns:
+        Number of receipts added
+    """
+    receipts = 0
+    for _ in attached_archives(con, "WHERE month<=?", (before[:7],), newest_first=False):
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            receipts += _add_receipts(con.cursor(), ARCHIVE_SCHEMA, before)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        receipts += _add_receipts(con.cursor(), 'main', before)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return receipts
+
+
+def rebuild(db_path='ims.db', bill_dir=DEFAULT_BILL_DIR, before=None):
+    """
+    Recompute the rollups of every day before 'before' from the saved bills and sales receipts
+
+    Days from 'before' on are left alone, so the shop can keep selling while this
+    runs. Reports show the past days partly filled until it finishes; running it
+    again simply rebuilds them once more.
+
+    Args:
+        db_path: Path to the SQLite database
+        bill_dir: Folder of saved bills
+        before: First day not rebuilt 'YYYY-MM-DD' (default: today)
+
+    Returns:
+        Dict with bills, receipts, unmatched (bill lines of unknown products) and seconds
+    """
+    start = time.perf_counter()
+    before = parse_day(before) if before else datetime.now().strftime(DAY_FORMAT)
+    # Checked before anything is cleared
+    if not os.path.isdir(bill_dir):
+        raise FileNotFoundError(f"Bill folder not found: {bill_dir}")
+    ensure_db(db_path)
+    con = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        clear_rollups(con, before)
+        bills, unmatched = rebuild_bills(con, bill_dir, before)
+        receipts = rebuild_receipts(con, before)
+    finally:
+        con.close()
+    return {
+        'bills': bills,
+        'receipts': receipts,
+        'unmatched': unmatched,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollups from saved bills and sales receipts")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    parser.add_argument('--bill-dir', default=DEFAULT_BILL_DIR, help="Folder of saved bills")
+    parser.add_argument('--before', help="First day not rebuilt YYYY-MM-DD (default: today)")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = rebuild(args.db, args.bill_dir, args.before)
+    except (ValueError, OSError) as ex:
+        print(f"Error: {str(ex)}")
+        return 1
+    print(
+        f"Rebuilt rollups from {stats['bills']} bill(s) and {stats['receipts']} sales receipt(s) "
+        f"in {stats['seconds']:.1f}s"
+    )
+    if stats['unmatched']:
+        print(f"{stats['unmatched']} bill line(s) name no known product and were left out")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
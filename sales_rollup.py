@@ -0,0 +1,150 @@
+"""
+Sales Rollup Module
+Daily revenue rollups by product and category, kept current inside each sale's transaction
+"""
+
+from datetime import datetime
+
+DAY_FORMAT = '%Y-%m-%d'
+
+
+def record_sale(cur, lines, day=None):
+    """
+    Add one bill or sales receipt to the daily rollups
+
+    Must be called with the cursor of the transaction that changes stock,
+    so rollups commit (or roll back) together with the sale.
+
+    Args:
+        cur: Cursor inside the sale's open transaction
+        lines: List of (product_id, product_name, category, units, revenue, discount)
+        day: 'YYYY-MM-DD' (default: today)
+    """
+    if not lines:
+        return
+    day = day or datetime.now().strftime(DAY_FORMAT)
+
+    # One bill counts once per product, once per category and once per day
+    products = {}
+    categories = {}
+    for product_id, product_name, category, units, revenue, discount in lines:
+        row = products.setdefault(product_id, [product_name, 0, 0.0, 0.0])
+        row[1] += units
+        row[2] += revenue
+        row[3] += discount
+        row = categories.setdefault(category or 'Uncategorized', [0, 0.0, 0.0])
+        row[0] += units
+        row[1] += revenue
+        row[2] += discount
+
+    cur.executemany(
+        """INSERT INTO sales_daily_product (day, product_id, product_name, revenue, units, discount, bill_count)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+        ON CONFLICT(day, product_id) DO UPDATE SET
+            product_name=excluded.product_name,
+            revenue=revenue+excluded.revenue,
+            units=units+excluded.units,
+            discount=discount+excluded.discount,
+            bill_count=bill_count+1""",
+        [(day, pid, name, revenue, units, discount) for pid, (name, units, revenue, discount) in products.items()]
+    )
+    cur.executemany(
+        """INSERT INTO sales_daily_category (day, category, revenue, units, discount, bill_count)
+        VALUES (?, ?, ?, ?, ?, 1)
+        ON CONFLICT(day, category) DO UPDATE SET
+            revenue=revenue+excluded.revenue,
+            units=units+excluded.units,
+            discount=discount+excluded.discount,
+            bill_count=bill_count+1""",
+        [(day, category, revenue, units, discount) for category, (units, revenue, discount) in categories.items()]
+    )
+    cur.execute(
+        """INSERT INTO sales_daily (day, revenue, units, discount, bill_count)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT(day) DO UPDATE SET
+            revenue=revenue+excluded.revenue,
+            units=units+excluded.units,
+            discount=discount+excluded.discount,
+            bill_count=bill_count+1""",
+        (
+            day,
+            sum(row[2] for row in products.values()),
+            sum(row[1] for row in products.values()),
+            sum(row[3] for row in products.values())
+        )
+    )
+
+
+def monthly_revenue(con, year):
+    """
+    Net revenue per month of a year
+
+    Args:
+        con: Open connection
+        year: Year as int
+
+    Returns:
+        List of 12 floats (January..December)
+    """
+    months = [0.0] * 12
+    cur = con.execute(
+        """SELECT CAST(substr(day, 6, 2) AS INTEGER), SUM(revenue - discount)
+        FROM sales_daily WHERE day BETWEEN ? AND ?
+        GROUP BY substr(day, 1, 7)""",
+        (f"{year}-01-01", f"{year}-12-31")
+    )
+    for month, revenue in cur:
+        months[month - 1] = revenue or 0.0
+    return months
+
+
+def period_totals(con, start, end):
+    """
+    Totals for a date range
+
+    Returns:
+        Dict with revenue, discount, net, units and bills
+    """
+    row = con.execute(
+        """SELECT COALESCE(SUM(revenue), 0), COALESCE(SUM(discount), 0),
+        COALESCE(SUM(units), 0), COALESCE(SUM(bill_count), 0)
+        FROM sales_daily WHERE day BETWEEN ? AND ?""",
+        (start, end)
+    ).fetchone()
+    return {
+        'revenue': row[0],
+        'discount': row[1],
+        'net': row[0] - row[1],
+        'units': row[2],
+        'bills': row[3]
+    }
+
+
+def top_products(con, start, end, limit=20):
+    """
+    Best selling products for a date range
+
+    Returns:
+        List of (product_id, product_name, units, net_revenue, bill_count)
+    """
+    return con.execute(
+        """SELECT product_id, MAX(product_name), SUM(units), SUM(revenue - discount), SUM(bill_count)
+        FROM sales_daily_product WHERE day BETWEEN ? AND ?
+        GROUP BY product_id ORDER BY 4 DESC LIMIT ?""",
+        (start, end, limit)
+    ).fetchall()
+
+
+def category_totals(con, start, end):
+    """
+    Revenue per category for a date range
+
+    Returns:
+        List of (category, units, net_revenue, bill_count)
+    """
+    return con.execute(
+        """SELECT category, SUM(units), SUM(revenue - discount), SUM(bill_count)
+        FROM sales_daily_category WHERE day BETWEEN ? AND ?
+        GROUP BY category ORDER BY 3 DESC""",
+        (start, end)
+    ).fetchall()
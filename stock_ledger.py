@@ -0,0 +1,302 @@
+"""
+Stock Ledger Module
+Every stock movement is a transaction_logs row; periodic per-product checkpoints in
+stock_checkpoints make any historical quantity one lookup plus a short replay
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from create_db import ensure_db
+from archive_logs import ARCHIVE_SCHEMA, attached_archives
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Signed change of one ledger row: 'add' and 'subtract' store a positive quantity,
+# 'adjust' (manual edits) stores new_qty - old_qty
+DELTA_SQL = "CASE action WHEN 'subtract' THEN -quantity ELSE quantity END"
+
+
+def record_movement(cur, product_id, product_name, action, quantity, old_qty, new_qty, receipt_id=None):
+    """
+    Write one movement to the ledger
+
+    Must use the cursor of the transaction that changes product.qty, so the
+    ledger can never disagree with the stock.
+
+    Args:
+        cur: Cursor inside the stock change's transaction
+        product_id: ID of the product
+        product_name: Name of the product
+        action: 'add', 'subtract' or 'adjust'
+        quantity: Units moved (signed for 'adjust')
+        old_qty: Quantity before the movement
+        new_qty: Quantity after the movement
+        receipt_id: Receipt that caused the movement, if any
+
+    Returns:
+        txn_id of the ledger row
+    """
+    cur.execute(
+        """INSERT INTO transaction_logs
+        (receipt_id, product_id, product_name, quantity, action, old_qty, new_qty, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (receipt_id, product_id, product_name, quantity, action, old_qty, new_qty,
+         datetime.now().strftime(TIME_FORMAT))
+    )
+    return cur.lastrowid
+
+
+def start_tracking(cur, product_id, product_name, qty):
+    """
+    Record a new product's opening stock and its first checkpoint
+
+    Args:
+        cur: Cursor inside the transaction that inserted the product
+        product_id: ID of the new product
+        product_name: Name of the product
+        qty: Opening quantity
+    """
+    txn_id = record_movement(cur, product_id, product_name, 'adjust', qty, 0, qty)
+    cur.execute(
+        "INSERT OR IGNORE INTO stock_checkpoints (product_id, txn_id, timestamp, qty) VALUES (?, ?, ?, ?)",
+        (product_id, txn_id, datetime.now().strftime(TIME_FORMAT), qty)
+    )
+
+
+def checkpoint(db_path='ims.db', min_movements=1):
+    """
+    Write a checkpoint for every product with movements since its last checkpoint
+
+    Products without any checkpoint get one at their current quantity - their
+    history starts there. Run this periodically (e.g. nightly) to keep replays short.
+
+    Args:
+        db_path: Path to the SQLite database
+        min_movements: Skip products with fewer new movements than this
+
+    Returns:
+        Dict with 'started' (new baselines) and 'checkpoints' (products checkpointed)
+    """
+    ensure_db(db_path)
+    now = datetime.now().strftime(TIME_FORMAT)
+    con = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        # The write lock keeps product.qty and the newest txn_id consistent for baselines
+        con.execute("BEGIN IMMEDIATE")
+        started = con.execute(
+            """INSERT INTO stock_checkpoints (product_id, txn_id, timestamp, qty)
+            SELECT p.pid, (SELECT COALESCE(MAX(txn_id), 0) FROM transaction_logs), ?, CAST(p.qty AS INTEGER)
+            FROM product p
+            WHERE NOT EXISTS (SELECT 1 FROM stock_checkpoints c WHERE c.product_id=p.pid)""",
+            (now,)
+        ).rowcount
+        checkpoints = con.execute(
+            """INSERT INTO stock_checkpoints (product_id, txn_id, timestamp, qty)
+            SELECT c.product_id, MAX(t.txn_id), MAX(t.timestamp), c.qty + SUM(CASE t.action WHEN 'subtract' THEN -t.quantity ELSE t.quantity END)
+            FROM (SELECT product_id, MAX(txn_id) AS txn_id FROM stock_checkpoints GROUP BY product_id) last
+            JOIN stock_checkpoints c ON c.product_id=last.product_id AND c.txn_id=last.txn_id
+            JOIN transaction_logs t ON t.product_id=c.product_id AND t.txn_id>c.txn_id
+            GROUP BY c.product_id
+            HAVING COUNT(*)>=?""",
+            (min_movements,)
+        ).rowcount
+        con.execute("COMMIT")
+        return {'started': started, 'checkpoints': checkpoints}
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+
+
+def quantity_at(con, product_id, when):
+    """
+    Quantity of a product at a point in time
+
+    Archiving checkpoints every product at the last archived movement, so only
+    times before that attach the monthly archives holding the movements.
+
+    Args:
+        con: Open connection
+        product_id: ID of the product
+        when: datetime or 'YYYY-MM-DD HH:MM:SS' string
+
+    Returns:
+        Quantity as int, or None if the product was not tracked yet at that time
+    """
+    if isinstance(when, datetime):
+        when = when.strftime(TIME_FORMAT)
+
+    row = con.execute(
+        """SELECT txn_id, qty FROM stock_checkpoints
+        WHERE product_id=? AND timestamp<=?
+        ORDER BY txn_id DESC LIMIT 1""",
+        (product_id, when)
+    ).fetchone()
+    if not row:
+        return None
+
+    txn_id, qty = row
+    delta_sql = f"""SELECT COALESCE(SUM({DELTA_SQL}), 0) FROM {{}}.transaction_logs
+        WHERE product_id=? AND txn_id>? AND timestamp<=?"""
+    delta = con.execute(delta_sql.format('main'), (product_id, txn_id, when)).fetchone()[0]
+    for month in attached_archives(con, "WHERE last_txn_id>? AND month<=substr(?, 1, 7)", (txn_id, when)):
+        delta += con.execute(delta_sql.format(ARCHIVE_SCHEMA), (product_id, txn_id, when)).fetchone()[0]
+    return qty + delta
+
+
+def replay_quantity(con, product_id, when):
+    """
+    Quantity at a point in time by replaying the whole ledger from the first checkpoint
+    (slow reference used by the benchmark)
+    """
+    if isinstance(when, datetime):
+        when = when.strftime(TIME_FORMAT)
+    row = con.execute(
+        "SELECT txn_id, timestamp, qty FROM stock_checkpoints WHERE product_id=? ORDER BY txn_id LIMIT 1",
+        (product_id,)
+    ).fetchone()
+    if not row or row[1] > when:
+        return None
+    qty = row[2]
+    for action, quantity in con.execute(
+        "SELECT action, quantity FROM transaction_logs WHERE product_id=? AND txn_id>? AND timestamp<=? ORDER BY txn_id",
+        (product_id, row[0], when)
+    ):
+        qty += -quantity if action == 'subtract' else quantity
+    return qty
+
+
+def benchmark(db_path, products=10000, movements=2000000, days=365, checkpoint_every=30, queries=1000):
+    """
+    Build a synthetic ledger and time point-in-time lookups
+
+    Args:
+        db_path: New database file to create
+        products: Number of products
+        movements: Number of ledger rows
+        days: Days of history the movements are spread over
+        checkpoint_every: Days between checkpoint runs
+        queries: Number of random quantity_at lookups
+
+    Returns:
+        Dict of timings and counts
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists - the benchmark needs a new database file")
+    ensure_db(db_path)
+    stats = {'products': products, 'movements': movements}
+    start_day = datetime.now() - timedelta(days=days)
+    step = days * 86400 / movements
+    rng = random.Random(42)
+
+    con = sqlite3.connect(db_path)
+    con.executemany(
+        "INSERT INTO product (pid, Category, Supplier, name, price, qty, status) VALUES (?, 'Bench', 'Bench', ?, '1', '0', 'Active')",
+        ((pid, f"Product {pid}") for pid in range(1, products + 1))
+    )
+    con.executemany(
+        "INSERT INTO stock_checkpoints (product_id, txn_id, timestamp, qty) VALUES (?, 0, ?, 0)",
+        ((pid, start_day.strftime(TIME_FORMAT)) for pid in range(1, products + 1))
+    )
+    con.commit()
+
+    began = time.perf_counter()
+    checkpoint_seconds = 0.0
+    per_run = int(movements * checkpoint_every / days) or movements
+    written = 0
+    while written < movements:
+        batch = min(per_run, movements - written)
+        rows = []
+        for i in range(written, written + batch):
+            action = 'add' if rng.random() < 0.3 else 'subtract'
+            rows.append((
+                rng.randint(1, products), action, rng.randint(1, 10),
+                (start_day + timedelta(seconds=i * step)).strftime(TIME_FORMAT)
+            ))
+        con.executemany(
+            "INSERT INTO transaction_logs (product_id, action, quantity, timestamp) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        con.commit()
+        written += batch
+
+        cp_start = time.perf_counter()
+        checkpoint(db_path)
+        checkpoint_seconds += time.perf_counter() - cp_start
+    stats['load_seconds'] = time.perf_counter() - began - checkpoint_seconds
+    stats['checkpoint_seconds'] = checkpoint_seconds
+    stats['checkpoints'] = con.execute("SELECT COUNT(*) FROM stock_checkpoints").fetchone()[0]
+
+    lookups = [
+        (rng.randint(1, products), start_day + timedelta(seconds=rng.uniform(0, days * 86400)))
+        for _ in range(queries)
+    ]
+    timings = []
+    results = []
+    for pid, when in lookups:
+        t = time.perf_counter()
+        results.append(quantity_at(con, pid, when))
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+    stats['lookup_avg_ms'] = sum(timings) / len(timings) * 1000
+    stats['lookup_p99_ms'] = timings[int(len(timings) * 0.99) - 1] * 1000
+
+    # Check a sample against a full replay
+    sample = lookups[:min(50, queries)]
+    t = time.perf_counter()
+    mismatches = sum(1 for (pid, when), qty in zip(sample, results) if replay_quantity(con, pid, when) != qty)
+    stats['replay_avg_ms'] = (time.perf_counter() - t) / len(sample) * 1000
+    stats['mismatches'] = mismatches
+    con.close()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stock ledger checkpoints and point-in-time quantities")
+    parser.add_argument('--db', default='ims.db', help="Path to the SQLite database")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    cp_parser = sub.add_parser('checkpoint', help="Checkpoint products with new movements")
+    cp_parser.add_argument('--min-movements', type=int, default=1)
+
+    at_parser = sub.add_parser('at', help="Quantity of a product at a date/time")
+    at_parser.add_argument('product_id', type=int)
+    at_parser.add_argument('when', help="'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'")
+
+    bench_parser = sub.add_parser('benchmark', help="Time lookups on a synthetic ledger in a new database")
+    bench_parser.add_argument('--bench-db', default='ledger_benchmark.db', help="New database file to create")
+    bench_parser.add_argument('--products', type=int, default=10000)
+    bench_parser.add_argument('--movements', type=int, default=2000000)
+    bench_parser.add_argument('--days', type=int, default=365)
+    bench_parser.add_argument('--checkpoint-every', type=int, default=30, help="Days between checkpoint runs")
+    bench_parser.add_argument('--queries', type=int, default=1000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'checkpoint':
+        stats = checkpoint(args.db, args.min_movements)
+        print(f"Checkpointed {stats['checkpoints']} product(s), started tracking {stats['started']} product(s)")
+    elif args.command == 'at':
+        when = args.when if len(args.when) > 10 else f"{args.when} 23:59:59"
+        ensure_db(args.db)
+        con = sqlite3.connect(args.db)
+        try:
+            qty = quantity_at(con, args.product_id, when)
+        finally:
+            con.close()
+        print("Not tracked at that time" if qty is None else qty)
+    else:
+        stats = benchmark(args.bench_db, args.products, args.movements, args.days, args.checkpoint_every, args.queries)
+        for key, value in stats.items():
+            print(f"{key:20} {value:.3f}" if isinstance(value, float) else f"{key:20} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Stress Test Module
+Runs simulated tills and receipt workers as separate processes against one database,
+then reports throughput, lock waits and errors and checks that no stock movement was lost
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import multiprocessing
+from checkout import checkout_cart
+from create_db import ensure_db
+from receipt_handler import ReceiptHandler
+from receipt_processor import ReceiptItem
+from stock_ledger import DELTA_SQL
+
+# Statements slower than this while taking the write lock count as a lock wait
+LOCK_WAIT_THRESHOLD = 0.001
+
+_lock_waits = []
+
+
+class _LockTimingCursor(sqlite3.Cursor):
+    """Cursor that times BEGIN statements - the point where a writer waits for the lock"""
+
+    def execute(self, sql, parameters=()):
+        if sql.lstrip()[:5].upper() != 'BEGIN':
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _lock_waits.append(time.perf_counter() - start)
+
+
+class _LockTimingConnection(sqlite3.Connection):
+    def cursor(self, factory=_LockTimingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+
+def _time_lock_waits():
+    """Make every connection opened in this worker process time its BEGIN statements"""
+    connect = sqlite3.connect
+
+    def timed_connect(*args, **kwargs):
+        kwargs.setdefault('factory', _LockTimingConnection)
+        return connect(*args, **kwargs)
+
+    sqlite3.connect = timed_connect
+
+
+def _product_name(pid):
+    # Fixed width, so the receipt handler's LIKE lookup matches exactly one product
+    return f"Stress Product {pid:06d}"
+
+
+def setup_database(db_path, products=200, initial_qty=500):
+    """
+    Create a new database with products to fight over
+
+    Returns:
+        Dict of product id -> initial quantity
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists - the stress test needs a new database file")
+    ensure_db(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        con.executemany(
+            "INSERT INTO product (pid, Category, Supplier, name, price, qty, status) VALUES (?, 'Stress', 'Stress', ?, '10', ?, 'Active')",
+            ((pid, _product_name(pid), str(initial_qty)) for pid in range(1, products + 1))
+        )
+        con.commit()
+    finally:
+        con.close()
+    return {pid: initial_qty for pid in range(1, products + 1)}
+
+
+def _new_stats(role):
+    return {
+        'role': role, 'ok': 0, 'rejected': 0, 'locked': 0, 'errors': 0,
+        'latencies': [], 'lock_waits': [], 'net': {}
+    }
+
+
+def _count_error(stats, message):
+    if 'database is locked' in message:
+        stats['locked'] += 1
+    else:
+        stats['errors'] += 1
+
+
+def run_till(db_path, seed, duration, products, think_ms, start_event, results):
+    """
+    One till: read a cart with stock snapshots like billClass does, wait, then check out
+
+    The wait between reading the stock and checking out gives other processes
+    time to sell the same products, which is exactly the stale snapshot case.
+    """
+    _time_lock_waits()
+    rng = random.Random(seed)
+    stats = _new_stats('till')
+    start_event.wait()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pids = rng.sample(range(1, products + 1), rng.randint(1, 4))
+        con = sqlite3.connect(db_path, timeout=30)
+        try:
+            rows = con.execute(
+                f"SELECT pid, name, price, CAST(qty AS INTEGER) FROM product WHERE pid IN ({','.join('?' * len(pids))})",
+                pids
+            ).fetchall()
+        except sqlite3.OperationalError as ex:
+            _count_error(stats, str(ex))
+            continue
+        finally:
+            con.close()
+        # Cart rows [pid, name, price, qty, stock] - the window never adds more than is in stock
+        cart = [
+            [str(pid), name, price, str(min(rng.randint(1, 3), stock)), str(stock)]
+            for pid, name, price, stock in rows if stock > 0
+        ]
+        if not cart:
+            continue
+        time.sleep(rng.uniform(0, think_ms) / 1000)
+
+        start = time.perf_counter()
+        try:
+            checkout_cart(cart, db_path)
+            stats['ok'] += 1
+            for row in cart:
+                stats['net'][int(row[0])] = stats['net'].get(int(row[0]), 0) - int(row[3])
+        except ValueError:
+            stats['rejected'] += 1
+        except sqlite3.OperationalError as ex:
+            _count_error(stats, str(ex))
+        stats['latencies'].append(time.perf_counter() - start)
+
+    stats['lock_waits'] = _lock_waits
+    results.put(stats)
+
+
+def run_receipt_worker(db_path, seed, duration, products, think_ms, start_event, results):
+    """
+    One receipt worker: purchase and sales receipts through process_receipt_workflow,
+    mixed with single-product update_product_quantity calls
+    """
+    _time_lock_waits()
+    rng = random.Random(seed)
+    stats = _new_stats('receipt')
+    handler = ReceiptHandler(db_path)
+    pid_by_name = {_product_name(pid): pid for pid in range(1, products + 1)}
+    start_event.wait()
+    end = time.perf_counter() + duration
+    count = 0
+    while time.perf_counter() < end:
+        count += 1
+        action = 'add' if rng.random() < 0.5 else 'subtract'
+        time.sleep(rng.uniform(0, think_ms) / 1000)
+        start = time.perf_counter()
+
+        if rng.random() < 0.2:
+            pid = rng.randint(1, products)
+            qty = rng.randint(1, 5)
+            success, old_qty, new_qty, message = handler.update_product_quantity(pid, qty, action)
+            if success:
+                stats['ok'] += 1
+                stats['net'][pid] = stats['net'].get(pid, 0) + new_qty - old_qty
+            elif message.startswith('Insufficient stock'):
+                stats['rejected'] += 1
+            else:
+                _count_error(stats, message)
+        else:
+            items = [
+                ReceiptItem(_product_name(pid), rng.randint(1, 5), 10.0)
+                for pid in rng.sample(range(1, products + 1), rng.randint(1, 6))
+            ]
+            result = handler.process_receipt_workflow(
+                f"stress-{seed}-{count}.jpg", manual_items=items,
+                receipt_type_override='purchase' if action == 'add' else 'sales'
+            )
+            if result['success']:
+                stats['ok'] += 1
+                stats['rejected'] += len(result['failed_items'])
+                for item in result['processed_items']:
+                    pid = pid_by_name[item['name']]
+                    stats['net'][pid] = stats['net'].get(pid, 0) + item['new_qty'] - item['old_qty']
+            else:
+                _count_error(stats, result['message'])
+        stats['latencies'].append(time.perf_counter() - start)
+
+    stats['lock_waits'] = _lock_waits
+    results.put(stats)
+
+
+def check_stock(db_path, initial, net):
+    """
+    Compare final stock with initial stock plus the workers' and the ledger's movements
+
+    Returns:
+        Dict with products, worker_mismatches, ledger_mismatches and negative
+    """
+    con = sqlite3.connect(db_path)
+    try:
+        final = dict(con.execute("SELECT pid, CAST(qty AS INTEGER) FROM product"))
+        ledger = dict(con.execute(
+            f"SELECT product_id, SUM({DELTA_SQL}) FROM transaction_logs GROUP BY product_id"
+        ))
+    finally:
+        con.close()
+    return {
+        'products': len(initial),
+        'worker_mismatches': sum(1 for pid, qty in initial.items() if final.get(pid) != qty + net.get(pid, 0)),
+        'ledger_mismatches': sum(1 for pid, qty in initial.items() if final.get(pid) != qty + ledger.get(pid, 0)),
+        'negative': sum(1 for qty in final.values() if qty < 0)
+    }
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def stress_test(db_path, tills=4, receipt_workers=2, duration=30, products=200, initial_qty=500, think_ms=20, seed=1):
+    """
+    Run tills and receipt workers as processes against a new database
+
+    Args:
+        db_path: New database file to create
+        tills: Number of till processes (checkout_cart)
+        receipt_workers: Number of receipt worker processes (ReceiptHandler)
+        duration: Seconds every process keeps working
+        products: Number of products
+        initial_qty: Starting stock of every product
+        think_ms: Maximum random pause before each operation
+        seed: Random seed - each process uses seed + its number
+
+    Returns:
+        Dict with per-role counts, throughput, latency, lock waits and the stock check
+    """
+    initial = setup_database(db_path, products, initial_qty)
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=run_till if n < tills else run_receipt_worker,
+            args=(db_path, seed + n, duration, products, think_ms, start_event, results)
+        )
+        for n in range(tills + receipt_workers)
+    ]
+    for process in processes:
+        process.start()
+    start_event.set()
+    began = time.perf_counter()
+    # Drain the queue before joining - a process cannot exit while its result is unread
+    worker_stats = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - began
+    for process in processes:
+        process.join()
+
+    report = {'seconds': elapsed, 'roles': {}}
+    net = {}
+    latencies = []
+    lock_waits = []
+    for stats in worker_stats:
+        role = report['roles'].setdefault(stats['role'], {'ok': 0, 'rejected': 0, 'locked': 0, 'errors': 0})
+        for key in role:
+            role[key] += stats[key]
+        for pid, change in stats['net'].items():
+            net[pid] = net.get(pid, 0) + change
+        latencies.extend(stats['latencies'])
+        lock_waits.extend(stats['lock_waits'])
+
+    waits = [wait for wait in lock_waits if wait > LOCK_WAIT_THRESHOLD]
+    report['operations'] = sum(role['ok'] for role in report['roles'].values())
+    report['throughput'] = report['operations'] / elapsed
+    report['latency_p50_ms'] = _percentile(latencies, 0.5) * 1000
+    report['latency_p99_ms'] = _percentile(latencies, 0.99) * 1000
+    report['lock_waits'] = len(waits)
+    report['lock_wait_total_s'] = sum(waits)
+    report['lock_wait_p99_ms'] = _percentile(lock_waits, 0.99) * 1000
+    report['lock_wait_max_ms'] = max(lock_waits, default=0.0) * 1000
+    report['stock'] = check_stock(db_path, initial, net)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent tills and receipt workers against one database")
+    parser.add_argument('--db', default='stress_test.db', help="New database file to create")
+    parser.add_argument('--tills', type=int, default=4)
+    parser.add_argument('--receipt-workers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--initial-qty', type=int, default=500)
+    parser.add_argument('--think-ms', type=float, default=20, help="Maximum pause before each operation")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    report = stress_test(
+        args.db, args.tills, args.receipt_workers, args.duration,
+        args.products, args.initial_qty, args.think_ms, args.seed
+    )
+    print(f"{args.tills} till(s), {args.receipt_workers} receipt worker(s), {report['seconds']:.1f}s")
+    for role, counts in report['roles'].items():
+        print(f"  {role:8} ok {counts['ok']:7}  rejected {counts['rejected']:6}  locked {counts['locked']:4}  errors {counts['errors']:4}")
+    print(f"Throughput      {report['throughput']:.1f} operations/s")
+    print(f"Latency         p50 {report['latency_p50_ms']:.1f} ms  p99 {report['latency_p99_ms']:.1f} ms")
+    print(f"Lock waits      {report['lock_waits']} over {LOCK_WAIT_THRESHOLD * 1000:.0f} ms, {report['lock_wait_total_s']:.2f}s total, "
+          f"p99 {report['lock_wait_p99_ms']:.1f} ms, max {report['lock_wait_max_ms']:.1f} ms")
+    stock = report['stock']
+    print(f"Stock check     {stock['products']} products: {stock['worker_mismatches']} differ from the workers' movements, "
+          f"{stock['ledger_mismatches']} from the ledger, {stock['negative']} negative")
+    passed = stock['worker_mismatches'] == 0 and stock['ledger_mismatches'] == 0 and stock['negative'] == 0
+    print("PASS" if passed else "FAIL")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
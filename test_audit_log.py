@@ -0,0 +1,68 @@
+"""
+Audit log tests - journal replay with two databases in one folder
+
+Run with: python -m unittest test_audit_log
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from create_db import create_db
+from audit_log import AuditLogger
+
+ROW = [7, 1, 'Apple', 2, 1.5, 3.0, 'add']
+
+
+class AuditLogTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.journal_dir = os.path.join(self.dir, 'audit_journal')
+        os.makedirs(self.journal_dir)
+        self.a = os.path.join(self.dir, 'a.db')
+        self.b = os.path.join(self.dir, 'a-b.db')
+        create_db(self.a)
+        create_db(self.b)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def dead_journal(self, stem):
+        # Left by a process that died before its rows reached the database
+        with open(os.path.join(self.journal_dir, f"{stem}-99999-1.journal"), 'w', encoding='utf-8') as f:
+            f.write(json.dumps([1, 'receipt_items', ROW]) + "\n")
+
+    def items(self, db_path):
+        con = sqlite3.connect(db_path)
+        try:
+            return con.execute("SELECT receipt_id, product_name FROM receipt_items").fetchall()
+        finally:
+            con.close()
+
+    def test_journal_is_replayed_into_its_own_database_only(self):
+        self.dead_journal('a')
+        other = AuditLogger(self.b)
+        other.flush(5)
+        other.close()
+        self.assertEqual(self.items(self.b), [])
+        self.assertEqual(len(os.listdir(self.journal_dir)), 1)
+
+        logger = AuditLogger(self.a)
+        logger.flush(5)
+        logger.close()
+        self.assertEqual(self.items(self.a), [(7, 'Apple')])
+        self.assertEqual(os.listdir(self.journal_dir), [])
+
+    def test_logged_rows_are_written(self):
+        logger = AuditLogger(self.a)
+        logger.log('receipt_items', ROW)
+        self.assertTrue(logger.flush(5))
+        logger.close()
+        self.assertEqual(self.items(self.a), [(7, 'Apple')])
+        self.assertEqual(self.items(self.b), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Inventory report tests - dead stock and the last sale cache
+
+Run with: python -m unittest test_inventory_report
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from create_db import create_db
+from sales_rollup import record_sale
+from stock_ledger import record_movement, start_tracking
+import inventory_report
+from inventory_report import InventoryReport
+
+TODAY = datetime.now()
+
+
+def day(days_ago):
+    return (TODAY - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+@unittest.skipUnless(inventory_report.HAS_NUMPY, "NumPy is not installed")
+class InventoryReportTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, 'ims.db')
+        create_db(self.db)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def execute(self, fn):
+        con = sqlite3.connect(self.db)
+        try:
+            fn(con.cursor())
+            con.commit()
+        finally:
+            con.close()
+
+    def add_product(self, pid, name, added_days_ago=None):
+        def add(cur):
+            cur.execute(
+                "INSERT INTO product(pid,Category,Supplier,name,price,qty,status) VALUES(?,?,?,?,?,?,?)",
+                (pid, 'Fruit', 'Farm', name, '10', '5', 'Active')
+            )
+            if added_days_ago is None:
+                start_tracking(cur, pid, name, 5)
+            else:
+                txn_id = record_movement(cur, pid, name, 'adjust', 5, 0, 5)
+                cur.execute("UPDATE transaction_logs SET timestamp=? WHERE txn_id=?", (day(added_days_ago) + ' 09:00:00', txn_id))
+        self.execute(add)
+
+    def sell(self, pid, days_ago):
+        self.execute(lambda cur: record_sale(cur, [(pid, 'x', 'Fruit', 1, 10.0, 0.0)], day(days_ago)))
+
+    def dead(self, report):
+        return report.build(TODAY)['totals']['dead_stock']
+
+    def test_new_products_are_not_dead_stock(self):
+        self.add_product(1, 'Old', added_days_ago=200)
+        self.add_product(2, 'New')
+        self.add_product(3, 'Sold long ago', added_days_ago=200)
+        self.sell(3, 120)
+        # Added long ago, sold out and restocked by hand last week
+        self.add_product(4, 'Restocked', added_days_ago=200)
+        self.execute(lambda cur: cur.execute(
+            "INSERT INTO transaction_logs(product_id,product_name,quantity,action,old_qty,new_qty,timestamp) VALUES(4,'Restocked',5,'adjust',0,5,?)",
+            (day(7) + ' 09:00:00',)
+        ))
+        report = InventoryReport(self.db, dead_days=90)
+        try:
+            self.assertEqual(self.dead(report), 3)
+        finally:
+            report.close()
+
+    def test_last_sale_cache_follows_new_sales_and_rebuilds(self):
+        for pid in (1, 2, 3):
+            self.add_product(pid, f"P{pid}", added_days_ago=200)
+        self.sell(1, 100)
+        report = InventoryReport(self.db, dead_days=90)
+        try:
+            self.assertEqual(self.dead(report), 3)
+            self.sell(1, 0)
+            self.sell(2, 0)
+            self.assertEqual(self.dead(report), 1)
+            # Rollups of past days rebuilt with a sale that was missing
+            self.sell(3, 10)
+            self.assertEqual(self.dead(report), 0)
+            self.execute(lambda cur: cur.execute("DELETE FROM sales_daily_product WHERE product_id=3"))
+            self.assertEqual(self.dead(report), 1)
+        finally:
+            report.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Hot-folder daemon tests - files left in processing by an interrupted run
+
+Run with: python -m unittest test_receipt_daemon
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from create_db import create_db
+from audit_log import shutdown_audit_loggers
+from receipt_daemon import HotFolderDaemon
+
+
+class HotFolderDaemonTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, 'ims.db')
+        create_db(self.db)
+        self.daemon = HotFolderDaemon(os.path.join(self.dir, 'watch'), db_path=self.db)
+        for directory in (self.daemon.processing_dir, self.daemon.done_dir, self.daemon.failed_dir):
+            os.makedirs(directory)
+        self.submitted = []
+        self.daemon.submit = self.submitted.append
+
+        self.path = os.path.join(self.daemon.processing_dir, 'receipt.jpg')
+        with open(self.path, 'wb') as fp:
+            fp.write(b'scan')
+
+    def tearDown(self):
+        # The handler's audit logger must let go of the database before it is removed
+        shutdown_audit_loggers()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def log_receipt(self, upload_date):
+        con = sqlite3.connect(self.db)
+        try:
+            con.execute(
+                "INSERT INTO receipt_logs(receipt_type,upload_date,file_name,total_items,total_amount,status,notes) VALUES(?,?,?,?,?,?,?)",
+                ('purchase', upload_date.strftime('%Y-%m-%d %H:%M:%S'), self.path, 1, 5.0, 'completed', 'Auto-processed')
+            )
+            con.commit()
+        finally:
+            con.close()
+
+    def test_committed_file_is_moved_to_done(self):
+        self.log_receipt(datetime.now())
+        self.daemon.recover_processing()
+        self.assertEqual(self.submitted, [])
+        self.assertEqual(sorted(os.listdir(self.daemon.done_dir)), ['receipt.jpg', 'receipt.jpg.json'])
+        self.assertEqual(os.listdir(self.daemon.processing_dir), [])
+
+    def test_uncommitted_file_is_processed_again(self):
+        # A receipt of the same name processed before this file was claimed
+        self.log_receipt(datetime.now() - timedelta(days=1))
+        self.daemon.recover_processing()
+        self.assertEqual(self.submitted, [self.path])
+        self.assertEqual(os.listdir(self.daemon.done_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Receipt job tests - recovery of jobs left running by a worker that stopped
+
+Run with: python -m unittest test_receipt_jobs
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from create_db import create_db
+from receipt_jobs import ReceiptJobQueue, ReceiptJobWorker, TIME_FORMAT, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+
+class FailingHandler:
+    def __init__(self, retry):
+        self.retry = retry
+
+    def process_receipt_workflow(self, file_path, receipt_type_override=None):
+        return {'success': False, 'receipt_id': None, 'message': 'No items found in receipt.', 'retry': self.retry}
+
+
+class ReceiptJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, 'jobs.db')
+        create_db(self.db)
+        self.queue = ReceiptJobQueue(self.db)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def execute(self, sql, params=()):
+        con = sqlite3.connect(self.db)
+        try:
+            con.execute(sql, params)
+            con.commit()
+        finally:
+            con.close()
+
+    def running_job(self, worker):
+        # Claimed a minute ago - well under the old fixed age of ten minutes
+        job_id = self.queue.enqueue('receipt.jpg')
+        self.assertEqual(self.queue.claim(worker)['job_id'], job_id)
+        started = (datetime.now() - timedelta(seconds=60)).strftime(TIME_FORMAT)
+        self.execute("UPDATE receipt_jobs SET started_at=? WHERE job_id=?", (started, job_id))
+        return job_id
+
+    def test_job_of_live_worker_is_left_running(self):
+        job_id = self.running_job('other-1')
+        self.queue.heartbeat(['other-1'])
+        self.assertEqual(self.queue.recover_stale(), 0)
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_RUNNING)
+
+    def test_job_of_dead_worker_is_requeued(self):
+        job_id = self.running_job('other-1')
+        self.assertEqual(self.queue.recover_stale(), 1)
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_QUEUED)
+
+    def test_committed_job_is_not_requeued(self):
+        job_id = self.running_job('other-1')
+        now = datetime.now().strftime(TIME_FORMAT)
+        self.execute(
+            "INSERT INTO receipt_logs(receipt_type,upload_date,file_name,total_items,total_amount,status,notes) VALUES(?,?,?,?,?,?,?)",
+            ('purchase', now, 'receipt.jpg', 1, 5.0, 'completed', 'Auto-processed')
+        )
+        self.assertEqual(self.queue.recover_stale(), 1)
+        job = self.queue.get_job(job_id)
+        self.assertEqual(job['status'], JOB_DONE)
+        self.assertEqual(job['receipt_id'], 1)
+
+    def test_retry_follows_the_handler_flag(self):
+        for retry, status in ((True, JOB_QUEUED), (False, JOB_FAILED)):
+            job_id = self.queue.enqueue('receipt.jpg')
+            worker = ReceiptJobWorker(self.queue, 'w-1', handler=FailingHandler(retry))
+            self.assertTrue(worker.run_once())
+            self.assertEqual(self.queue.get_job(job_id)['status'], status)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Sales rollup rebuild tests - history from saved bills and sales receipts
+
+Run with: python -m unittest test_sales_rebuild
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from create_db import create_db
+from bill_render import make_bill, render_text
+from sales_rollup import record_sale
+import sales_rebuild
+
+
+class SalesRebuildTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, 'ims.db')
+        self.bill_dir = os.path.join(self.dir, 'bill')
+        os.makedirs(self.bill_dir)
+        create_db(self.db)
+        con = sqlite3.connect(self.db)
+        try:
+            con.execute("INSERT INTO product(pid,Category,Supplier,name,price,qty,status) VALUES(1,'Fruit','Farm','Apple','10','50','Active')")
+            con.execute("INSERT INTO product(pid,Category,Supplier,name,price,qty,status) VALUES(2,'Dairy','Farm','Milk','20','50','Active')")
+            # A sales receipt from before the rollups were kept
+            con.execute("INSERT INTO receipt_logs(receipt_id,receipt_type,upload_date,file_name,total_items,total_amount,status,notes) VALUES(7,'sales','2024-03-02 10:00:00','r.jpg',1,40.0,'completed','Auto-processed')")
+            con.execute("INSERT INTO receipt_items(receipt_id,product_id,product_name,quantity,unit_price,total_price,action) VALUES(7,2,'Milk',2,20.0,40.0,'subtract')")
+            # Today's sale, already in the rollups
+            record_sale(con.cursor(), [(1, 'Apple', 'Fruit', 1, 10.0, 0.5)], '2024-03-05')
+            con.commit()
+        finally:
+            con.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def save_bill(self, invoice, date, lines):
+        with open(os.path.join(self.bill_dir, f"{invoice}.txt"), 'w') as fp:
+            fp.write(render_text(make_bill(invoice, 'Ann', '123', lines, date=date)))
+
+    def rows(self, sql):
+        con = sqlite3.connect(self.db)
+        try:
+            return con.execute(sql).fetchall()
+        finally:
+            con.close()
+
+    def test_history_is_rebuilt(self):
+        self.save_bill(1001, '01/03/2024', [('Apple', '3', '30.0'), ('Milk', '1', '20.0'), ('Gone', '1', '5.0')])
+        self.save_bill(1002, '01/03/2024', [('Apple', '1', '10.0')])
+        self.save_bill(1003, '05/03/2024', [('Apple', '1', '10.0')])
+
+        for _ in range(2):
+            stats = sales_rebuild.rebuild(self.db, self.bill_dir, before='2024-03-05')
+            self.assertEqual((stats['bills'], stats['receipts'], stats['unmatched']), (2, 1, 1))
+            self.assertEqual(
+                self.rows("SELECT day, revenue, units, ROUND(discount, 2), bill_count FROM sales_daily ORDER BY day"),
+                [('2024-03-01', 60.0, 5, 3.0, 2), ('2024-03-02', 40.0, 2, 0.0, 1), ('2024-03-05', 10.0, 1, 0.5, 1)]
+            )
+            self.assertEqual(
+                self.rows("SELECT day, product_id, units, bill_count FROM sales_daily_product ORDER BY day, product_id"),
+                [('2024-03-01', 1, 4, 2), ('2024-03-01', 2, 1, 1), ('2024-03-02', 2, 2, 1), ('2024-03-05', 1, 1, 1)]
+            )
+            self.assertEqual(
+                self.rows("SELECT day, category, units FROM sales_daily_category ORDER BY day, category"),
+                [('2024-03-01', 'Dairy', 1), ('2024-03-01', 'Fruit', 4), ('2024-03-02', 'Dairy', 2), ('2024-03-05', 'Fruit', 1)]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
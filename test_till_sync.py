@@ -0,0 +1,140 @@
+"""
+Till sync tests - a central database and a till replica as two local database files
+
+Run with: python -m unittest test_till_sync
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from create_db import create_db
+from low_stock import set_reorder_level
+from stock_ledger import record_movement, start_tracking
+import till_sync
+
+
+class TillSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.central = os.path.join(self.dir, 'central.db')
+        self.till = os.path.join(self.dir, 'till.db')
+        create_db(self.central)
+        self.add_product(self.central, 'Apple', 20)
+        till_sync.init_replica(self.till, self.central, 'till1')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def add_product(self, db_path, name, qty, price='10'):
+        # As productClass.add does it
+        con = sqlite3.connect(db_path)
+        try:
+            cur = con.cursor()
+            cur.execute(
+                "insert into product(Category,Supplier,name,price,qty,status) values(?,?,?,?,?,?)",
+                ('Fruit', 'Farm', name, price, str(qty), 'Active')
+            )
+            pid = cur.lastrowid
+            start_tracking(cur, pid, name, qty)
+            set_reorder_level(cur, pid, 3)
+            con.commit()
+            return pid
+        finally:
+            con.close()
+
+    def sell(self, db_path, pid, qty):
+        con = sqlite3.connect(db_path)
+        try:
+            cur = con.cursor()
+            name, old_qty = cur.execute("SELECT name, CAST(qty AS INTEGER) FROM product WHERE pid=?", (pid,)).fetchone()
+            cur.execute("UPDATE product SET qty=? WHERE pid=?", (str(old_qty - qty), pid))
+            record_movement(cur, pid, name, 'subtract', qty, old_qty, old_qty - qty)
+            con.commit()
+        finally:
+            con.close()
+
+    def products(self, db_path):
+        con = sqlite3.connect(db_path)
+        try:
+            return {name: (pid, int(qty), price) for pid, name, qty, price in con.execute("SELECT pid, name, qty, price FROM product")}
+        finally:
+            con.close()
+
+    def test_sale_is_pushed(self):
+        pid = self.products(self.till)['Apple'][0]
+        self.sell(self.till, pid, 3)
+        stats = till_sync.sync(self.till)
+        self.assertEqual(stats['movements'], 1)
+        self.assertEqual(self.products(self.central)['Apple'][1], 17)
+        self.assertEqual(self.products(self.till)['Apple'][1], 17)
+
+    def test_products_added_on_till_and_centrally_stay_apart(self):
+        self.add_product(self.central, 'CentralNew', 10)
+        local_pid = self.add_product(self.till, 'TillNew', 50)
+        self.assertGreaterEqual(local_pid, till_sync.LOCAL_PID_BASE)
+
+        stats = till_sync.sync(self.till)
+        self.assertEqual(stats['rejected'], 0)
+        central = self.products(self.central)
+        self.assertEqual(central['CentralNew'][1], 10)
+        self.assertEqual(central['TillNew'][1], 50)
+
+        till = self.products(self.till)
+        self.assertEqual(till['TillNew'][0], local_pid)
+        self.assertEqual(till['TillNew'][1], 50)
+        self.assertEqual(till['CentralNew'][1], 10)
+
+        # Later sales of the till's product reach its central row
+        self.sell(self.till, local_pid, 5)
+        till_sync.sync(self.till)
+        self.assertEqual(self.products(self.central)['TillNew'][1], 45)
+        self.assertEqual(self.products(self.till)['TillNew'][1], 45)
+
+    def test_unpushed_product_survives_pull(self):
+        self.add_product(self.till, 'TillNew', 5)
+        self.add_product(self.central, 'CentralNew', 10)
+        replica = sqlite3.connect(self.till, isolation_level=None)
+        central = till_sync.connect_central(self.central)
+        try:
+            till_sync.pull(replica, central, force=True)
+        finally:
+            central.close()
+            replica.close()
+        till = self.products(self.till)
+        self.assertIn('TillNew', till)
+        self.assertIn('CentralNew', till)
+
+    def test_till_edits_are_pushed(self):
+        pid = self.products(self.till)['Apple'][0]
+        con = sqlite3.connect(self.till)
+        con.execute("UPDATE product SET name='Green Apple', price='12' WHERE pid=?", (pid,))
+        con.commit()
+        con.close()
+        self.sell(self.till, pid, 2)
+
+        till_sync.sync(self.till)
+        self.assertEqual(self.products(self.central)['Green Apple'], (pid, 18, '12'))
+        self.assertEqual(self.products(self.till)['Green Apple'], (pid, 18, '12'))
+
+    def test_movement_for_another_product_is_refused(self):
+        pid = self.products(self.till)['Apple'][0]
+        con = sqlite3.connect(self.till)
+        record_movement(con.cursor(), pid, 'Banana', 'subtract', 4, 20, 16)
+        con.commit()
+        con.close()
+
+        stats = till_sync.sync(self.till)
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(self.products(self.central)['Apple'][1], 20)
+        con = sqlite3.connect(self.central)
+        try:
+            rejected = con.execute("SELECT till_id, product_id, product_name, quantity FROM till_rejected_movements").fetchall()
+        finally:
+            con.close()
+        self.assertEqual(rejected, [('till1', pid, 'Banana', 4)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,540 @@
+"""
+Till Sync Module
+Keeps a till's local database as a replica of the central one. Sales, receipts and ledger
+rows written on the till are captured by triggers into an append-only change log and pushed
+to the central database in batches; stock is merged by adding each movement's delta, so
+tills never overwrite each other. The catalog (products, categories, suppliers) is pulled back.
+
+Products added or edited on a till are pushed as well. A product added on a till gets a local
+id from LOCAL_PID_BASE up and a central id when it is pushed; till_product_map translates
+between the two in both directions, so a till's product never takes over a central one.
+"""
+
+import os
+import sys
+import time
+import json
+import sqlite3
+import argparse
+import query_profiler
+from pathlib import Path
+from datetime import datetime
+from create_db import create_db, ensure_db
+from stock_ledger import DELTA_SQL
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_INTERVAL = 30
+
+# Catalog tables owned by the central database, with their columns (key first)
+CATALOG_COLUMNS = {
+    'category': ('cid', 'name'),
+    'supplier': ('invoice', 'name', 'contact', 'desc'),
+    'product': ('pid', 'Category', 'Supplier', 'name', 'price', 'qty', 'status'),
+    'product_reorder': ('pid', 'reorder_level'),
+}
+# product_reorder has no change counter - it is pulled along with product
+CATALOG_VERSIONS = {'category': 'category', 'supplier': 'supplier', 'product': 'product', 'product_reorder': 'product'}
+
+# Tables whose inserted rows are pushed as they are
+LOGGED_INSERTS = {'receipt_logs': 'receipt_id', 'receipt_items': 'item_id', 'transaction_logs': 'txn_id'}
+# Rollups are pushed as the change each insert or update made, keyed by their primary key
+LOGGED_ROLLUPS = {
+    'sales_daily': ('day',),
+    'sales_daily_product': ('day', 'product_id', 'product_name'),
+    'sales_daily_category': ('day', 'category'),
+}
+ROLLUP_MEASURES = ('revenue', 'units', 'discount', 'bill_count')
+# Products added on a till are numbered from here, clear of the central ids pulled
+LOCAL_PID_BASE = 1000000000
+
+
+def _quoted(columns):
+    return ', '.join(f'"{column}"' for column in columns)
+
+
+def _prepare_replica(con):
+    """Create the till's state, change log and capture triggers"""
+    cur = con.cursor()
+    cur.execute("CREATE TABLE IF NOT EXISTS till_state(id INTEGER PRIMARY KEY CHECK(id=1),till_id text,central_path text,pushed_seq INTEGER,pushed_at text,pulled_at text)")
+    cur.execute("CREATE TABLE IF NOT EXISTS till_change_log(seq INTEGER PRIMARY KEY AUTOINCREMENT,table_name text,row_id INTEGER,payload text,created_at text)")
+    cur.execute("CREATE TABLE IF NOT EXISTS till_pulled(name text PRIMARY KEY,version INTEGER)")
+    for table, key in LOGGED_INSERTS.items():
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_till_{table} AFTER INSERT ON {table} BEGIN INSERT INTO till_change_log(table_name,row_id,created_at) VALUES('{table}',NEW.{key},datetime('now','localtime')); END")
+    for table, keys in LOGGED_ROLLUPS.items():
+        for event, old in (('insert', lambda m: '0'), ('update', lambda m: f'OLD.{m}')):
+            pairs = [f"'{key}',NEW.{key}" for key in keys] + [f"'{m}',NEW.{m}-{old(m)}" for m in ROLLUP_MEASURES]
+            cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_till_{table}_{event} AFTER {event.upper()} ON {table} BEGIN INSERT INTO till_change_log(table_name,payload,created_at) VALUES('{table}',json_object({','.join(pairs)}),datetime('now','localtime')); END")
+    # Catalog edits made on the till are logged too - pull() holds a till_pulling row while
+    # it writes, so the central rows it copies are not
+    cur.execute("CREATE TABLE IF NOT EXISTS till_pulling(id INTEGER PRIMARY KEY)")
+    log_product = "INSERT INTO till_change_log(table_name,row_id,created_at) VALUES('product',{}.pid,datetime('now','localtime'))"
+    local = "NOT EXISTS (SELECT 1 FROM till_pulling)"
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_till_product_insert AFTER INSERT ON product WHEN {local} BEGIN {log_product.format('NEW')}; END")
+    # Stock changes reach the central database through the ledger - only catalog fields count here
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_till_product_update AFTER UPDATE OF Category,Supplier,name,price ON product WHEN {local} AND (NEW.Category IS NOT OLD.Category OR NEW.Supplier IS NOT OLD.Supplier OR NEW.name IS NOT OLD.name OR NEW.price IS NOT OLD.price) BEGIN {log_product.format('NEW')}; END")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_till_reorder_insert AFTER INSERT ON product_reorder WHEN {local} BEGIN {log_product.format('NEW')}; END")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_till_reorder_update AFTER UPDATE ON product_reorder WHEN {local} AND NEW.reorder_level IS NOT OLD.reorder_level BEGIN {log_product.format('NEW')}; END")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_till_reorder_delete AFTER DELETE ON product_reorder WHEN {local} BEGIN {log_product.format('OLD')}; END")
+    cur.execute("INSERT INTO sqlite_sequence (name, seq) SELECT 'product', 0 WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name='product')")
+    cur.execute("UPDATE sqlite_sequence SET seq=? WHERE name='product' AND seq<?", (LOCAL_PID_BASE, LOCAL_PID_BASE))
+    con.commit()
+
+
+def connect_central(central_path, timeout=30):
+    """
+    Open the central database - fails instead of creating an empty file when it is unreachable
+    """
+    uri = Path(os.path.abspath(central_path)).as_uri() + '?mode=rw'
+    con = sqlite3.connect(uri, uri=True, timeout=timeout, isolation_level=None)
+    ensure_db(central_path)
+    return con
+
+
+def init_replica(db_path, central_path, till_id):
+    """
+    Turn db_path into a replica of central_path and pull the catalog
+
+    Args:
+        db_path: The till's local database (created if missing)
+        central_path: The central database, e.g. on a network share
+        till_id: Name of this till - must be unique among the tills
+
+    Raises:
+        FileExistsError: db_path is an existing database that is not a till replica
+    """
+    if os.path.exists(db_path):
+        con = sqlite3.connect(db_path)
+        try:
+            is_replica = con.execute("SELECT 1 FROM sqlite_master WHERE name='till_state'").fetchone()
+            has_data = con.execute("SELECT 1 FROM sqlite_master WHERE name='product'").fetchone() and \
+                con.execute("SELECT 1 FROM product LIMIT 1").fetchone()
+        finally:
+            con.close()
+        if has_data and not is_replica:
+            raise FileExistsError(f"{db_path} already holds products and is not a till replica - use a new file")
+    create_db(db_path)
+    con = sqlite3.connect(db_path)
+    try:
+        _prepare_replica(con)
+        con.execute(
+            """INSERT INTO till_state (id, till_id, central_path, pushed_seq) VALUES (1, ?, ?, 0)
+            ON CONFLICT(id) DO UPDATE SET till_id=excluded.till_id, central_path=excluded.central_path""",
+            (till_id, central_path)
+        )
+        con.commit()
+    finally:
+        con.close()
+    return sync(db_path)
+
+
+def _till_state(replica):
+    row = replica.execute("SELECT till_id, central_path, pushed_seq FROM till_state WHERE id=1").fetchone()
+    if not row:
+        raise ValueError("Not a till replica - run 'till_sync.py init' first")
+    return row
+
+
+def _apply_movement(cur, row, receipt_map, product_map):
+    """
+    Add one till ledger row's delta to the central stock and ledger
+
+    Returns:
+        None if applied, else the reason it was refused
+    """
+    receipt_id, local_pid, product_name, quantity, action, timestamp = row
+    product_id = product_map.get(local_pid, local_pid)
+    cur.execute("SELECT name FROM product WHERE pid=?", (product_id,))
+    current = cur.fetchone()
+    if current is None:
+        return "Product is not in the central database"
+    # A name the central product has never had in its ledger means the id is another product's
+    if current[0] != product_name:
+        cur.execute("SELECT 1 FROM transaction_logs WHERE product_id=? AND product_name=? LIMIT 1", (product_id, product_name))
+        if cur.fetchone() is None:
+            return f"Central product {product_id} is '{current[0]}'"
+    cur.execute(f"SELECT {DELTA_SQL} FROM (SELECT ? AS action, ? AS quantity)", (action, quantity))
+    delta = cur.fetchone()[0]
+    cur.execute(
+        """UPDATE product SET qty=CAST(qty AS INTEGER)+?,
+        status=CASE WHEN CAST(qty AS INTEGER)+?<=0 THEN 'Inactive' WHEN ?>0 THEN 'Active' ELSE status END
+        WHERE pid=?""",
+        (delta, delta, delta, product_id)
+    )
+    cur.execute("SELECT CAST(qty AS INTEGER) FROM product WHERE pid=?", (product_id,))
+    new_qty = cur.fetchone()[0]
+    # Ledger quantities are the central stock's, so the central ledger adds up
+    cur.execute(
+        """INSERT INTO transaction_logs
+        (receipt_id, product_id, product_name, quantity, action, old_qty, new_qty, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (receipt_map.get(receipt_id), product_id, product_name, quantity, action, new_qty - delta, new_qty, timestamp)
+    )
+    return None
+
+
+def _push_product(cur, replica, till_id, local_pid, product_map):
+    """
+    Send a product added or edited on the till to the central database
+
+    A product added on the till becomes a new central product, or is mapped to the
+    central product of the same name, and its id pair goes to till_product_map.
+    Stock is not sent here - it arrives through the ledger rows.
+    """
+    product = replica.execute("SELECT Category, Supplier, name, price, status FROM product WHERE pid=?", (local_pid,)).fetchone()
+    if product is None:
+        return  # Deleted on the till since
+    pid = product_map.get(local_pid)
+    if pid is None and local_pid >= LOCAL_PID_BASE:
+        cur.execute("SELECT pid FROM product WHERE name=?", (product[2],))
+        existing = cur.fetchone()
+        if existing:
+            pid = existing[0]
+        else:
+            cur.execute(
+                "INSERT INTO product (Category, Supplier, name, price, qty, status) VALUES (?, ?, ?, ?, '0', ?)",
+                product
+            )
+            pid = cur.lastrowid
+        cur.execute("INSERT INTO till_product_map (till_id, local_pid, pid) VALUES (?, ?, ?)", (till_id, local_pid, pid))
+        product_map[local_pid] = pid
+    else:
+        pid = pid or local_pid
+        cur.execute(
+            "UPDATE product SET Category=?, Supplier=?, name=?, price=? WHERE pid=?",
+            product[:4] + (pid,)
+        )
+    reorder = replica.execute("SELECT reorder_level FROM product_reorder WHERE pid=?", (local_pid,)).fetchone()
+    if reorder is None:
+        cur.execute("DELETE FROM product_reorder WHERE pid=?", (pid,))
+    else:
+        cur.execute(
+            """INSERT INTO product_reorder (pid, reorder_level) SELECT pid, ? FROM product WHERE pid=?
+            ON CONFLICT(pid) DO UPDATE SET reorder_level=excluded.reorder_level""",
+            (reorder[0], pid)
+        )
+
+
+def _receipt_map(cur, till_id, local_ids):
+    local_ids = [receipt_id for receipt_id in set(local_ids) if receipt_id is not None]
+    if not local_ids:
+        return {}
+    cur.execute(
+        f"SELECT local_id, receipt_id FROM till_receipt_map WHERE till_id=? AND local_id IN ({','.join('?' * len(local_ids))})",
+        [till_id] + local_ids
+    )
+    return dict(cur.fetchall())
+
+
+def push(replica, central, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Send the till's new change log entries to the central database
+
+    Each batch is one central transaction that also advances the till's position
+    in till_sync_state, so a batch interrupted by a network failure is sent again
+    in full and a batch that committed is never applied twice.
+
+    Args:
+        replica: Connection to the till database
+        central: Connection to the central database (isolation_level=None)
+        batch_size: Change log entries per central transaction
+
+    Stock movements whose product the central database does not have, or has under a
+    name the movement never carried, are not applied but kept in till_rejected_movements.
+
+    Returns:
+        Dict with pushed entries, products, movements and rejected movements
+    """
+    till_id = _till_state(replica)[0]
+    stats = {'pushed': 0, 'products': 0, 'movements': 0, 'rejected': 0}
+    cur = central.cursor()
+    while True:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            cur.execute("SELECT last_seq FROM till_sync_state WHERE till_id=?", (till_id,))
+            row = cur.fetchone()
+            last_seq = row[0] if row else 0
+            cur.execute("SELECT local_pid, pid FROM till_product_map WHERE till_id=?", (till_id,))
+            product_map = dict(cur.fetchall())
+            changes = replica.execute(
+                "SELECT seq, table_name, row_id, payload FROM till_change_log WHERE seq>? ORDER BY seq LIMIT ?",
+                (last_seq, batch_size)
+            ).fetchall()
+            if not changes:
+                cur.execute("ROLLBACK")
+                # Catch up if the last push committed centrally but not here
+                replica.execute("UPDATE till_state SET pushed_seq=? WHERE id=1 AND pushed_seq<>?", (last_seq, last_seq))
+                replica.commit()
+                break
+
+            for seq, table, row_id, payload in changes:
+                if table == 'product':
+                    _push_product(cur, replica, till_id, row_id, product_map)
+                    stats['products'] += 1
+                elif table == 'receipt_logs':
+                    receipt = replica.execute(
+                        "SELECT receipt_type, upload_date, file_name, total_items, total_amount, status, notes FROM receipt_logs WHERE receipt_id=?",
+                        (row_id,)
+                    ).fetchone()
+                    if receipt is None:
+                        continue
+                    cur.execute(
+                        """INSERT INTO receipt_logs (receipt_type, upload_date, file_name, total_items, total_amount, status, notes)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        receipt
+                    )
+                    cur.execute(
+                        "INSERT OR REPLACE INTO till_receipt_map (till_id, local_id, receipt_id) VALUES (?, ?, ?)",
+                        (till_id, row_id, cur.lastrowid)
+                    )
+                elif table == 'receipt_items':
+                    item = replica.execute(
+                        "SELECT receipt_id, product_id, product_name, quantity, unit_price, total_price, action FROM receipt_items WHERE item_id=?",
+                        (row_id,)
+                    ).fetchone()
+                    if item is None:
+                        continue
+                    mapped = _receipt_map(cur, till_id, [item[0]])
+                    cur.execute(
+                        """INSERT INTO receipt_items (receipt_id, product_id, product_name, quantity, unit_price, total_price, action)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        (mapped.get(item[0]), product_map.get(item[1], item[1])) + item[2:]
+                    )
+                elif table == 'transaction_logs':
+                    movement = replica.execute(
+                        "SELECT receipt_id, product_id, product_name, quantity, action, timestamp FROM transaction_logs WHERE txn_id=?",
+                        (row_id,)
+                    ).fetchone()
+                    if movement is None:
+                        continue
+                    reason = _apply_movement(cur, movement, _receipt_map(cur, till_id, [movement[0]]), product_map)
+                    if reason is None:
+                        stats['movements'] += 1
+                    else:
+                        stats['rejected'] += 1
+                        cur.execute(
+                            """INSERT INTO till_rejected_movements
+                            (till_id, local_txn_id, product_id, product_name, quantity, action, timestamp, reason)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                            (till_id, row_id, product_map.get(movement[1], movement[1])) + movement[2:] + (reason,)
+                        )
+                elif table in LOGGED_ROLLUPS:
+                    values = json.loads(payload)
+                    if 'product_id' in values:
+                        values['product_id'] = product_map.get(values['product_id'], values['product_id'])
+                    columns = LOGGED_ROLLUPS[table] + ROLLUP_MEASURES
+                    keys = [key for key in LOGGED_ROLLUPS[table] if key != 'product_name']
+                    cur.execute(
+                        f"""INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+                        ON CONFLICT({', '.join(keys)}) DO UPDATE SET
+                            {''.join(f'{key}=excluded.{key}, ' for key in LOGGED_ROLLUPS[table] if key not in keys)}
+                            {', '.join(f'{m}={m}+excluded.{m}' for m in ROLLUP_MEASURES)}""",
+                        [values[column] for column in columns]
+                    )
+            cur.execute(
+                """INSERT INTO till_sync_state (till_id, last_seq, pushed_at) VALUES (?, ?, ?)
+                ON CONFLICT(till_id) DO UPDATE SET last_seq=excluded.last_seq, pushed_at=excluded.pushed_at""",
+                (till_id, changes[-1][0], datetime.now().strftime(TIME_FORMAT))
+            )
+            cur.execute("COMMIT")
+        except Exception:
+            if central.in_transaction:
+                cur.execute("ROLLBACK")
+            raise
+        stats['pushed'] += len(changes)
+        replica.execute(
+            "UPDATE till_state SET pushed_seq=?, pushed_at=? WHERE id=1",
+            (changes[-1][0], datetime.now().strftime(TIME_FORMAT))
+        )
+        replica.commit()
+    return stats
+
+
+def pull(replica, central, force=False):
+    """
+    Copy the catalog tables that changed centrally into the till database
+
+    Product stock is the central stock plus the till's movements not pushed yet. Products
+    added on the till keep their local ids, and rows with catalog edits not pushed yet
+    keep the till's version until the next push.
+
+    Args:
+        replica: Connection to the till database
+        central: Connection to the central database
+        force: Copy every catalog table, changed or not
+
+    Returns:
+        List of the tables copied
+    """
+    till_id = _till_state(replica)[0]
+    # One read transaction, so the stock and the till's pushed position match
+    central.execute("BEGIN")
+    try:
+        versions = dict(central.execute("SELECT name, version FROM table_versions"))
+        pulled = dict(replica.execute("SELECT name, version FROM till_pulled"))
+        tables = [
+            table for table, version_name in CATALOG_VERSIONS.items()
+            if force or pulled.get(version_name) != versions.get(version_name)
+        ]
+        rows = {
+            table: central.execute(f"SELECT {_quoted(CATALOG_COLUMNS[table])} FROM {table}").fetchall()
+            for table in tables
+        }
+        row = central.execute("SELECT last_seq FROM till_sync_state WHERE till_id=?", (till_id,)).fetchone()
+        pushed_seq = row[0] if row else 0
+        local_pids = dict(central.execute("SELECT pid, local_pid FROM till_product_map WHERE till_id=?", (till_id,)))
+    finally:
+        central.execute("COMMIT")
+    if not tables:
+        return []
+
+    replica.execute("BEGIN IMMEDIATE")
+    try:
+        replica.execute("INSERT OR IGNORE INTO till_pulling (id) VALUES (1)")
+        unpushed = {pid for (pid,) in replica.execute(
+            "SELECT DISTINCT row_id FROM till_change_log WHERE table_name='product' AND seq>?", (pushed_seq,)
+        )}
+        for table in ('product', 'product_reorder'):
+            if table in rows:
+                rows[table] = [
+                    (local_pids.get(row[0], row[0]),) + row[1:] for row in rows[table]
+                    if local_pids.get(row[0], row[0]) not in unpushed
+                ]
+        if 'product' in rows:
+            pending = dict(replica.execute(
+                f"""SELECT t.product_id, SUM({DELTA_SQL}) FROM till_change_log c
+                JOIN transaction_logs t ON t.txn_id=c.row_id
+                WHERE c.table_name='transaction_logs' AND c.seq>? GROUP BY t.product_id""",
+                (pushed_seq,)
+            ))
+            rows['product'] = [
+                row[:5] + (str(int(row[5] or 0) + pending.get(row[0], 0)),) + row[6:]
+                for row in rows['product']
+            ]
+        for table, table_rows in rows.items():
+            columns = CATALOG_COLUMNS[table]
+            key = columns[0]
+            updates = ', '.join(f'"{column}"=excluded."{column}"' for column in columns[1:])
+            changed = ' OR '.join(f'"{column}" IS NOT excluded."{column}"' for column in columns[1:])
+            # Unchanged rows are not rewritten, so the till's triggers and change bus stay quiet
+            replica.executemany(
+                f"""INSERT INTO {table} ({_quoted(columns)}) VALUES ({', '.join('?' * len(columns))})
+                ON CONFLICT("{key}") DO UPDATE SET {updates} WHERE {changed}""",
+                table_rows
+            )
+            keep = {row[0] for row in table_rows}
+            if table in ('product', 'product_reorder'):
+                keep |= unpushed
+            gone = [(local_key,) for (local_key,) in replica.execute(f'SELECT "{key}" FROM {table}') if local_key not in keep]
+            replica.executemany(f'DELETE FROM {table} WHERE "{key}"=?', gone)
+        for table in tables:
+            replica.execute(
+                "INSERT OR REPLACE INTO till_pulled (name, version) VALUES (?, ?)",
+                (CATALOG_VERSIONS[table], versions.get(CATALOG_VERSIONS[table]))
+            )
+        replica.execute("UPDATE till_state SET pulled_at=? WHERE id=1", (datetime.now().strftime(TIME_FORMAT),))
+        replica.execute("DELETE FROM till_pulling")
+        replica.execute("COMMIT")
+    except Exception:
+        if replica.in_transaction:
+            replica.execute("ROLLBACK")
+        raise
+    return tables
+
+
+def sync(db_path, central_path=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Push the till's changes, then pull the catalog
+
+    Args:
+        db_path: The till's local database
+        central_path: Override the central database recorded at init
+
+    Returns:
+        Dict with push counts and the pulled tables
+    """
+    replica = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        central_path = central_path or _till_state(replica)[1]
+        # Replicas made by older versions get the catalog triggers
+        _prepare_replica(replica)
+        central = connect_central(central_path)
+        try:
+            stats = push(replica, central, batch_size)
+            stats['pulled'] = pull(replica, central)
+        finally:
+            central.close()
+    finally:
+        replica.close()
+    return stats
+
+
+def status(db_path):
+    """
+    Returns:
+        Dict with till_id, central_path, pending change count and last push/pull times
+    """
+    con = sqlite3.connect(db_path)
+    try:
+        till_id, central_path, pushed_seq = _till_state(con)
+        pending = con.execute("SELECT COUNT(*) FROM till_change_log WHERE seq>?", (pushed_seq,)).fetchone()[0]
+        pushed_at, pulled_at = con.execute("SELECT pushed_at, pulled_at FROM till_state WHERE id=1").fetchone()
+    finally:
+        con.close()
+    return {
+        'till_id': till_id, 'central_path': central_path, 'pending': pending,
+        'pushed_at': pushed_at, 'pulled_at': pulled_at
+    }
+
+
+def _print_sync(stats):
+    print(f"Pushed {stats['pushed']} change(s), {stats['products']} product edit(s), {stats['movements']} stock movement(s)"
+          + (f", {stats['rejected']} refused (see till_rejected_movements centrally)" if stats['rejected'] else "")
+          + f"; pulled {', '.join(stats['pulled']) or 'nothing'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync a till's local database with the central database")
+    parser.add_argument('--db', default='ims.db', help="The till's local database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    init_parser = subparsers.add_parser('init', help="Make the local database a replica and pull the catalog")
+    init_parser.add_argument('--central', required=True, help="Path to the central database")
+    init_parser.add_argument('--till', required=True, help="Unique name of this till")
+
+    subparsers.add_parser('sync', help="Push local changes and pull the catalog once")
+
+    run_parser = subparsers.add_parser('run', help="Sync repeatedly")
+    run_parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="Seconds between syncs")
+
+    subparsers.add_parser('status', help="Show unsent changes and the last sync")
+    args = parser.parse_args(argv)
+
+    query_profiler.enable_from_env()
+    try:
+        if args.command == 'init':
+            _print_sync(init_replica(args.db, args.central, args.till))
+        elif args.command == 'sync':
+            _print_sync(sync(args.db))
+        elif args.command == 'status':
+            state = status(args.db)
+            print(f"Till {state['till_id']} -> {state['central_path']}")
+            print(f"{state['pending']} change(s) not pushed, last push {state['pushed_at'] or 'never'}, last pull {state['pulled_at'] or 'never'}")
+        else:
+            while True:
+                try:
+                    stats = sync(args.db)
+                    if stats['pushed'] or stats['pulled']:
+                        _print_sync(stats)
+                except sqlite3.Error as ex:
+                    # Central database unreachable or busy - the change log keeps everything for the next try
+                    print(f"Error syncing: {str(ex)}")
+                time.sleep(args.interval)
+    except (FileExistsError, ValueError, sqlite3.Error) as ex:
+        print(f"Error: {str(ex)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())